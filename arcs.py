@@ -0,0 +1,60 @@
+import numpy as np
+
+# Podrazumevana tolerancija tetive (mm): najvece odstupanje tetive od pravog luka
+DEFAULT_ARC_TOLERANCE = 0.01
+MIN_RADIUS = 0.001
+MAX_ARC_STEPS = 10000
+
+
+def arc_steps(radius, sweep, tolerance=DEFAULT_ARC_TOLERANCE):
+    """Broj tetiva po luku tako da greska tetive ne predje toleranciju."""
+    radius = np.asarray(radius, dtype=np.float64)
+    sweep = np.abs(np.asarray(sweep, dtype=np.float64))
+    # Tetiva ugla d ima gresku r*(1 - cos(d/2)) -> d = 2*acos(1 - tol/r)
+    ratio = np.clip(1.0 - tolerance / np.maximum(radius, MIN_RADIUS), -1.0, 1.0)
+    max_angle = np.maximum(2.0 * np.arccos(ratio), 1e-6)
+    steps = np.ceil(sweep / max_angle)
+    steps = np.clip(steps, 1, MAX_ARC_STEPS).astype(np.int64)
+    steps[radius < MIN_RADIUS] = 0
+    return steps
+
+
+def tessellate_arcs(start, end, center, clockwise, tolerance=DEFAULT_ARC_TOLERANCE):
+    """
+    Razbija sve lukove (G2/G3) odjednom u tetive.
+    start, end: (N, 3) tacke luka (Z se interpolira linearno - helix)
+    center:     (N, 2) centar u XY ravni
+    clockwise:  (N,) True za G2
+    Vraca (steps, points): steps[k] tetiva za luk k i points (sum(steps+1), 3),
+    tacke luka k su redom points[offset_k : offset_k + steps[k] + 1].
+    """
+    start = np.asarray(start, dtype=np.float64).reshape(-1, 3)
+    end = np.asarray(end, dtype=np.float64).reshape(-1, 3)
+    center = np.asarray(center, dtype=np.float64).reshape(-1, 2)
+    clockwise = np.asarray(clockwise, dtype=bool)
+
+    rx, ry = start[:, 0] - center[:, 0], start[:, 1] - center[:, 1]
+    radius = np.hypot(rx, ry)
+    a0 = np.arctan2(ry, rx)
+    a1 = np.arctan2(end[:, 1] - center[:, 1], end[:, 0] - center[:, 0])
+    # Smer: G2 ide u minus, G3 u plus; isti pocetak i kraj = pun krug
+    a1 = np.where(clockwise & (a1 >= a0), a1 - 2 * np.pi, a1)
+    a1 = np.where(~clockwise & (a1 <= a0), a1 + 2 * np.pi, a1)
+    sweep = a1 - a0
+
+    steps = arc_steps(radius, sweep, tolerance)
+    n_pts = steps + 1
+    arc_idx = np.repeat(np.arange(len(steps)), n_pts)
+    first = np.cumsum(n_pts) - n_pts
+    j = np.arange(n_pts.sum()) - first[arc_idx]
+    frac = j / np.maximum(steps, 1)[arc_idx]
+
+    theta = a0[arc_idx] + frac * sweep[arc_idx]
+    points = np.empty((len(j), 3))
+    points[:, 0] = center[arc_idx, 0] + radius[arc_idx] * np.cos(theta)
+    points[:, 1] = center[arc_idx, 1] + radius[arc_idx] * np.sin(theta)
+    points[:, 2] = start[arc_idx, 2] + frac * (end[arc_idx, 2] - start[arc_idx, 2])
+    # Krajnje tacke tacno kao u programu (bez greske cos/sin)
+    points[first] = start
+    points[first + steps] = np.where(steps[:, None] > 0, end, start)
+    return steps, points
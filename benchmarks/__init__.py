@@ -0,0 +1 @@
+"""Benchmark-i bez GUI-ja: generators.py pravi programe, run.py meri faze (python -m benchmarks.run)."""
@@ -0,0 +1,40 @@
+"""
+Skaliranje parse_parallel od 1 do N procesa (i provera da je rezultat isti kao parse_file).
+
+    python benchmarks/bench_parse_parallel.py [broj_linija] [max_procesa]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import multi_tool
+from parser import SimpleParser
+
+COLUMNS = ('start', 'end', 'types', 'tools', 'source_lines', 'dist_end')
+
+
+def write_program(path, n_lines):
+    with open(path, 'w') as f: f.write(multi_tool(n_lines))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.nc")
+        write_program(path, n)
+        parser = SimpleParser()
+        t = time.perf_counter(); ref = parser.parse_file(path); base = time.perf_counter() - t
+        print(f"{n} lines, {len(ref)} segments, cpu_count={os.cpu_count()}")
+        print(f"parse_file        : {base:7.2f} s")
+        workers = 1
+        while workers <= max_workers:
+            t = time.perf_counter(); path_data = parser.parse_parallel(path, workers); el = time.perf_counter() - t
+            same = all(np.array_equal(getattr(ref, c), getattr(path_data, c)) for c in COLUMNS)
+            print(f"parse_parallel({workers:2d}): {el:7.2f} s  speedup {base / el:5.2f}x  identical={same}")
+            workers *= 2
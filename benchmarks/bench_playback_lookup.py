@@ -0,0 +1,34 @@
+"""
+Trazenje pozicije alata za animaciju: stara linearna pretraga vs. binarna (Toolpath.position_at).
+
+    python benchmarks/bench_playback_lookup.py [broj_linija]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import simple_program
+from parser import SimpleParser
+
+
+def linear_lookup(path, target_dist):
+    # Stari MainWindow.get_pos_and_tool_at_distance (lista recnika)
+    for seg in path:
+        if seg['dist_start'] <= target_dist <= seg['dist_end']:
+            return seg
+    return path[-1]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    path = SimpleParser().parse(simple_program(n))
+    dicts = list(path)
+    print(f"segments: {len(path)}")
+    for frac in (0.01, 0.5, 0.99):
+        d = path.total_length * frac
+        reps = 5
+        lin = timeit.timeit(lambda: linear_lookup(dicts, d), number=reps) / reps
+        fast = timeit.timeit(lambda: path.position_at(d), number=20000) / 20000
+        print(f"playhead {frac:4.0%}: linear {lin * 1e3:9.3f} ms   position_at {fast * 1e6:6.2f} us")
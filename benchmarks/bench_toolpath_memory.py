@@ -0,0 +1,34 @@
+"""
+Memorija po segmentu: stara lista recnika vs. kolonski Toolpath.
+
+    python benchmarks/bench_toolpath_memory.py [broj_linija]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import simple_program
+from parser import SimpleParser
+
+
+def measure(fn):
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    text = simple_program(n)
+    parser = SimpleParser()
+    path, toolpath_bytes = measure(lambda: parser.parse(text))
+    # Stari format: jedan recnik (sa tuple start/end) po segmentu
+    _, dict_bytes = measure(lambda: list(path))
+    segs = len(path)
+    print(f"segments:            {segs}")
+    print(f"list of dicts:       {dict_bytes / segs:8.1f} B/segment  ({dict_bytes / 1e6:.1f} MB)")
+    print(f"Toolpath (columnar): {toolpath_bytes / segs:8.1f} B/segment  ({toolpath_bytes / 1e6:.1f} MB)")
@@ -0,0 +1,89 @@
+"""
+Deterministicki generatori G-koda za benchmark-e (isti ulaz za isti broj linija, bez random seme).
+
+    pocketing(n)   -> dzepovi: ugnezdene konture sa mnogo G2/G3 lukova
+    surfacing(n)   -> 3D povrsina: mnogo kratkih G1 sa promenljivim Z
+    drilling(n)    -> mreza rupa G81/G83 ciklusima
+    multi_tool(n)  -> vise alata, smena alata, mesavina svega gore
+"""
+import math
+
+WORKLOADS = ('pocketing', 'surfacing', 'drilling', 'multi_tool')
+
+
+def header(tool=1, spindle=12000):
+    return ["%", "(PYNC BENCHMARK)", "G21 G90 G17", f"T{tool} M6", f"S{spindle} M3", "G0 Z5.000"]
+
+
+def pocketing(n_lines):
+    """Pravougaoni dzepovi sa zaobljenim uglovima: 4 prave + 4 luka po konturi, konture ka unutra."""
+    out = header(1)
+    pocket = 0
+    while len(out) < n_lines:
+        ox, oy = (pocket % 8) * 60.0, (pocket // 8) * 60.0
+        out += [f"G0 X{ox + 5:.3f} Y{oy + 25:.3f}", f"G1 Z{-1.0 - (pocket % 3) * 0.5:.3f} F400"]
+        for ring in range(10):
+            r = 5.0 - ring * 0.4; a, b = ox + 5 + ring * 2.0, oy + 5 + ring * 2.0; w = 50 - ring * 4.0
+            out += [f"G1 X{a:.3f} Y{b + r:.3f} F1200",
+                    f"G1 X{a:.3f} Y{b + w - r:.3f}", f"G2 X{a + r:.3f} Y{b + w:.3f} I{r:.3f} J0",
+                    f"G1 X{a + w - r:.3f}", f"G2 X{a + w:.3f} Y{b + w - r:.3f} I0 J{-r:.3f}",
+                    f"G1 Y{b + r:.3f}", f"G2 X{a + w - r:.3f} Y{b:.3f} I{-r:.3f} J0",
+                    f"G1 X{a + r:.3f}", f"G2 X{a:.3f} Y{b + r:.3f} I0 J{r:.3f}"]
+        out.append("G0 Z5.000")
+        pocket += 1
+    return "\n".join(out[:n_lines] + ["M30"])
+
+
+def surfacing(n_lines):
+    """Cik-cak 3D povrsina z = f(x, y), korak 0.2 mm: milioni kratkih G1 za veliko n."""
+    out = header(2) + ["G0 X0 Y0", "G1 Z0 F2000"]
+    row_points = 500
+    i = 0
+    while len(out) < n_lines:
+        row, k = divmod(i, row_points)
+        x = (k if row % 2 == 0 else row_points - 1 - k) * 0.2
+        y = row * 0.5
+        z = -2.0 + math.sin(x * 0.05) * math.cos(y * 0.07)
+        out.append(f"G1 X{x:.3f} Y{y:.3f} Z{z:.4f}")
+        i += 1
+    return "\n".join(out[:n_lines] + ["M30"])
+
+
+def drilling(n_lines):
+    """Mreza rupa: G81 i G83 ciklusi sa R ravni."""
+    out = header(3, 3000)
+    i = 0
+    while len(out) < n_lines:
+        x, y = (i % 100) * 4.0, (i // 100) * 4.0
+        cycle = "G83" if (i // 100) % 2 else "G81"
+        out.append(f"{cycle} X{x:.3f} Y{y:.3f} Z{-5.0 - (i % 5):.3f} R2.000 F150")
+        i += 1
+    return "\n".join(out[:n_lines] + ["G80", "M30"])
+
+
+def multi_tool(n_lines):
+    """Vise operacija (dzep, povrsina, busenje) sa smenom alata na svakih ~20000 linija."""
+    out = []
+    generators = (pocketing, surfacing, drilling)
+    block = 20000
+    op = 0
+    while len(out) < n_lines:
+        size = min(block, n_lines - len(out))
+        lines = generators[op % 3](size).split("\n")[:-1]  # bez M30
+        if len(lines) > 3: lines[3] = f"T{op % 6 + 1} M6"
+        out += lines
+        op += 1
+    return "\n".join(out + ["M30"])
+
+
+def simple_program(n_lines):
+    """Mesavina G1 i G3 (raniji generator iz pojedinacnih benchmark skripti)."""
+    out = ["G0 Z5", "G1 Z-1 F800"]
+    for i in range(n_lines):
+        if i % 10 == 9: out.append(f"G3 X{i*0.1:.3f} Y{(i%200)*0.5:.3f} I0.5 J0")
+        else: out.append(f"G1 X{i*0.1:.3f} Y{(i%200)*0.5:.3f} Z{-(i%7)*0.01:.3f}")
+    return "\n".join(out)
+
+
+def generate(workload, n_lines):
+    return globals()[workload](n_lines)
@@ -0,0 +1,200 @@
+"""
+Benchmark svih faza bez GUI-ja nad deterministickim programima (benchmarks/generators.py).
+
+    python -m benchmarks.run                                  (svi programi, sve faze)
+    python -m benchmarks.run --scale 5 --stages parse scan    (5x veci programi, samo neke faze)
+    python -m benchmarks.run -o results.json                  (sacuvaj rezultat)
+    python -m benchmarks.run --baseline results.json          (uporedi; exit 1 ako je nesto sporije)
+    python -m benchmarks.run --workloads surfacing --scale 5 --stages transform transform_file   (1M linija)
+
+Za svaku fazu: najbolje vreme od --repeat ponavljanja, linija/s, segmenata/s i vrsno
+zauzece memorije (tracemalloc, poseban prolaz da ne kvari merenje vremena).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.generators import WORKLOADS, generate
+
+# Broj linija po programu za --scale 1
+SIZES = {'pocketing': 50000, 'surfacing': 200000, 'drilling': 20000, 'multi_tool': 100000}
+STAGES = ('lex', 'parse', 'parse_file', 'arcs', 'scan', 'modify_values', 'swap_axes', 'transform', 'transform_file',
+          'renumber_file', 'dxf_export', 'playback', 'cycle_time', 'stock', 'collision')
+# Slozena transformacija (ogledalo + mm -> inch + pomeraj) za transform / transform_file
+TRANSFORM = ['mirror_x', 'mm_to_inch', ('shift', (10.0, 5.0, 0.0))]
+PLAYBACK_LOOKUPS = 10000
+TOOL_LIBRARY = {str(t): 10.0 for t in range(1, 5)}
+MACHINE_LIMITS = (500.0, 500.0, 100.0)
+DEFAULT_THRESHOLD = 1.25
+
+
+class Workload:
+    """Tekst programa, fajl na disku i (jednom) isparsirana putanja za faze kojima treba."""
+
+    def __init__(self, name, n_lines, tmpdir):
+        self.name = name
+        self.text = generate(name, n_lines)
+        self.n_lines = self.text.count('\n') + 1
+        self.filepath = os.path.join(tmpdir, name + '.nc')
+        with open(self.filepath, 'w') as f: f.write(self.text)
+        self.dxf_path = os.path.join(tmpdir, name + '.dxf')
+        from parser import SimpleParser
+        self.path = SimpleParser().parse(self.text)
+
+
+def make_stage(stage, w):
+    """Vraca (funkcija_bez_argumenata, broj_segmenata) za fazu nad programom w."""
+    from lexer import lex, lex_cached
+    from parser import ModalState, SimpleParser, blocks_from_words
+    if stage == 'lex':
+        return (lambda: lex(w.text)), 0
+    if stage == 'parse':
+        def run(): lex_cached.cache_clear(); return SimpleParser().parse(w.text)
+        return run, len(w.path)
+    if stage == 'parse_file':
+        return (lambda: SimpleParser().parse_file(w.filepath)), len(w.path)
+    if stage == 'arcs':
+        from arcs import tessellate_arcs
+        from toolpath import TYPE_CODES
+        kinds, _, _, _, start, end, ij, _ = blocks_from_words(lex(w.text), ModalState()).arrays()
+        arc = np.isin(kinds, (TYPE_CODES['G2'], TYPE_CODES['G3']))
+        args = (start[arc], end[arc], start[arc][:, :2] + ij[arc], kinds[arc] == TYPE_CODES['G2'])
+        n_chords = int(tessellate_arcs(*args)[0].sum()) if arc.any() else 0
+        return (lambda: tessellate_arcs(*args)), n_chords
+    if stage == 'scan':
+        from smart_scan import scan
+        def run(): lex_cached.cache_clear(); return scan(w.text, TOOL_LIBRARY, MACHINE_LIMITS).issues()
+        return run, len(w.path)
+    if stage == 'modify_values':
+        from transforms import CodeTransformer
+        return (lambda: CodeTransformer.modify_values(w.text, multipliers={'X': -1, 'I': -1})), 0
+    if stage == 'swap_axes':
+        from transforms import CodeTransformer
+        return (lambda: CodeTransformer.swap_axes_custom(w.text)), 0
+    if stage == 'transform':
+        from transforms import plan_for
+        return (lambda: plan_for(TRANSFORM).apply(w.text)), 0
+    if stage == 'transform_file':
+        from transforms import plan_for
+        out = w.filepath + '.out'
+        return (lambda: plan_for(TRANSFORM).apply_file(w.filepath, out)), 0
+    if stage == 'renumber_file':
+        from transforms import renumber_file
+        out = w.filepath + '.out'
+        return (lambda: renumber_file(w.filepath, out)), 0
+    if stage == 'dxf_export':
+        from dxf_exporter import DXFExporter
+        return (lambda: DXFExporter().export(w.dxf_path, w.path)), len(w.path)
+    if stage == 'playback':
+        dists = np.linspace(0.0, w.path.total_length, PLAYBACK_LOOKUPS).tolist()
+        def run():
+            for d in dists: w.path.position_at(d)
+        return run, 0
+    if stage == 'cycle_time':
+        from cycle_time import MachineDynamics, estimate_cycle_time
+        dynamics = MachineDynamics([10000.0] * 3, [500.0, 500.0, 300.0], rapid_feed=10000.0)
+        return (lambda: estimate_cycle_time(w.path, dynamics)), len(w.path)
+    if stage == 'stock':
+        from stock_sim import StockSimulator, tool_shapes
+        shapes = tool_shapes(TOOL_LIBRARY)
+        return (lambda: StockSimulator(w.path, shapes).run()), len(w.path)
+    if stage == 'collision':
+        from collision import check_collisions
+        from stock_sim import tool_shapes
+        shapes = tool_shapes(TOOL_LIBRARY)
+        return (lambda: check_collisions(w.path, shapes)), len(w.path)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def measure(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(workloads=WORKLOADS, stages=STAGES, scale=1.0, repeat=3, log=print):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in workloads:
+            w = Workload(name, max(int(SIZES[name] * scale), 10), tmp)
+            log(f"{name}: {w.n_lines} lines, {len(w.path)} segments")
+            for stage in stages:
+                fn, segments = make_stage(stage, w)
+                seconds, peak = measure(fn, repeat)
+                r = {'lines': w.n_lines, 'segments': segments, 'seconds': seconds, 'peak_mb': peak / 1e6}
+                if stage == 'playback': r['lookups_per_s'] = PLAYBACK_LOOKUPS / seconds
+                else: r['lines_per_s'] = w.n_lines / seconds
+                if segments: r['segments_per_s'] = segments / seconds
+                results[f"{name}/{stage}"] = r
+                log(f"  {stage:14s} {seconds:8.3f} s  {format_rate(r):>24s}  peak {r['peak_mb']:8.1f} MB")
+    return results
+
+
+def format_rate(r):
+    if 'lookups_per_s' in r: return f"{r['lookups_per_s']:,.0f} lookups/s"
+    return f"{r['lines_per_s']:,.0f} lines/s"
+
+
+def environment(scale, repeat):
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'scale': scale, 'repeat': repeat,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, log=print):
+    """Poredi vremena sa baseline-om; vraca listu kljuceva koji su sporiji od threshold puta."""
+    regressions = []
+    log(f"\n{'benchmark':30s} {'baseline':>10s} {'now':>10s} {'ratio':>7s}")
+    for key, r in results.items():
+        old = baseline.get(key)
+        if not old: continue
+        ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        flag = "  SLOWER" if ratio > threshold else ("  faster" if ratio < 1 / threshold else "")
+        log(f"{key:30s} {old['seconds']:10.3f} {r['seconds']:10.3f} {ratio:7.2f}{flag}")
+        if ratio > threshold: regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="benchmarks.run", description="PyNC Viewer headless benchmarks.")
+    ap.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    ap.add_argument("--scale", type=float, default=1.0, help="multiplier for program sizes (default 1)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per stage, best is reported")
+    ap.add_argument("-o", "--output", help="write results as JSON")
+    ap.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown ratio counted as regression")
+    args = ap.parse_args(argv)
+
+    results = run_benchmarks(args.workloads, args.stages, args.scale, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(args.scale, args.repeat), 'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+        if baseline.get('environment', {}).get('scale') != args.scale:
+            print("warning: baseline was recorded with a different --scale")
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Provera sudara sa sirovinom u toku obrade (stock_sim): brzi hodovi (G0) kroz materijal koji
+jos nije skinut i drska alata (iznad duzine reznog dela) tokom rezanja.
+
+    from collision import check_collisions
+    report = check_collisions(path, tool_shapes(settings['tool_library']))
+    report.hits()      -> [{'line', 'segment', 'kind', 'depth'}], kind je 'rapid' ili 'shank'
+
+Sirovina se rece redom kao u StockSimulator, ali lenjo: segment se proverava prvo protiv
+TileMax mreze (najvisa tacka sirovine po bloku TILE x TILE celija). Starija sirovina ima
+samo vise materijala, pa segment koji prolazi proveru nad njom sigurno nema sudar i ne
+zahteva rezanje. Tek kada provera ne prodje, radi se tacna provera nad mapom visina (rezovi
+koji jos cekaju racunaju se lokalno, ili se sve do tog segmenta odsece):
+  - G0: dubina je najvise materijala koje bi alat skinuo (Stock.segment_surface),
+  - drska: prva tacka putanje cija kontura (disk) pokriva celiju vidi celiju pre rezanja,
+    pa je dubina visina celije iznad vrha + duzina reznog dela u toj tacki.
+Profil alata se bocno suzava za SLACK_CELLS celija, da razlika u uzorkovanju izmedju
+reza i provere (vrh se zaokruzuje na celiju) ne daje lazne sudare.
+"""
+import math
+
+import numpy as np
+
+from profiling import traced
+from stock_sim import PROFILE_BANDS, StockSimulator, erode, erode_plan, sample_segments
+from toolpath import TYPE_CODES
+
+# Celije po strani bloka TileMax mreze
+TILE = 16
+# Manji prodori (mm) se ne prijavljuju
+TOLERANCE = 0.01
+# Bocno suzenje profila alata pri proveri (u celijama)
+SLACK_CELLS = 1.5
+# Segmenti po jednoj proveri nad TileMax mrezom
+BLOCK_SEGMENTS = 65536
+# Cena reza po segmentu prema erodiranju: jedna celija segment_surface ~ EXACT_CELL_COST celija
+# jednog prolaza erodiranja, plus fiksni trosak po segmentu (izmereno, ravno i kuglasto glodalo)
+EXACT_CELL_COST = 10
+EXACT_SEGMENT_COST = 50_000
+# Najvise rezova koji cekaju a koji se za proveru G0 racunaju lokalno (local_heights)
+LOCAL_SEGMENTS = 4
+# Najvise segmenata koji cekaju rez pre provere G0 (preko toga se prvo rece)
+PENDING_SEGMENTS = 4096
+
+
+class TileMax:
+    """Najvisa tacka sirovine po bloku celija; prosirene (dilate) mreze se pamte do sledeceg update-a."""
+
+    def __init__(self, stock, tile=TILE):
+        self.stock = stock; self.tile = tile
+        self.size = tile * stock.cell
+        self.max = np.full((-(-stock.ny // tile), -(-stock.nx // tile)), -np.inf, dtype=np.float32)
+        self.dilated = {}
+        self.update((0, stock.ny, 0, stock.nx))
+
+    def update(self, dirty):
+        """Preracunava blokove koji seku promenjeni opseg celija (r0, r1, c0, c1)."""
+        if dirty is None: return
+        r0, r1, c0, c1 = dirty; t = self.tile
+        tr0, tr1, tc0, tc1 = r0 // t, -(-r1 // t), c0 // t, -(-c1 // t)
+        h = self.stock.heights[tr0 * t:tr1 * t, tc0 * t:tc1 * t]
+        pad = np.full(((tr1 - tr0) * t, (tc1 - tc0) * t), -np.inf, dtype=np.float32)
+        pad[:h.shape[0], :h.shape[1]] = h
+        self.max[tr0:tr1, tc0:tc1] = pad.reshape(tr1 - tr0, t, tc1 - tc0, t).max(axis=(1, 3))
+        self.dilated.clear()
+
+    def dilate(self, k):
+        """Maksimum po okolini (2k+1) x (2k+1) blokova."""
+        if k not in self.dilated:
+            out = self.max
+            for axis in (0, 1):
+                src = out; out = src.copy(); n = src.shape[axis]
+                for d in range(1, min(k, n - 1) + 1):
+                    a, b = [slice(None)] * 2, [slice(None)] * 2
+                    a[axis], b[axis] = slice(d, None), slice(None, -d)
+                    np.maximum(out[tuple(a)], src[tuple(b)], out=out[tuple(a)])
+                    np.maximum(out[tuple(b)], src[tuple(a)], out=out[tuple(b)])
+            self.dilated[k] = out
+        return self.dilated[k]
+
+    def max_near(self, points, reach):
+        """Gornja granica visine sirovine na rastojanju do 'reach' (mm) od tacaka (N, 2+)."""
+        grid = self.dilate(int(math.ceil(reach / self.size)))
+        tx = np.clip(np.floor((points[:, 0] - self.stock.x0) / self.size), 0, grid.shape[1] - 1).astype(np.int64)
+        ty = np.clip(np.floor((points[:, 1] - self.stock.y0) / self.size), 0, grid.shape[0] - 1).astype(np.int64)
+        return grid[ty, tx]
+
+
+class CollisionReport:
+    """Sudari po segmentu (najveca dubina); segments, lines (indeks linije), depths, rapid (bool)."""
+
+    def __init__(self, path, segments, depths, rapid):
+        order = np.argsort(segments, kind='stable')
+        self.segments = np.asarray(segments, dtype=np.int64)[order]
+        self.depths = np.asarray(depths, dtype=np.float64)[order]
+        self.rapid = np.asarray(rapid, dtype=bool)[order]
+        self.lines = path.source_lines[self.segments].astype(np.int64)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def line_depths(self, n_lines, kind):
+        """Najveca dubina sudara po liniji programa (0 gde ga nema) za kind 'rapid' ili 'shank'."""
+        out = np.zeros(n_lines, dtype=np.float64)
+        mask = (self.rapid == (kind == 'rapid')) & (self.lines < n_lines)
+        np.maximum.at(out, self.lines[mask], self.depths[mask])
+        return out
+
+    def hits(self):
+        return [{'line': int(line) + 1, 'segment': int(seg), 'kind': 'rapid' if rapid else 'shank', 'depth': float(depth)}
+                for seg, line, depth, rapid in zip(self.segments, self.lines, self.depths, self.rapid)]
+
+
+def z_chunks(z, limit):
+    """Uzastopni delovi [a, b) niza z u kojima je razlika najvise i najnize tacke <= limit."""
+    a, n = 0, len(z)
+    while a < n:
+        window = 1024
+        while True:
+            b = min(a + window, n); part = z[a:b]
+            over = np.flatnonzero(np.maximum.accumulate(part) - np.minimum.accumulate(part) > limit)
+            if len(over): b = a + int(over[0]); break
+            if b == n: break
+            window *= 4
+        yield a, b
+        a = b
+
+
+class CollisionChecker:
+    """Jedan prolaz kroz putanju; sirovina (sim.stock) na kraju je stanje posle poslednjeg proverenog segmenta."""
+
+    def __init__(self, path, shapes, default_shape=None, stock=None, tolerance=TOLERANCE):
+        self.path = path
+        self.sim = StockSimulator(path, shapes, default_shape, stock)
+        self.stock = self.sim.stock
+        self.tiles = TileMax(self.stock)
+        self.tolerance = tolerance
+        self.slack = SLACK_CELLS * self.stock.cell
+        self.rapid = path.types == TYPE_CODES['G0']
+        self.radii = np.array([self.sim.shape_for(t).radius for t in range(int(path.tools.max(initial=0)) + 1)])[path.tools]
+        self.hit_segments, self.hit_depths = [], []
+
+    def flute_lengths(self, tools):
+        lengths = np.empty(len(tools), dtype=np.float64)
+        for tool in np.unique(tools).tolist(): lengths[tools == tool] = self.sim.shape_for(tool).flute_length
+        return lengths
+
+    def suspects(self):
+        """Segmenti koji silaze dovoljno nisko da uopste mogu da udare (G0 ispod sirovine, drska ispod vrha)."""
+        path = self.path
+        low = np.minimum(path.start[:, 2], path.end[:, 2])
+        low = np.where(self.rapid, low, low + self.flute_lengths(path.tools))
+        # Povratak pravo gore: mapa visina nema prepuste, a prethodni segment je vec ocistio mesto alata
+        retract = self.rapid & (path.start[:, 0] == path.end[:, 0]) & (path.start[:, 1] == path.end[:, 1]) & \
+                  (path.end[:, 2] >= path.start[:, 2])
+        retract[:1] = False
+        return np.flatnonzero((low < self.stock.top - self.tolerance) & ~retract)
+
+    def tile_fail(self, segs):
+        """Segmenti (rastuci indeksi) koje TileMax mreza ne moze da oslobodi sudara."""
+        path = self.path; spacing = self.tiles.size
+        start, end = path.start[segs], path.end[segs]
+        delta = end - start
+        # Najnizi vrh izmedju susednih uzoraka: pola koraka po Z ispod uzorka
+        dz_half = np.abs(delta[:, 2]) / (2 * np.maximum(np.ceil(np.hypot(delta[:, 0], delta[:, 1]) / spacing), 1))
+        tools = path.tools[segs]
+        level = np.where(self.rapid[segs], 0.0, self.flute_lengths(tools)) - dz_half + self.tolerance
+        fail = np.zeros(len(segs), dtype=bool)
+        for local, points in sample_segments(start, end, spacing):
+            seg_tools = tools[local]
+            for tool in np.unique(seg_tools).tolist():
+                sel = seg_tools == tool
+                near = self.tiles.max_near(points[sel], self.sim.shape_for(tool).radius + spacing / 2)
+                bad = near > points[sel, 2] + level[local[sel]]
+                fail[local[sel][bad]] = True
+        return segs[fail]
+
+    def exact_cheaper(self, start, end, shape):
+        """Procena: da li je rez segment po segment (segment_surface) jeftiniji od erodiranja regiona."""
+        cell = self.stock.cell; half = int(math.ceil(shape.radius / cell))
+        region = self.stock.region(start, end, half)
+        if region is None: return True
+        r0, r1, c0, c1 = region
+        passes = len(erode_plan(tuple(shape.bands(cell)), half))
+        length = np.hypot(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+        swept = float(np.sum((length + 2 * shape.radius) * 2 * shape.radius)) / (cell * cell)
+        return swept * EXACT_CELL_COST + len(start) * EXACT_SEGMENT_COST < (r1 - r0) * (c1 - c0) * passes
+
+    def flush(self, first):
+        """
+        Odseca rezove koji cekaju, do 'first' (po alatu, redosled ne menja minimum); G0 bez sudara
+        ne skidaju materijal. Vraca da li se sirovina promenila.
+        """
+        done = self.sim.done
+        if done >= first: return False
+        path, stock = self.path, self.stock
+        segs = done + np.flatnonzero(~self.rapid[done:first])
+        tools = path.tools[segs]
+        for tool in np.unique(tools).tolist():
+            sel = segs[tools == tool]; shape = self.sim.shape_for(tool)
+            start, end = path.start[sel], path.end[sel]
+            if not self.exact_cheaper(start, end, shape): stock.cut(start, end, shape); continue
+            for a, b in zip(start, end):
+                swept = stock.segment_surface(a, b, shape)
+                if swept is not None: stock.apply(*swept)
+        self.sim.done = first
+        self.tiles.update(stock.take_dirty())
+        return True
+
+    def slack_for(self, shape):
+        # Alat manji od par celija se suzava najvise na pola radijusa
+        return min(self.slack, shape.radius / 2)
+
+    def tolerance_for(self, shape):
+        # Rez erodiranjem zaokruzuje zaobljeni deo profila na stepenike (stock_sim.PROFILE_BANDS)
+        return self.tolerance + shape.corner_radius / (2 * PROFILE_BANDS)
+
+    def hits_of(self, first, depths):
+        tools = self.path.tools[first:first + len(depths)]
+        limit = np.array([self.tolerance_for(self.sim.shape_for(t)) for t in tools.tolist()])
+        return depths > limit
+
+    def any_hit(self, first, depths):
+        return bool(self.hits_of(first, depths).any())
+
+    def record(self, first, depths):
+        hit = np.flatnonzero(self.hits_of(first, depths))
+        self.hit_segments.append(first + hit); self.hit_depths.append(depths[hit])
+
+    def hot_pieces(self, i, shape):
+        """Delovi segmenta i (start, end) kod kojih TileMax ne iskljucuje materijal iznad alata."""
+        path, spacing = self.path, self.tiles.size
+        a, b = path.start[i], path.end[i]
+        n = max(int(math.ceil(math.hypot(*(b - a)[:2]) / spacing)), 1)
+        points = a + (b - a) * np.linspace(0.0, 1.0, n + 1)[:, None]
+        hot = self.tiles.max_near(points, shape.radius + spacing / 2) > points[:, 2] - abs(b[2] - a[2]) / (2 * n) + self.tolerance
+        hot = hot[:-1] | hot[1:]
+        # Uzastopni vreli delovi se spajaju u jedan
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], hot.astype(np.int8), [0]))))
+        return [(points[k0], points[k1]) for k0, k1 in zip(edges[::2].tolist(), edges[1::2].tolist())]
+
+    def local_heights(self, region, first):
+        """Visine u regionu kao da su rezovi koji cekaju (pre 'first') vec odseceni; G0 se preskacu."""
+        r0, r1, c0, c1 = region; stock, path = self.stock, self.path
+        heights = stock.heights[r0:r1, c0:c1]
+        done = self.sim.done
+        if done >= first: return heights
+        x0, x1 = stock.x0 + c0 * stock.cell, stock.x0 + c1 * stock.cell
+        y0, y1 = stock.y0 + r0 * stock.cell, stock.y0 + r1 * stock.cell
+        start, end = path.start[done:first], path.end[done:first]
+        reach = self.radii[done:first]
+        near = ~self.rapid[done:first] & \
+               (np.minimum(start[:, 0], end[:, 0]) - reach < x1) & (np.maximum(start[:, 0], end[:, 0]) + reach > x0) & \
+               (np.minimum(start[:, 1], end[:, 1]) - reach < y1) & (np.maximum(start[:, 1], end[:, 1]) + reach > y0)
+        near = done + np.flatnonzero(near)
+        # Vise rezova u blizini: jeftinije je jednom odseci sve sto ceka nego ih racunati za svaki G0
+        if len(near) > LOCAL_SEGMENTS: self.flush(first); return stock.heights[r0:r1, c0:c1]
+        for j in near.tolist():
+            swept = stock.segment_surface(path.start[j], path.end[j], self.sim.shape_for(path.tools[j]), region=region)
+            if swept is not None: heights = np.minimum(heights, swept[1])
+        return heights
+
+    def rapid_depths(self, first, last, cut=False):
+        """
+        Dubina prodora G0 [first, last) u sirovinu (segment_surface suzenog alata), samo na delovima
+        koje TileMax ne iskljucuje. Rezovi koji cekaju se uracunavaju lokalno (local_heights).
+        Sa cut=True segment koji udari skida materijal pre provere sledeceg (posle sudara ga vise nema).
+        """
+        path, stock = self.path, self.stock
+        depths = np.zeros(last - first, dtype=np.float64)
+        for i in range(first, last):
+            shape = self.sim.shape_for(path.tools[i])
+            slack = self.slack_for(shape); half = int(math.ceil((shape.radius - slack) / stock.cell))
+            for p, q in self.hot_pieces(i, shape):
+                window = stock.region(p[None], q[None], half)
+                swept = None if window is None else stock.segment_surface(p, q, shape, slack, window, upper=True)
+                if swept is None: continue
+                depths[i - first] = max(depths[i - first], float(np.max(self.local_heights(window, first) - swept[1])))
+            if cut and depths[i - first] > self.tolerance_for(shape):
+                swept = stock.segment_surface(path.start[i], path.end[i], shape)
+                if swept is not None: stock.apply(*swept)
+        return depths
+
+    def shank_depths(self, first, last):
+        """
+        Rezanje [first, last) jednog alata: drska je valjak iznad vrha + duzina reznog dela.
+        Uzorci se dele na delove sa razlikom visine <= duzina reznog dela - radijus ugla, pa
+        celiju unutar dela pre prvog alata koji je pokriva nije mogao da skine niko drugi.
+        """
+        path, stock, cell = self.path, self.stock, self.stock.cell
+        shape = self.sim.shape_for(path.tools[first])
+        length = shape.flute_length; radius = shape.radius - self.slack_for(shape)
+        # (alat sa radijusom ugla vecim od pola reznog dela nije realan; tada se deli na pola duzine)
+        limit = max(length - shape.corner_radius, length / 2, cell)
+        depths = np.zeros(last - first, dtype=np.float64)
+        previous = None
+        for local, points in sample_segments(path.start[first:last], path.end[first:last], cell, max(length / 2, cell)):
+            for a, b in z_chunks(points[:, 2], limit):
+                part = points[a:b]
+                if radius > 0:
+                    half = int(math.ceil(radius / cell))
+                    region = stock.region(part, part, half)
+                    if region is not None:
+                        r0, r1, c0, c1 = region
+                        # Redni broj uzorka umesto Z: erodiranje ravnim diskom daje prvi uzorak koji pokriva celiju
+                        order = part.copy(); order[:, 2] = np.arange(len(part))
+                        index = np.full((r1 - r0 + 2 * half, c1 - c0 + 2 * half), np.inf, dtype=np.float32)
+                        stock.rasterize(index, order, region, half)
+                        cover = erode(index, half, [(radius / cell, 0.0)])
+                        rows, cols = np.nonzero(np.isfinite(cover))
+                        firsts = cover[rows, cols].astype(np.int64)
+                        over = stock.heights[r0 + rows, c0 + cols] - (part[firsts, 2] + length)
+                        hit = over > self.tolerance
+                        np.maximum.at(depths, local[a + firsts[hit]], over[hit])
+                # Posle provere deo se rece (izlomljena linija kroz uzorke, sa vezom na prethodni deo)
+                line = part if previous is None else np.concatenate(([previous], part))
+                if len(line) == 1: line = np.concatenate((line, line))
+                stock.cut(line[:-1], line[1:], shape)
+                previous = part[-1]
+        return depths
+
+    def run(self, cancel=None):
+        path = self.path
+        suspects = self.suspects()
+        for b0 in range(0, len(suspects), BLOCK_SEGMENTS):
+            if cancel is not None: cancel.check()
+            failing = self.tile_fail(suspects[b0:b0 + BLOCK_SEGMENTS])
+            if not len(failing): continue
+            # Nizovi uzastopnih segmenata iste vrste i istog alata
+            breaks = (np.diff(failing) != 1) | (self.rapid[failing[1:]] != self.rapid[failing[:-1]]) | \
+                     (path.tools[failing[1:]] != path.tools[failing[:-1]])
+            edges = np.concatenate(([0], np.flatnonzero(breaks) + 1, [len(failing)]))
+            for a, b in zip(edges[:-1].tolist(), edges[1:].tolist()):
+                if cancel is not None: cancel.check()
+                first, last = int(failing[a]), int(failing[b - 1]) + 1
+                if self.rapid[first]:
+                    # Bez sudara G0 ne menja sirovinu; rezovi koji cekaju se uracunavaju samo lokalno
+                    if first - self.sim.done > PENDING_SEGMENTS: self.flush(first)
+                    if not self.any_hit(first, self.rapid_depths(first, last)): continue
+                    self.flush(first)
+                    self.record(first, self.rapid_depths(first, last, cut=True))
+                else:
+                    self.flush(first)
+                    self.record(first, self.shank_depths(first, last))
+                self.sim.done = last
+                self.tiles.update(self.stock.take_dirty())
+        segments = np.concatenate(self.hit_segments) if self.hit_segments else np.empty(0, dtype=np.int64)
+        depths = np.concatenate(self.hit_depths) if self.hit_depths else np.empty(0)
+        return CollisionReport(path, segments, depths, self.rapid[segments])
+
+
+@traced('collision', lambda report: {'hits': len(report)})
+def check_collisions(path, shapes, default_shape=None, stock=None, tolerance=TOLERANCE, cancel=None):
+    """Sudari G0 i drske alata sa sirovinom koja se skida redom po putanji (CollisionReport)."""
+    return CollisionChecker(path, shapes, default_shape, stock, tolerance).run(cancel)
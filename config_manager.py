@@ -9,6 +9,15 @@ class ConfigManager:
             "machine_size_y": 200.0,
             "machine_size_z": 100.0,
             "rapid_feed": 3000.0,
+            "arc_tolerance": 0.01,
+            # Procena vremena sa ubrzanjem (cycle_time): brzina po osi mm/min, ubrzanje mm/s^2, jerk mm/s^3 (0 = trapez)
+            "motion_planner": True,
+            "axis_max_velocity": [3000.0, 3000.0, 3000.0],
+            "axis_max_acceleration": [500.0, 500.0, 300.0],
+            "max_jerk": 0.0,
+            "junction_deviation": 0.01,
+            "parse_cache_mb": 2048,  # Kes parsiranih fajlova na disku (0 = iskljucen)
+            "large_file_mb": 20,  # Od ove velicine fajl se prikazuje bez QPlainTextEdit-a (large-file mod)
             "default_tool_dia": 10.0,
             "theme": "dark",
             # NOVO: Biblioteka alata (T broj : Precnik)
@@ -17,7 +26,11 @@ class ConfigManager:
                 "2": 5.0,
                 "3": 2.0,
                 "4": 20.0
-            }
+            },
+            # Radijus ugla alata za simulaciju sirovine (0 ravno glodalo, D/2 kuglasto); nema = 0
+            "tool_corner_radius": {},
+            # Duzina reznog dela alata (iznad je drska, Smart Scan proverava sudar); nema = stock_sim.FLUTE_LENGTH
+            "tool_flute_length": {}
         }
 
     def load_config(self):
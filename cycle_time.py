@@ -0,0 +1,233 @@
+"""
+Procena vremena obrade sa ubrzanjem (planer kretanja kao u kontroleru masine).
+
+    from cycle_time import MachineDynamics, estimate_cycle_time
+    cycle = estimate_cycle_time(path, MachineDynamics.from_settings(settings))
+    cycle.total                (minuti, ceo program)
+    cycle.by_tool()            -> {alat: minuti}
+    cycle.operations()         -> [{'tool', 'first_line', 'last_line', 'minutes', 'cutting', 'rapid'}]
+
+Parser racuna vreme kao duzina / feed; na kratkim segmentima (3D povrsine) masina nikad ne
+dostigne zadati feed, pa je stvarno vreme i 2-3 puta duze. Ovde:
+  - brzina i ubrzanje segmenta su najveci koje dozvoljavaju ogranicenja po osama u pravcu segmenta,
+  - brzina u spoju dva segmenta je ogranicena junction deviation modelom (kao grbl),
+  - brzine u spojevima (v^2) prolaze napred (ubrzanje) i nazad (kocenje); rekurzija
+    w[k] = min(c[k], w[k-1] + 2 a L) je min-plus, pa je resenje kumulativni zbir plus
+    np.minimum.accumulate, bez Python petlje po segmentima,
+  - vreme segmenta je trapezni profil, ili sa max_jerk > 0 S-kriva po fazi ubrzanja
+    (brzine u spojevima se i tada planiraju trapezno); S-kriva se racuna po bloku kretanja -
+    nizu kolinearnih nadovezanih segmenata iste brzine - i deli na segmente srazmerno
+    trapeznom vremenu, pa vreme ne zavisi od toga na koliko je segmenata prava podeljena.
+Masina staje na pocetku i kraju programa, pri promeni alata, gde putanja nije neprekidna
+(povratak posle busenja) i na dnu rupe; povratak busenja se racuna kao G0 od stanja mirovanja.
+"""
+import numpy as np
+
+from profiling import traced
+from toolpath import TYPE_CODES
+
+# Segmenti kraci od ovoga (mm) ne ulaze u planiranje
+MIN_LENGTH = 1e-9
+# Koraci polovljenja vrsne brzine kada S-kriva ne stane u segment
+JERK_ITERATIONS = 40
+
+
+class MachineDynamics:
+    """Ogranicenja masine: brzina po osi (mm/min), ubrzanje po osi (mm/s^2), jerk (mm/s^3, 0 = trapez)."""
+
+    def __init__(self, max_velocity, max_acceleration, max_jerk=0.0, junction_deviation=0.01, rapid_feed=None):
+        self.max_velocity = np.maximum(np.asarray(max_velocity, dtype=np.float64).reshape(3), 1e-6)
+        self.max_acceleration = np.maximum(np.asarray(max_acceleration, dtype=np.float64).reshape(3), 1e-6)
+        self.max_jerk = max(float(max_jerk), 0.0)
+        self.junction_deviation = max(float(junction_deviation), 0.0)
+        self.rapid_feed = None if rapid_feed is None else float(rapid_feed)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """None kada je planer iskljucen (vreme ostaje duzina / feed iz parsera)."""
+        if not settings.get('motion_planner', True): return None
+        return cls(settings.get('axis_max_velocity', [settings['rapid_feed']] * 3),
+                   settings.get('axis_max_acceleration', [500.0, 500.0, 300.0]),
+                   settings.get('max_jerk', 0.0), settings.get('junction_deviation', 0.01), settings['rapid_feed'])
+
+    def limits(self, unit):
+        """Najveca brzina (mm/s) i ubrzanje (mm/s^2) u pravcu jedinicnih vektora unit (N, 3)."""
+        a = np.abs(unit)
+        with np.errstate(divide='ignore'):
+            speed = (self.max_velocity / 60.0 / a).min(axis=1)
+            accel = (self.max_acceleration / a).min(axis=1)
+        return speed, accel
+
+
+class CycleTime:
+    """Vreme po segmentu putanje (sekunde) i zbirovi po alatu i operaciji."""
+
+    def __init__(self, path, seconds):
+        self.path = path
+        self.seconds = seconds
+
+    @property
+    def total(self):
+        """Ukupno vreme u minutima (kao SimpleParser.estimated_time)."""
+        return float(self.seconds.sum()) / 60.0
+
+    def time_end(self):
+        """Kumulativno vreme (min) na kraju svakog segmenta."""
+        return np.cumsum(self.seconds) / 60.0
+
+    def by_tool(self):
+        tools, inverse = np.unique(self.path.tools, return_inverse=True)
+        minutes = np.bincount(inverse, weights=self.seconds, minlength=len(tools)) / 60.0
+        return {int(t): float(m) for t, m in zip(tools, minutes)}
+
+    def operations(self):
+        """Operacija je niz segmenata istim alatom (nova pocinje promenom alata); linije su od 1."""
+        n = len(self.path)
+        if not n: return []
+        tools = self.path.tools
+        starts = np.concatenate(([0], np.flatnonzero(tools[1:] != tools[:-1]) + 1))
+        ends = np.concatenate((starts[1:], [n]))
+        rapid = self.path.types == TYPE_CODES['G0']
+        total = np.add.reduceat(self.seconds, starts)
+        fast = np.add.reduceat(np.where(rapid, self.seconds, 0.0), starts)
+        lines = self.path.source_lines
+        return [{'tool': int(tools[s]), 'first_line': int(lines[s]) + 1, 'last_line': int(lines[e - 1]) + 1,
+                 'minutes': float(t) / 60.0, 'cutting': float(t - f) / 60.0, 'rapid': float(f) / 60.0}
+                for s, e, t, f in zip(starts, ends, total, fast)]
+
+
+def junction_limits(unit, accel_of, deviation):
+    """v^2 (mm^2/s^2) u spoju segmenata i i i+1 po junction deviation modelu (inf za pravu liniju)."""
+    u0, u1 = unit[:-1], unit[1:]
+    cos = np.clip(-(u0 * u1).sum(axis=1), -1.0, 1.0)
+    sin_half = np.sqrt(0.5 * (1.0 - cos))
+    # Ubrzanje u pravcu promene brzine u spoju
+    turn = u1 - u0
+    norm = np.sqrt((turn * turn).sum(axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accel = accel_of(turn / norm[:, None])
+        w = accel * deviation * sin_half / (1.0 - sin_half)
+    w[cos <= -1.0 + 1e-9] = np.inf
+    w[cos >= 1.0 - 1e-9] = 0.0
+    return np.nan_to_num(w, nan=np.inf)
+
+
+def plan_velocities(caps, reach):
+    """
+    v^2 u cvorovima 0..n (pocetak, spojevi, kraj) posle prolaza napred i nazad.
+    caps[k] je najvise v^2 u cvoru k, reach[i] = 2 a L segmenta i izmedju cvorova i i i+1.
+    """
+    D = np.concatenate(([0.0], np.cumsum(reach)))
+    forward = D + np.minimum.accumulate(caps - D)
+    E = D[-1] - D
+    backward = E + np.minimum.accumulate((forward - E)[::-1])[::-1]
+    return np.maximum(backward, 0.0)
+
+
+def trapezoid_times(length, v0, v1, vmax, accel):
+    """Vreme (s) trapeznog profila: ubrzanje do vrsne brzine, voznja, kocenje."""
+    peak = np.sqrt(np.minimum(vmax * vmax, (2.0 * accel * length + v0 * v0 + v1 * v1) / 2.0))
+    peak = np.maximum(peak, np.maximum(v0, v1))
+    ramps = (2.0 * peak - v0 - v1) / accel
+    cruise = length - (2.0 * peak * peak - v0 * v0 - v1 * v1) / (2.0 * accel)
+    return ramps + np.maximum(cruise, 0.0) / np.maximum(peak, 1e-12)
+
+
+def ramp_time(dv, accel, jerk):
+    """Vreme promene brzine za dv sa ogranicenim ubrzanjem i jerk-om (S-kriva)."""
+    full = dv * jerk >= accel * accel
+    return np.where(full, dv / accel + accel / jerk, 2.0 * np.sqrt(np.maximum(dv, 0.0) / jerk))
+
+
+def scurve_times(length, v0, v1, vmax, accel, jerk):
+    """Vreme (s) sa S-krivom; vrsna brzina se smanjuje (polovljenjem) dok faze ne stanu u segment."""
+    def ramps(peak):
+        ta, td = ramp_time(peak - v0, accel, jerk), ramp_time(peak - v1, accel, jerk)
+        return ta, td, (v0 + peak) / 2.0 * ta + (peak + v1) / 2.0 * td
+
+    low = np.maximum(v0, v1)
+    high = np.maximum(np.sqrt(np.minimum(vmax * vmax, (2.0 * accel * length + v0 * v0 + v1 * v1) / 2.0)), low)
+    _, _, dist = ramps(high)
+    tight = np.flatnonzero(dist > length)
+    if len(tight):
+        lo, hi, L = low[tight], high[tight], length[tight]
+        a, b = v0[tight], v1[tight]
+        for _ in range(JERK_ITERATIONS):
+            mid = (lo + hi) / 2.0
+            ta, td = ramp_time(mid - a, accel[tight], jerk), ramp_time(mid - b, accel[tight], jerk)
+            fits = (a + mid) / 2.0 * ta + (mid + b) / 2.0 * td <= L
+            lo = np.where(fits, mid, lo); hi = np.where(fits, hi, mid)
+        high[tight] = lo
+    ta, td, dist = ramps(high)
+    cruise = np.maximum(length - dist, 0.0) / np.maximum(high, 1e-12)
+    # Ni sama promena v0 -> v1 ne staje (brzine su planirane trapezno): prosecna brzina
+    fallback = 2.0 * length / np.maximum(v0 + v1, 1e-12)
+    return np.where(dist > length * (1.0 + 1e-9), np.maximum(fallback, ta + td), ta + td + cruise)
+
+
+@traced('cycle_time', lambda cycle: {'segments': len(cycle.seconds)})
+def estimate_cycle_time(path, dynamics):
+    """
+    CycleTime za putanju celog programa (Toolpath) sa ogranicenjima masine (MachineDynamics).
+    Feed segmenta se cita iz time_end parsera (duzina / feed), pa nije potrebna nova kolona.
+    """
+    n = len(path)
+    seconds = np.zeros(n)
+    if not n: return CycleTime(path, seconds)
+    delta = path.end - path.start
+    length = np.sqrt((delta * delta).sum(axis=1))
+    moving = np.flatnonzero(length > MIN_LENGTH)
+    L = length[moving]
+    unit = delta[moving] / L[:, None]
+    vmax, accel = dynamics.limits(unit)
+
+    # Zadata brzina: G0 rapid_feed (ako je zadat), ostalo F = duzina / vreme parsera; bez F samo ogranicenja osa
+    types = path.types[moving]
+    rapid = types == TYPE_CODES['G0']
+    minutes = np.diff(path.time_end, prepend=0.0)[moving]
+    with np.errstate(divide='ignore'):
+        feed = np.where(minutes > 0, L / minutes / 60.0, np.inf)
+    feed[rapid] = dynamics.rapid_feed / 60.0 if dynamics.rapid_feed else np.inf
+    vmax = np.minimum(vmax, feed)
+
+    # Cvor k je spoj segmenata k-1 i k; masina stoji na krajevima i na prekidima putanje
+    caps = np.empty(len(moving) + 1); caps[0] = caps[-1] = 0.0
+    joined = np.zeros(max(len(moving) - 1, 0), dtype=bool)  # Spoj k: segmenti k i k+1 su isti blok kretanja
+    if len(moving) > 1:
+        w = junction_limits(unit, lambda u: dynamics.limits(u)[1], dynamics.junction_deviation)
+        stop = (path.tools[moving][1:] != path.tools[moving][:-1]) | (types[:-1] == TYPE_CODES['DRILL'])
+        gap = path.start[moving][1:] - path.end[moving][:-1]
+        stop |= (gap * gap).sum(axis=1) > MIN_LENGTH
+        straight = (unit[:-1] * unit[1:]).sum(axis=1) >= 1.0 - 1e-9  # kao u junction_limits
+        joined = straight & np.isclose(vmax[:-1], vmax[1:], rtol=1e-9, atol=0.0) & ~stop  # feed iz parsera ima sum
+        w = np.minimum(w, np.minimum(vmax[:-1], vmax[1:]) ** 2)
+        w[stop] = 0.0
+        caps[1:-1] = w
+    v = np.sqrt(plan_velocities(caps, 2.0 * accel * L))
+    t = trapezoid_times(L, v[:-1], v[1:], vmax, accel)
+    if dynamics.max_jerk > 0 and len(moving):
+        # S-kriva po bloku kretanja (od v na pocetku do v na kraju bloka), deli se srazmerno trapezu
+        first = np.flatnonzero(np.concatenate(([True], ~joined)))
+        last = np.append(first[1:] - 1, len(moving) - 1)
+        block = np.repeat(np.arange(len(first)), last - first + 1)
+        block_t = scurve_times(np.add.reduceat(L, first), v[first], v[last + 1], vmax[first], accel[first], dynamics.max_jerk)
+        t = block_t[block] * t / np.add.reduceat(t, first)[block]
+
+    # Povratak posle busenja (nema ga u putanji): G0 od dna do R ravni, od mirovanja do mirovanja
+    drill = np.flatnonzero(types == TYPE_CODES['DRILL'])
+    if len(drill):
+        back = L[drill]; up = -unit[drill]
+        rv, ra = dynamics.limits(up)
+        if dynamics.rapid_feed: rv = np.minimum(rv, dynamics.rapid_feed / 60.0)
+        zero = np.zeros(len(drill))
+        if dynamics.max_jerk > 0: t[drill] += scurve_times(back, zero, zero, rv, ra, dynamics.max_jerk)
+        else: t[drill] += trapezoid_times(back, zero, zero, rv, ra)
+    seconds[moving] = t
+    return CycleTime(path, seconds)
+
+
+def format_minutes(minutes):
+    """'mm:ss', ili 'h:mm:ss' od jednog sata."""
+    total = int(round(minutes * 60.0))
+    h, rest = divmod(total, 3600); m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
@@ -1,44 +1,204 @@
+import math
+
 import ezdxf
+import numpy as np
+from ezdxf.addons import r12writer
+from ezdxf.addons.r12writer import dxf_attribs
+
+from profiling import span, traced
+from toolpath import TYPE_CODES
+
+# Slojevi (indeks = kod sloja u segment_layers): FEED plava, RAPID crvena, DRILL zuta
+LAYERS = ('FEED', 'RAPID', 'DRILL')
+LAYER_COLORS = (5, 1, 2)
+# Putanje sa vise segmenata se pisu direktno u fajl (R12), bez celog dokumenta u memoriji;
+# ispod toga je uvek R2010 (sa LWPOLYLINE), a R12 samo uz stream=True (--r12)
+STREAM_SEGMENTS = 1_000_000
+# Koliko tacke tetiva smeju da odstupe od rekonstruisanog kruga (relativno na poluprecnik)
+ARC_FIT_TOLERANCE = 1e-6
+ARC_TYPES = (TYPE_CODES['G2'], TYPE_CODES['G3'])
+# Najkraci ravan deo (segmenata) koji se odvaja iz 3D niza u posebnu ravnu poliliniju;
+# kraci ostaju u 3D poliliniji (novi entitet i ponovljena tacka kostaju vise od Z po temenu)
+MIN_FLAT_SEGMENTS = 16
+
+
+def segment_layers(types):
+    """Kod sloja (indeks u LAYERS) po segmentu."""
+    layers = np.zeros(len(types), dtype=np.uint8)
+    layers[types == TYPE_CODES['G0']] = 1
+    layers[types == TYPE_CODES['DRILL']] = 2
+    return layers
+
+
+def find_arcs(path):
+    """
+    Grupise tetive istog G2/G3 bloka (isti tip i linija, nadovezane) i rekonstruise krug
+    iz pocetne i dve unutrasnje tacke (kraj luka je tacka iz programa, moze biti zaokruzen).
+    Vraca (first, last, cx, cy, r, ok); ok je False za helix, luk od jedne tetive ili
+    tacke koje ne leze na krugu - ti lukovi ostaju polilinija od tetiva.
+    """
+    types, start, end = path.types, path.start, path.end
+    is_arc = np.isin(types, ARC_TYPES)
+    cont = np.zeros(len(types), dtype=bool)  # segment nastavlja luk prethodnog
+    if len(types) > 1:
+        cont[1:] = (is_arc[1:] & is_arc[:-1] & (types[1:] == types[:-1]) &
+                    (path.source_lines[1:] == path.source_lines[:-1]) & np.all(start[1:] == end[:-1], axis=1))
+    first = np.flatnonzero(is_arc & ~cont)
+    last = np.flatnonzero(is_arc & ~np.append(cont[1:], False))
+    count = last - first + 1
+
+    p0 = start[first]
+    pa = end[first + np.maximum(count // 2 - 1, 0)]
+    pb = end[np.where(count >= 3, last - 1, last)]
+    bx, by = pa[:, 0] - p0[:, 0], pa[:, 1] - p0[:, 1]
+    qx, qy = pb[:, 0] - p0[:, 0], pb[:, 1] - p0[:, 1]
+    d = 2.0 * (bx * qy - by * qx)
+    valid = (count >= 2) & (np.abs(d) > 1e-12)
+    d = np.where(valid, d, 1.0)
+    b2, q2 = bx * bx + by * by, qx * qx + qy * qy
+    cx = p0[:, 0] + (qy * b2 - by * q2) / d
+    cy = p0[:, 1] + (bx * q2 - qx * b2) / d
+    r = np.hypot(p0[:, 0] - cx, p0[:, 1] - cy)
+
+    if len(first):
+        # Po tetivi: odstupanje Z od pocetka luka i odstupanje unutrasnje tacke od kruga
+        seg = np.flatnonzero(is_arc)
+        group = np.cumsum(~cont[seg]) - 1
+        z_dev = np.abs(end[seg, 2] - p0[group, 2])
+        r_dev = np.abs(np.hypot(end[seg, 0] - cx[group], end[seg, 1] - cy[group]) - r[group])
+        r_dev[np.searchsorted(seg, last)] = 0.0  # kraj luka se ne proverava
+        starts = np.searchsorted(seg, first)
+        valid &= (np.maximum.reduceat(z_dev, starts) == 0.0)
+        valid &= (np.maximum.reduceat(r_dev, starts) <= ARC_FIT_TOLERANCE * np.maximum(r, 1.0))
+    return first, last, cx, cy, r, valid
+
+
+def dxf_entities(path):
+    """
+    Entiteti za DXF redom kao na putanji:
+      ('ARC', sloj, centar, r, ugao_od, ugao_do) / ('CIRCLE', sloj, centar, r) za G2/G3 blokove,
+      ('LINE', sloj, p0, p1) za usamljen segment,
+      ('POLYLINE', sloj, tacke, ravna) za niz nadovezanih segmenata istog sloja.
+    Iz 3D niza se izdvajaju ravni delovi (bar MIN_FLAT_SEGMENTS segmenata sa konstantnim Z)
+    kao ravne polilinije (LWPOLYLINE), a 3D polilinija ostaje samo gde se Z menja.
+    """
+    n = len(path)
+    if not n: return
+    types, start, end = path.types, path.start, path.end
+    layers = segment_layers(types)
+    # Ravni segmenti u dovoljno dugom nizu ravnih
+    flat = start[:, 2] == end[:, 2]
+    run = np.cumsum(np.append(True, flat[1:] != flat[:-1])) - 1
+    flat &= np.bincount(run)[run] >= MIN_FLAT_SEGMENTS
+    first, last, cx, cy, r, valid = find_arcs(path)
+    first, last, cx, cy, r = first[valid], last[valid], cx[valid], cy[valid], r[valid]
+    in_arc = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(in_arc, first, 1); np.add.at(in_arc, last + 1, -1)
+    in_arc = np.cumsum(in_arc[:-1]) > 0
+
+    # Prekid izmedju i-1 i i: pocetak luka, kraj luka, promena sloja, ravan/3D segment ili skok
+    brk = np.ones(n, dtype=bool)
+    brk[1:] = (in_arc[1:] | in_arc[:-1] | (layers[1:] != layers[:-1]) | (flat[1:] != flat[:-1]) |
+               np.any(start[1:] != end[:-1], axis=1))
+    if len(first):
+        inside = np.zeros(n, dtype=bool); inside[first] = True
+        within = in_arc & ~inside  # tetive luka posle prve ostaju u istoj jedinici
+        brk[within] = False
+    unit_first = np.flatnonzero(brk)
+    unit_last = np.append(unit_first[1:] - 1, n - 1)
+    zlo = np.minimum.reduceat(np.minimum(start[:, 2], end[:, 2]), unit_first)
+    zhi = np.maximum.reduceat(np.maximum(start[:, 2], end[:, 2]), unit_first)
+    arc_of = dict(zip(first.tolist(), range(len(first))))
+
+    for u, (a, b) in enumerate(zip(unit_first.tolist(), unit_last.tolist())):
+        layer = LAYERS[layers[a]]
+        k = arc_of.get(a)
+        if k is not None:
+            z = float(start[a, 2]); center = (float(cx[k]), float(cy[k]), z); radius = float(r[k])
+            if np.array_equal(start[a], end[b]):
+                yield ('CIRCLE', layer, center, radius); continue
+            a0 = math.degrees(math.atan2(start[a, 1] - cy[k], start[a, 0] - cx[k]))
+            a1 = math.degrees(math.atan2(end[b, 1] - cy[k], end[b, 0] - cx[k]))
+            # DXF luk ide suprotno od kazaljke: G3 od pocetka do kraja, G2 obrnuto
+            if types[a] == TYPE_CODES['G2']: a0, a1 = a1, a0
+            yield ('ARC', layer, center, radius, a0, a1)
+        elif a == b:
+            yield ('LINE', layer, tuple(start[a].tolist()), tuple(end[a].tolist()))
+        else:
+            points = [tuple(start[a].tolist())] + [tuple(p) for p in end[a:b + 1].tolist()]
+            yield ('POLYLINE', layer, points, bool(zlo[u] == zhi[u]))
+
 
 class DXFExporter:
-    def export(self, filepath, lines_data):
+    @traced('dxf_export', lambda result: {'success': result[0]})
+    def export(self, filepath, lines_data, stream=None):
         """
-        Kreira DXF fajl na osnovu linija iz parsera.
-        lines_data: Lista rečnika koju vraća parser.py
+        Kreira DXF fajl iz putanje parsera (Toolpath).
+        Nadovezani segmenti istog sloja postaju jedna polilinija, a G2/G3 blokovi pravi ARC/CIRCLE.
+        Velike putanje (stream=None i vise od STREAM_SEGMENTS segmenata) se pisu u fajl entitet
+        po entitet (R12 format) umesto preko dokumenta u memoriji. Poruka uspeha navodi format,
+        da promena formata ne prodje neprimetno.
         """
         try:
-            # Kreiramo novi DXF dokument (Verzija R2010 je najkompatibilnija)
-            doc = ezdxf.new('R2010')
-            msp = doc.modelspace()
-
-            # --- KREIRANJE SLOJEVA (LAYERS) ---
-            # FEED Layer (Radni hod) - Plava boja (color 5)
-            doc.layers.new(name='FEED', dxfattribs={'color': 5})
-            
-            # RAPID Layer (Brzi hod) - Crvena boja (color 1)
-            doc.layers.new(name='RAPID', dxfattribs={'color': 1})
-            
-            # DRILL Layer (Bušenje) - Žuta boja (color 2)
-            doc.layers.new(name='DRILL', dxfattribs={'color': 2})
-
-            # --- CRTANJE LINIJA ---
-            for segment in lines_data:
-                start = segment['start'] # (x, y, z)
-                end = segment['end']     # (x, y, z)
-                typ = segment['type']
-                
-                layer_name = 'FEED'
-                if typ == 'G0':
-                    layer_name = 'RAPID'
-                elif typ == 'DRILL':
-                    layer_name = 'DRILL'
-                
-                # Dodajemo 3D liniju u DXF
-                msp.add_line(start, end, dxfattribs={'layer': layer_name})
-
-            # Cuvanje fajla
-            doc.saveas(filepath)
-            return True, "Success"
-            
+            if stream is None: stream = len(lines_data) > STREAM_SEGMENTS
+            with span('dxf_export.entities', segments=len(lines_data), stream=stream) as s:
+                write = self.write_stream if stream else self.write_document
+                s.count(entities=write(filepath, dxf_entities(lines_data)))
+            if not stream: return True, "Success (DXF R2010)"
+            return True, f"Success (DXF R12, streamed: {len(lines_data):,} segments)"
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+
+    def write_document(self, filepath, entities):
+        # Kreiramo novi DXF dokument (Verzija R2010 je najkompatibilnija)
+        doc = ezdxf.new('R2010')
+        msp = doc.modelspace()
+        for name, color in zip(LAYERS, LAYER_COLORS):
+            doc.layers.new(name=name, dxfattribs={'color': color})
+        count = 0
+        for e in entities:
+            attribs = {'layer': e[1]}
+            if e[0] == 'LINE': msp.add_line(e[2], e[3], dxfattribs=attribs)
+            elif e[0] == 'ARC': msp.add_arc(e[2], e[3], e[4], e[5], dxfattribs=attribs)
+            elif e[0] == 'CIRCLE': msp.add_circle(e[2], e[3], dxfattribs=attribs)
+            elif e[3]:
+                # Ravna polilinija: LWPOLYLINE sa visinom (elevation)
+                attribs['elevation'] = e[2][0][2]
+                msp.add_lwpolyline([p[:2] for p in e[2]], dxfattribs=attribs)
+            else: msp.add_polyline3d(e[2], dxfattribs=attribs)
+            count += 1
+        with span('dxf_export.save'): doc.saveas(filepath)
+        return count
+
+    def write_stream(self, filepath, entities):
+        # R12 nema tabelu slojeva u r12writer-u, pa boja sloja ide na svaki entitet
+        colors = dict(zip(LAYERS, LAYER_COLORS))
+        count = 0
+        with r12writer(filepath) as dxf:
+            for e in entities:
+                color = colors[e[1]]
+                if e[0] == 'LINE': dxf.add_line(e[2], e[3], layer=e[1], color=color)
+                elif e[0] == 'ARC': dxf.add_arc(e[2], e[3], e[4], e[5], layer=e[1], color=color)
+                elif e[0] == 'CIRCLE': dxf.add_circle(e[2], e[3], layer=e[1], color=color)
+                else: dxf.stream.write(r12_polyline(e[1], color, e[2], e[3]))
+                count += 1
+        return count
+
+
+def r12_polyline(layer, color, points, flat):
+    """
+    R12 POLYLINE kao jedan string (r12writer pise teme po teme). Ravna je 2D polilinija
+    sa visinom u zaglavlju i samo X/Y po temenu, ostale su 3D (flag 8, teme flag 32).
+    Koordinate se zaokruzuju na 6 decimala kao u r12writer-u.
+    """
+    points = np.round(np.asarray(points), 6).tolist()
+    head = "0\nPOLYLINE\n" + dxf_attribs(layer, color) + "66\n1\n"
+    if flat:
+        head += "10\n0.0\n20\n0.0\n30\n%r\n70\n0\n" % points[0][2]
+        vertex = "0\nVERTEX\n8\n%s\n10\n%%r\n20\n%%r\n" % layer
+        body = "".join([vertex % (p[0], p[1]) for p in points])
+    else:
+        head += "70\n8\n"
+        vertex = "0\nVERTEX\n8\n%s\n70\n32\n10\n%%r\n20\n%%r\n30\n%%r\n" % layer
+        body = "".join([vertex % tuple(p) for p in points])
+    return head + body + "0\nSEQEND\n"
@@ -0,0 +1,114 @@
+"""
+Prikaz velikih programa (large-file mod): tekst se ne ucitava u QPlainTextEdit, nego se iz
+ncfile.LineIndex (mmap + indeks linija) citaju i boje samo linije koje su trenutno vidljive.
+Samo za citanje; parser cita isti fajl direktno (SimpleParser.parse_file).
+"""
+from PySide6.QtWidgets import QAbstractScrollArea
+from PySide6.QtGui import QPainter, QColor, QFont, QTextLayout
+from PySide6.QtCore import Qt, Signal, QPointF
+
+from utils import highlighting_rules
+
+GUTTER_PADDING = 8
+THEMES = {  # pozadina, tekst, brojevi linija, trenutna linija
+    True: ("#1e1e1e", "#d4d4d4", "#606060", "#264f78"),
+    False: ("#ffffff", "#202020", "#a0a0a0", "#cce4f7"),
+}
+
+
+class LargeFileView(QAbstractScrollArea):
+    currentLineChanged = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = None
+        self.current_line = 0
+        self.rules = highlighting_rules()
+        self.colors = [QColor(c) for c in THEMES[True]]
+        self.setFont(QFont("Consolas", 11))
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.verticalScrollBar().setSingleStep(3)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def set_index(self, index):
+        self.index = index
+        self.current_line = 0
+        self.update_scrollbar()
+        self.verticalScrollBar().setValue(0)
+        self.viewport().update()
+
+    def set_dark(self, is_dark):
+        self.colors = [QColor(c) for c in THEMES[is_dark]]
+        self.viewport().update()
+
+    def line_count(self):
+        return len(self.index) if self.index is not None else 0
+
+    def line_height(self):
+        return self.fontMetrics().lineSpacing()
+
+    def page_lines(self):
+        return max(1, self.viewport().height() // self.line_height())
+
+    def update_scrollbar(self):
+        sb = self.verticalScrollBar()
+        sb.setRange(0, max(0, self.line_count() - self.page_lines()))
+        sb.setPageStep(self.page_lines())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbar()
+
+    def set_current_line(self, line, center=False):
+        """Pomera kursor na liniju (i skroluje da bude vidljiva); center kao QPlainTextEdit.centerCursor()."""
+        line = max(0, min(line, self.line_count() - 1))
+        sb = self.verticalScrollBar()
+        if center: sb.setValue(line - self.page_lines() // 2)
+        elif line < sb.value(): sb.setValue(line)
+        elif line >= sb.value() + self.page_lines(): sb.setValue(line - self.page_lines() + 1)
+        if line != self.current_line:
+            self.current_line = line
+            self.currentLineChanged.emit(line)
+        self.viewport().update()
+
+    def formats(self, text):
+        """Bojenje jedne linije istim pravilima kao GCodeHighlighter (kasnije pravilo pokriva ranije)."""
+        ranges = []
+        for pattern, fmt in self.rules:
+            it = pattern.globalMatch(text)
+            while it.hasNext():
+                m = it.next()
+                if not m.capturedLength(): continue
+                r = QTextLayout.FormatRange(); r.start = m.capturedStart(); r.length = m.capturedLength(); r.format = fmt
+                ranges.append(r)
+        return ranges
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        background, text_color, gutter_color, current_color = self.colors
+        painter.fillRect(self.viewport().rect(), background)
+        if self.index is None: return
+        first = self.verticalScrollBar().value(); lh = self.line_height(); font = self.font()
+        gutter = self.fontMetrics().horizontalAdvance('9' * len(str(self.line_count()))) + 2 * GUTTER_PADDING
+        for k, text in enumerate(self.index.lines(first, self.page_lines() + 1)):
+            line, y = first + k, k * lh
+            if line == self.current_line: painter.fillRect(0, y, self.viewport().width(), lh, current_color)
+            painter.setPen(gutter_color)
+            painter.drawText(0, y, gutter - GUTTER_PADDING, lh, Qt.AlignRight | Qt.AlignVCenter, str(line + 1))
+            layout = QTextLayout(text, font)
+            layout.setFormats(self.formats(text))
+            layout.beginLayout(); layout.createLine(); layout.endLayout()
+            painter.setPen(text_color)
+            layout.draw(painter, QPointF(gutter, y))
+
+    def mousePressEvent(self, event):
+        self.setFocus()
+        self.set_current_line(self.verticalScrollBar().value() + int(event.position().y()) // self.line_height())
+
+    def keyPressEvent(self, event):
+        steps = {Qt.Key_Up: -1, Qt.Key_Down: 1, Qt.Key_PageUp: -self.page_lines(), Qt.Key_PageDown: self.page_lines()}
+        if event.key() in steps: self.set_current_line(self.current_line + steps[event.key()])
+        elif event.key() == Qt.Key_Home and event.modifiers() & Qt.ControlModifier: self.set_current_line(0)
+        elif event.key() == Qt.Key_End and event.modifiers() & Qt.ControlModifier: self.set_current_line(self.line_count() - 1)
+        else: super().keyPressEvent(event)
@@ -0,0 +1,95 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# Komentari (...) i ;... se uklanjaju pre tokenizacije
+COMMENT_RE = re.compile(r'\([^\n)]*\)?|;[^\n]*')
+# Rec je slovo za kojim sledi broj; KEY_RE daje slova (i '\n' za granice linija), VALUE_RE brojeve istim redom
+KEY_RE = re.compile(r'[A-Z](?=[ \t]*[-+]?\.?\d)|\n')
+VALUE_RE = re.compile(r'(?<=[A-Z])[ \t]*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+# Tekst se tokenizuje u delovima ove velicine (ogranicava privremenu memoriju re.findall)
+SLICE_CHARS = 4 * 1024 * 1024
+
+
+class WordStream:
+    """
+    Kompaktan niz reci G-koda za ceo dokument:
+      lines   -> int32 indeks linije
+      letters -> uint8 ASCII kod slova (ord('X') ...)
+      values  -> float64 vrednost
+    Reci su poredjane po liniji, pa se "poslednja rec po liniji" dobija bez petlje.
+    """
+
+    def __init__(self, lines, letters, values, n_lines):
+        self.lines = lines
+        self.letters = letters
+        self.values = values
+        self.n_lines = n_lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    def words(self, letter):
+        """(linije, vrednosti) svih reci sa datim slovom."""
+        mask = self.letters == ord(letter)
+        return self.lines[mask], self.values[mask]
+
+    def last(self, letter, default=np.nan, codes=None):
+        """
+        Po liniji: vrednost poslednje reci sa tim slovom (ili default).
+        codes ogranicava reci na te vrednosti (npr. G0/G1/G2/G3).
+        """
+        lines, values = self.words(letter)
+        if codes is not None:
+            keep = np.isin(np.trunc(values), codes)
+            lines, values = lines[keep], values[keep]
+        out = np.full(self.n_lines, default, dtype=np.float64)
+        if len(lines):
+            is_last = np.append(lines[1:] != lines[:-1], True)
+            out[lines[is_last]] = values[is_last]
+        return out
+
+    def has(self, letter, codes=None):
+        """Po liniji: da li linija ima rec sa tim slovom (i jednom od vrednosti iz codes)."""
+        lines, values = self.words(letter)
+        if codes is not None: lines = lines[np.isin(np.trunc(values), codes)]
+        out = np.zeros(self.n_lines, dtype=bool)
+        out[lines] = True
+        return out
+
+
+def _lex_slice(text, line_offset):
+    if '(' in text or ';' in text: text = COMMENT_RE.sub('', text)
+    keys = np.frombuffer(''.join(KEY_RE.findall(text)).encode('ascii'), dtype=np.uint8)
+    values = np.fromstring(' '.join(VALUE_RE.findall(text)), sep=' ')  # Brojeve parsira NumPy (C), ne float()
+    newline = keys == ord('\n')
+    word = ~newline
+    lines = (np.cumsum(newline) + line_offset)[word].astype(np.int32)
+    return lines, keys[word], values
+
+
+def lex(text):
+    """Tokenizuje ceo tekst (velika/mala slova su ista) u WordStream."""
+    text = text.upper()
+    parts, start, line = [], 0, 0
+    while start < len(text):
+        stop = len(text)
+        if stop - start > SLICE_CHARS:
+            nl = text.find('\n', start + SLICE_CHARS)
+            stop = len(text) if nl == -1 else nl + 1
+        chunk = text[start:stop]
+        parts.append(_lex_slice(chunk, line))
+        line += chunk.count('\n')
+        start = stop
+    if not parts:
+        parts.append(_lex_slice('', 0))
+    lines, letters, values = (np.concatenate(col) for col in zip(*parts))
+    return WordStream(lines, letters, values, text.count('\n') + 1)
+
+
+@lru_cache(maxsize=2)
+def lex_cached(text):
+    """lex() sa kesom: Smart Scan posle parsiranja istog teksta ne tokenizuje ponovo."""
+    return lex(text)
@@ -0,0 +1,73 @@
+import numpy as np
+
+from toolpath import Toolpath, TYPE_CODES
+
+# Tipovi koji se nikad ne spajaju (brzi hod i busenje ostaju uvek vidljivi)
+KEEP_TYPES = (TYPE_CODES['G0'], TYPE_CODES['DRILL'])
+LEVEL_FACTOR = 4.0      # Svaki sledeci nivo ima 4x vecu toleranciju
+MIN_REDUCTION = 0.8     # Nivo koji ne smanji broj segmenata bar za 20% se preskace
+MAX_LEVELS = 8
+
+
+def decimate(path, tolerance):
+    """
+    Spaja segmente putanje tako da nijedan spoj ne bude gusci od 'tolerance' (duz putanje),
+    i uvek spaja kolinearne segmente. Lanci se prekidaju na skoku, promeni tipa ili alata,
+    a G0 i DRILL segmenti se prenose nepromenjeni.
+    """
+    n = len(path)
+    if n < 2: return path
+    start, end, types, tools = path.start, path.end, path.types, path.tools
+    mergeable = ~np.isin(types, KEEP_TYPES)
+
+    # continues[i]: segment i+1 nastavlja segment i (isti lanac)
+    continues = (np.all(start[1:] == end[:-1], axis=1) & (types[1:] == types[:-1]) &
+                 (tools[1:] == tools[:-1]) & mergeable[1:] & mergeable[:-1])
+
+    d1 = end[:-1] - start[:-1]; d2 = end[1:] - start[1:]
+    cross = np.linalg.norm(np.cross(d1, d2), axis=1)
+    norms = np.linalg.norm(d1, axis=1) * np.linalg.norm(d2, axis=1)
+    collinear = (cross <= 1e-9 * norms) & (np.einsum('ij,ij->i', d1, d2) >= 0)
+
+    bucket = np.floor(path.dist_end / tolerance)
+    crossed = bucket[:-1] != np.concatenate(([-1.0], bucket[:-2]))
+
+    keep_joint = np.ones(n, dtype=bool)  # spoj na kraju segmenta i ostaje
+    keep_joint[:-1] = ~continues | (crossed & ~collinear)
+    last = np.flatnonzero(keep_joint)
+    first = np.concatenate(([0], last[:-1] + 1))
+    return Toolpath(start[first], end[last], types[first], tools[first], path.source_lines[first],
+                    path.dist_end[last], path.time_end[last])
+
+
+class LodPyramid:
+    """
+    Nivoi detalja putanje: nivo 0 je originalna putanja, svaki sledeci ima LEVEL_FACTOR puta
+    vecu toleranciju. Nivoi se prave u pozadini (build u ParseWorker.build_lod); dok nisu
+    spremni, GUI crta nivo 0.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.levels = [path]
+        self.tolerances = [0.0]
+        lo, hi = path.bounds()
+        self.extent = float(np.linalg.norm(np.subtract(hi, lo)))
+
+    def build(self, cancel=None):
+        """Svi nivoi do tolerancije velicine putanje; cancel (CancelToken) se proverava po nivou."""
+        tolerance = max(self.extent * 1e-4, 1e-3)
+        while tolerance <= self.extent and len(self.levels) <= MAX_LEVELS and len(self.levels[-1]) > 1:
+            if cancel is not None: cancel.check()
+            level = decimate(self.levels[-1], tolerance)
+            if len(level) <= MIN_REDUCTION * len(self.levels[-1]):
+                self.levels.append(level)
+                self.tolerances.append(tolerance)
+            tolerance *= LEVEL_FACTOR
+        return self
+
+    def level_for(self, pixel_size):
+        """Najgrublji napravljen nivo cija tolerancija nije veca od velicine piksela (u mm)."""
+        k = len(self.tolerances) - 1
+        while k > 0 and self.tolerances[k] > pixel_size: k -= 1
+        return k
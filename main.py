@@ -1,18 +1,40 @@
 import sys
-import re
+import os
+import shutil
+import tempfile
+import multiprocessing
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QSplitter,
                                QToolBar, QMenu, QFileDialog, QMessageBox, QLabel, QStatusBar,
                                QPlainTextEdit, QInputDialog, QSlider, QPushButton, QHBoxLayout, 
                                QVBoxLayout, QDoubleSpinBox, QGroupBox, QDialog, QFormLayout, QDialogButtonBox,
-                               QTableWidget, QTableWidgetItem, QHeaderView)
+                               QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox, QStackedWidget, QSpinBox)
 from PySide6.QtGui import QAction, QFont, QIcon, QDesktopServices, QColor, QPixmap, QPainter, QBrush, QPen, QTextCursor, QDragEnterEvent, QDropEvent
 from PySide6.QtCore import Qt, QTimer, QUrl, QSize
 
 from viewer import NCPreviewWidget
 from parser import SimpleParser
+from smart_scan import MAX_ISSUES_PER_RULE
 from utils import GCodeHighlighter, CodeTransformer
+from transforms import TransformPlan, plan_for, renumber, renumber_file, strip_line_numbers, strip_line_numbers_file
 from config_manager import ConfigManager
 from dxf_exporter import DXFExporter
+from parse_cache import ParseCache
+from parse_worker import ParseWorker
+from stock_sim import FLUTE_LENGTH, ToolShape, tool_shapes
+from cycle_time import MachineDynamics, format_minutes
+from ncfile import LineIndex
+from large_editor import LargeFileView
+import profiling
+from profiling import span
+
+# Fajlove vece od ovoga parsiramo u vise procesa
+PARALLEL_PARSE_BYTES = 32 * 1024 * 1024
+# Simulacija sirovine tokom animacije se osvezava najvise ovoliko cesto (ms)
+STOCK_INTERVAL_MS = 100
+# Editor prati animaciju najvise ovoliko cesto (ms): centerCursor je skup, a tik animacije je 30 ms
+EDITOR_SYNC_MS = 100
+# Faze ucitavanja koje se prikazuju u status bar-u kada je merenje ukljuceno
+LOAD_SPANS = ('editor.set_text', 'line_index', 'cache.hash', 'cache.load', 'parse_file', 'parse_parallel', 'cache.store', 'load_file')
 
 # --- WELCOME / DONATION DIALOG ---
 class WelcomeDialog(QDialog):
@@ -90,13 +112,17 @@ class WelcomeDialog(QDialog):
 
 # --- SCAN RESULT DIALOG ---
 class ScanResultDialog(QDialog):
-    def __init__(self, issues, parent=None):
+    def __init__(self, report, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Smart Scan Report")
         self.resize(600, 400)
         layout = QVBoxLayout()
-        title = QLabel(f"Found {len(issues)} issues")
+        issues = report.issues()  # Najvise MAX_ISSUES_PER_RULE redova po pravilu
+        title = QLabel(f"Found {len(report)} issues")
         title.setFont(QFont("Segoe UI", 12, QFont.Bold)); layout.addWidget(title)
+        if report.is_capped():
+            summary = ", ".join(f"{name}: {n}" for name, n in report.counts().items())
+            note = QLabel(f"Showing the first {MAX_ISSUES_PER_RULE} per rule ({summary})."); note.setWordWrap(True); layout.addWidget(note)
         self.table = QTableWidget(); self.table.setColumnCount(3)
         self.table.setHorizontalHeaderLabels(["Line", "Severity", "Message"])
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
@@ -112,16 +138,56 @@ class ScanResultDialog(QDialog):
         btn_close = QPushButton("Close"); btn_close.clicked.connect(self.accept); layout.addWidget(btn_close)
         self.setLayout(layout)
 
+# --- DIAGNOSTICS DIALOG ---
+class DiagnosticsDialog(QDialog):
+    """Poslednje izmereno vreme, brojaci i vrsna memorija po fazi (profiling) i export u Chrome trace."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(640, 420)
+        layout = QVBoxLayout()
+        self.chk_enabled = QCheckBox("Enable instrumentation"); self.chk_enabled.setChecked(profiling.is_enabled())
+        self.chk_memory = QCheckBox("Track peak memory (slower)"); self.chk_memory.setChecked(profiling.recorder.memory)
+        self.chk_enabled.toggled.connect(self.apply); self.chk_memory.toggled.connect(self.apply)
+        layout.addWidget(self.chk_enabled); layout.addWidget(self.chk_memory)
+        self.table = QTableWidget(); self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["Stage", "Time (ms)", "Peak (MB)", "Counts"])
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+        btn_layout = QHBoxLayout()
+        for text, slot in (("Refresh", self.refresh), ("Clear", self.clear), ("Save Chrome Trace...", self.save_trace), ("Close", self.accept)):
+            btn = QPushButton(text); btn.clicked.connect(slot); btn_layout.addWidget(btn)
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+        self.refresh()
+    def apply(self):
+        if self.chk_enabled.isChecked(): profiling.disable(); profiling.enable(memory=self.chk_memory.isChecked())
+        else: profiling.disable()
+    def refresh(self):
+        events = sorted(profiling.recorder.latest.values(), key=lambda e: e['ts'])
+        self.table.setRowCount(len(events))
+        for i, e in enumerate(events):
+            self.table.setItem(i, 0, QTableWidgetItem(e['name']))
+            self.table.setItem(i, 1, QTableWidgetItem(f"{e['dur'] / 1000:.1f}"))
+            self.table.setItem(i, 2, QTableWidgetItem("" if e['peak'] is None else f"{e['peak'] / 1e6:.1f}"))
+            self.table.setItem(i, 3, QTableWidgetItem(", ".join(f"{k}={v}" for k, v in e['counts'].items())))
+    def clear(self): profiling.clear(); self.refresh()
+    def save_trace(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Chrome Trace", "pyncviewer_trace.json", "JSON (*.json)")
+        if filename:
+            try: n = profiling.write_chrome_trace(filename); QMessageBox.information(self, "Diagnostics", f"Saved {n} events to:\n{filename}")
+            except OSError as e: QMessageBox.critical(self, "Error", f"Failed to save trace:\n{e}")
+
 # --- TOOL LIBRARY DIALOG ---
 class ToolLibraryDialog(QDialog):
-    def __init__(self, tools_dict, parent=None):
+    def __init__(self, tools_dict, parent=None, corner_radii=None, flute_lengths=None):
         super().__init__(parent)
         self.setWindowTitle("Tool Library")
-        self.resize(400, 400)
-        self.tools = tools_dict.copy()
+        self.resize(550, 400)
+        self.tools = tools_dict.copy(); self.corner_radii = dict(corner_radii or {}); self.flute_lengths = dict(flute_lengths or {})
         layout = QVBoxLayout()
-        self.table = QTableWidget(); self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["Tool Number (T)", "Diameter (mm)"])
+        self.table = QTableWidget(); self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["Tool Number (T)", "Diameter (mm)", "Corner R (mm)", "Flute Length (mm)"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.refresh_table(); layout.addWidget(self.table)
         btn_layout = QHBoxLayout()
@@ -137,6 +203,10 @@ class ToolLibraryDialog(QDialog):
             row = self.table.rowCount(); self.table.insertRow(row)
             item_id = QTableWidgetItem(str(t_id)); item_id.setFlags(item_id.flags() ^ Qt.ItemIsEditable); self.table.setItem(row, 0, item_id)
             item_dia = QTableWidgetItem(str(self.tools[str(t_id)])); self.table.setItem(row, 1, item_dia)
+            # Radijus ugla: 0 ravno glodalo, D/2 kuglasto (simulacija sirovine)
+            self.table.setItem(row, 2, QTableWidgetItem(str(self.corner_radii.get(str(t_id), 0.0))))
+            # Duzina reznog dela: iznad nje je drska (provera sudara u Smart Scan-u)
+            self.table.setItem(row, 3, QTableWidgetItem(str(self.flute_lengths.get(str(t_id), FLUTE_LENGTH))))
     def add_tool(self):
         t_id, ok = QInputDialog.getInt(self, "New Tool", "Tool Number (T):", 1, 1, 99)
         if ok:
@@ -146,21 +216,33 @@ class ToolLibraryDialog(QDialog):
         row = self.table.currentRow()
         if row >= 0:
             t_id = self.table.item(row, 0).text()
-            if t_id in self.tools: del self.tools[t_id]; self.refresh_table()
+            if t_id in self.tools: del self.tools[t_id]; self.corner_radii.pop(t_id, None); self.flute_lengths.pop(t_id, None); self.refresh_table()
     def save_and_close(self):
         for row in range(self.table.rowCount()):
             t_id = self.table.item(row, 0).text()
             try: dia = float(self.table.item(row, 1).text()); self.tools[t_id] = dia
             except: pass
+            try:
+                r = min(max(float(self.table.item(row, 2).text()), 0.0), self.tools[t_id] / 2.0)
+                if r > 0: self.corner_radii[t_id] = r
+                else: self.corner_radii.pop(t_id, None)
+            except: pass
+            try:
+                length = float(self.table.item(row, 3).text())
+                if length > 0 and length != FLUTE_LENGTH: self.flute_lengths[t_id] = length
+                else: self.flute_lengths.pop(t_id, None)
+            except: pass
         self.accept()
     def get_data(self): return self.tools
+    def get_corner_radii(self): return self.corner_radii
+    def get_flute_lengths(self): return self.flute_lengths
 
 # --- SETTINGS DIALOG ---
 class SettingsDialog(QDialog):
     def __init__(self, current_config, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Preferences")
-        self.setFixedWidth(350)
+        self.setFixedWidth(420)
         self.config = current_config.copy()
         layout = QVBoxLayout(); form = QFormLayout()
         self.spin_x = QDoubleSpinBox(); self.spin_x.setRange(10, 5000); self.spin_x.setValue(self.config['machine_size_x'])
@@ -170,13 +252,33 @@ class SettingsDialog(QDialog):
         layout.addSpacing(10)
         self.spin_rapid = QDoubleSpinBox(); self.spin_rapid.setRange(100, 50000); self.spin_rapid.setValue(self.config['rapid_feed'])
         form.addRow("G0 Rapid Speed:", self.spin_rapid)
+        self.spin_arc_tol = QDoubleSpinBox(); self.spin_arc_tol.setDecimals(4); self.spin_arc_tol.setRange(0.0001, 1.0); self.spin_arc_tol.setSingleStep(0.005); self.spin_arc_tol.setValue(self.config.get('arc_tolerance', 0.01))
+        form.addRow("Arc Tolerance (mm):", self.spin_arc_tol)
+        self.spin_large = QSpinBox(); self.spin_large.setRange(1, 100000); self.spin_large.setSuffix(" MB"); self.spin_large.setValue(int(self.config.get('large_file_mb', 20)))
+        form.addRow("Large-File Mode From:", self.spin_large)
+        # --- NOVO: Dinamika masine za procenu vremena (cycle_time) ---
+        self.chk_planner = QCheckBox("Acceleration-aware time estimate"); self.chk_planner.setChecked(self.config.get('motion_planner', True))
+        form.addRow(self.chk_planner)
+        self.spin_vel = self.axis_row(form, "Axis Max Speed (mm/min):", self.config.get('axis_max_velocity', [self.config['rapid_feed']] * 3), 1, 100000, 0)
+        self.spin_acc = self.axis_row(form, "Axis Accel (mm/s²):", self.config.get('axis_max_acceleration', [500.0, 500.0, 300.0]), 1, 100000, 0)
+        self.spin_jerk = QDoubleSpinBox(); self.spin_jerk.setRange(0, 1000000); self.spin_jerk.setDecimals(0); self.spin_jerk.setSpecialValueText("Off"); self.spin_jerk.setValue(self.config.get('max_jerk', 0.0))
+        form.addRow("Max Jerk (mm/s³):", self.spin_jerk)
+        self.spin_junction = QDoubleSpinBox(); self.spin_junction.setDecimals(3); self.spin_junction.setRange(0.0, 1.0); self.spin_junction.setSingleStep(0.005); self.spin_junction.setValue(self.config.get('junction_deviation', 0.01))
+        form.addRow("Junction Deviation (mm):", self.spin_junction)
         layout.addLayout(form)
         btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         btns.accepted.connect(self.accept); btns.rejected.connect(self.reject)
         layout.addWidget(btns)
         self.setLayout(layout)
+    def axis_row(self, form, label, values, low, high, decimals):
+        row = QHBoxLayout(); spins = []
+        for value in values:
+            spin = QDoubleSpinBox(); spin.setRange(low, high); spin.setDecimals(decimals); spin.setValue(value); row.addWidget(spin); spins.append(spin)
+        form.addRow(label, row)
+        return spins
     def get_data(self):
-        self.config.update({"machine_size_x": self.spin_x.value(), "machine_size_y": self.spin_y.value(), "machine_size_z": self.spin_z.value(), "rapid_feed": self.spin_rapid.value()})
+        self.config.update({"machine_size_x": self.spin_x.value(), "machine_size_y": self.spin_y.value(), "machine_size_z": self.spin_z.value(), "rapid_feed": self.spin_rapid.value(), "arc_tolerance": self.spin_arc_tol.value(), "large_file_mb": self.spin_large.value()})
+        self.config.update({"motion_planner": self.chk_planner.isChecked(), "axis_max_velocity": [s.value() for s in self.spin_vel], "axis_max_acceleration": [s.value() for s in self.spin_acc], "max_jerk": self.spin_jerk.value(), "junction_deviation": self.spin_junction.value()})
         return self.config
 
 # --- MAIN WINDOW ---
@@ -194,6 +296,13 @@ class MainWindow(QMainWindow):
         self.is_dark = (self.settings.get('theme', 'dark') == 'dark')
         
         self.parser = SimpleParser()
+        self.parse_cache = ParseCache()
+        # Parser i kes od sada koristi samo pozadinski thread (GUI ne ceka parsiranje)
+        self.parse_worker = ParseWorker(self.parser, self.parse_cache)
+        self.parse_generation = 0; self.partial_shown = False; self.loading = None; self.estimated_time = 0.0
+        self.large_file = None  # LineIndex u large-file modu (tekst nije u editoru), inace None
+        self.temp_files = set()  # Rezultati operacija fajl u fajl; brisu se kada se zatvore
+        self.file_op_dst = None  # Rezultat operacije fajl u fajl koja je jos u toku
         self.transformer = CodeTransformer()
         self.dxf_exporter = DXFExporter()
         
@@ -205,10 +314,19 @@ class MainWindow(QMainWindow):
         self.highlighter = GCodeHighlighter(self.editor.document())
         self.update_timer = QTimer(); self.update_timer.setSingleShot(True); self.update_timer.timeout.connect(self.process_gcode)
         self.anim_timer = QTimer(); self.anim_timer.timeout.connect(self.animate_step)
+        self.stock_sim = None; self.stock_generation = 0
+        self.stock_timer = QTimer(); self.stock_timer.setSingleShot(True); self.stock_timer.timeout.connect(self.advance_stock)
+        self.anim_line = -1; self.editor_timer = QTimer(); self.editor_timer.setSingleShot(True); self.editor_timer.timeout.connect(self.sync_editor)
         
         self.editor.textChanged.connect(self.schedule_update)
         self.editor.cursorPositionChanged.connect(self.on_cursor_move)
+        self.large_view.currentLineChanged.connect(self.gl_widget.set_highlight)
         self.gl_widget.toolMoved.connect(self.update_dro)
+        self.gl_widget.segmentPicked.connect(self.goto_line); self.gl_widget.linesSelected.connect(self.select_lines)
+        self.parse_worker.partial.connect(self.on_parse_partial)
+        self.parse_worker.finished.connect(self.on_worker_finished)
+        self.parse_worker.failed.connect(self.on_worker_failed)
+        self.parse_worker.progress.connect(lambda channel, percent: self.status.showMessage(f"Processing file... {percent}%"))
         
         self.apply_theme()
         self.load_demo()
@@ -216,6 +334,11 @@ class MainWindow(QMainWindow):
         # STARTUP WELCOME SCREEN (Samo ako zelis da iskoci svaki put)
         QTimer.singleShot(200, self.show_welcome)
 
+    def closeEvent(self, event):
+        self.parse_worker.stop()
+        self.set_large_file(None); self.file_op_dst = None; self.drop_temp_files()
+        super().closeEvent(event)
+
     def show_welcome(self):
         dlg = WelcomeDialog(self)
         dlg.exec()
@@ -270,10 +393,13 @@ class MainWindow(QMainWindow):
 
         view_menu = menubar.addMenu("&View")
         view_menu.addAction("Switch Theme", self.toggle_theme); view_menu.addAction("Reset View", lambda: self.gl_widget.reset_view())
+        view_menu.addSeparator()
+        self.action_stock = view_menu.addAction("Stock Simulation"); self.action_stock.setCheckable(True); self.action_stock.toggled.connect(self.toggle_stock)
         
         # HELP MENU (Za donacije kasnije)
         help_menu = menubar.addMenu("&Help")
         help_menu.addAction("About / Donate", self.show_welcome)
+        help_menu.addAction("Diagnostics...", self.open_diagnostics)
 
         toolbar = QToolBar(); self.addToolBar(toolbar)
         toolbar.addAction(QAction("📂 Open", self, triggered=self.open_file))
@@ -296,8 +422,11 @@ class MainWindow(QMainWindow):
 
         splitter = QSplitter(Qt.Horizontal)
         self.editor = QPlainTextEdit(); self.editor.setFont(QFont("Consolas", 11))
+        # --- NOVO: LARGE-FILE MOD (isti prostor kao editor, samo vidljive linije iz mmap-a) ---
+        self.large_view = LargeFileView()
+        self.editor_stack = QStackedWidget(); self.editor_stack.addWidget(self.editor); self.editor_stack.addWidget(self.large_view)
         self.gl_widget = NCPreviewWidget(); dro_panel = self.create_dro_panel()
-        splitter.addWidget(self.editor); splitter.addWidget(self.gl_widget); splitter.addWidget(dro_panel)
+        splitter.addWidget(self.editor_stack); splitter.addWidget(self.gl_widget); splitter.addWidget(dro_panel)
         splitter.setSizes([350, 800, 250]); self.setCentralWidget(splitter); self.status = QStatusBar(); self.setStatusBar(self.status)
 
     def create_dro_panel(self):
@@ -316,23 +445,37 @@ class MainWindow(QMainWindow):
         lbl = QLabel(f"{axis}  {val}"); lbl.setFont(QFont("Consolas", 24, QFont.Bold)); lbl.setStyleSheet("QLabel { color: #00ff00; background-color: #000; border: 2px solid #333; padding: 10px; border-radius: 5px; }"); lbl.setAlignment(Qt.AlignRight | Qt.AlignVCenter); return lbl
 
     def export_dxf(self):
-        text = self.editor.toPlainText()
-        lines = self.parser.parse(text)
+        if self.parse_worker.is_idle() and not self.update_timer.isActive(): lines = self.gl_widget.path_data
+        else:
+            # Parsiranje je u toku: poseban parser (glavni koristi worker thread)
+            parser = SimpleParser(); parser.set_rapid_feed(self.settings['rapid_feed']); parser.set_arc_tolerance(self.settings.get('arc_tolerance', 0.01))
+            if self.large_file is not None: lines = parser.parse_file(self.large_file.filepath)
+            else: lines = parser.parse(self.editor.toPlainText())
         if not lines: QMessageBox.warning(self, "Export", "No G-Code to export."); return
         filename, _ = QFileDialog.getSaveFileName(self, "Export DXF", "", "DXF Files (*.dxf)")
         if filename:
             success, msg = self.dxf_exporter.export(filename, lines)
-            if success: QMessageBox.information(self, "Success", f"Successfully exported to:\n{filename}")
+            if success: QMessageBox.information(self, "Success", f"Successfully exported to:\n{filename}\n\n{msg}")
             else: QMessageBox.critical(self, "Error", f"Failed to export:\n{msg}")
 
     def run_smart_scan(self):
-        txt = self.editor.toPlainText(); tool_lib = self.settings.get("tool_library", {}); limits = [self.settings['machine_size_x'], self.settings['machine_size_y'], self.settings['machine_size_z']]
-        issues = self.parser.scan_for_errors(txt, tool_lib, limits)
-        if not issues: QMessageBox.information(self, "Scan Complete", "No issues found! Your G-Code looks clean.")
-        else: dlg = ScanResultDialog(issues, self); dlg.exec()
+        tool_lib = self.settings.get("tool_library", {}); limits = [self.settings['machine_size_x'], self.settings['machine_size_y'], self.settings['machine_size_z']]
+        # Prikazana putanja odgovara tekstu samo kada parsiranje nije u toku: tada i provera sudara sa sirovinom
+        path = self.gl_widget.path_data if self.parse_worker.is_idle() and not self.update_timer.isActive() else None
+        shapes = self.current_tool_shapes()[0]
+        if self.large_file is not None: self.parse_worker.scan_file(self.large_file.filepath, tool_lib, limits, path, shapes)
+        else: self.parse_worker.scan(self.editor.toPlainText(), tool_lib, limits, path, shapes)
+        self.status.showMessage("Smart Scan running...")
+    def show_scan_report(self, report):
+        self.status.clearMessage()
+        if not len(report): QMessageBox.information(self, "Scan Complete", "No issues found! Your G-Code looks clean.")
+        else: dlg = ScanResultDialog(report, self); dlg.exec()
+    def open_diagnostics(self): DiagnosticsDialog(self).exec()
     def open_tool_library(self):
-        dlg = ToolLibraryDialog(self.settings.get("tool_library", {}), self)
-        if dlg.exec(): new_lib = dlg.get_data(); self.settings["tool_library"] = new_lib; self.cfg_manager.save_config(self.settings); self.apply_settings_to_components(); self.status.showMessage("Tool Library Updated.")
+        dlg = ToolLibraryDialog(self.settings.get("tool_library", {}), self, self.settings.get("tool_corner_radius", {}), self.settings.get("tool_flute_length", {}))
+        if dlg.exec():
+            new_lib = dlg.get_data(); self.settings["tool_library"] = new_lib; self.settings["tool_corner_radius"] = dlg.get_corner_radii(); self.settings["tool_flute_length"] = dlg.get_flute_lengths(); self.cfg_manager.save_config(self.settings)
+            self.apply_settings_to_components(); self.rebuild_stock(); self.status.showMessage("Tool Library Updated.")
     def update_dro(self, x, y, z, tool_id):
         self.lbl_x.setText(f"X  {x:.3f}"); self.lbl_y.setText(f"Y  {y:.3f}"); self.lbl_z.setText(f"Z  {z:.3f}")
         self.lbl_tool_t.setText(f"T{tool_id}"); dia = self.settings["tool_library"].get(str(tool_id), 10.0); self.lbl_tool_dia.setText(f"Dia: {dia:.1f} mm")
@@ -340,86 +483,197 @@ class MainWindow(QMainWindow):
         dlg = SettingsDialog(self.settings, self)
         if dlg.exec(): new_data = dlg.get_data(); self.settings.update(new_data); self.cfg_manager.save_config(self.settings); self.apply_settings_to_components(); self.process_gcode(); self.status.showMessage("Preferences Saved.")
     def apply_settings_to_components(self):
-        self.gl_widget.machine_size = [self.settings['machine_size_x'], self.settings['machine_size_y'], self.settings['machine_size_z']]; self.parser.set_rapid_feed(self.settings['rapid_feed'])
+        self.gl_widget.machine_size = [self.settings['machine_size_x'], self.settings['machine_size_y'], self.settings['machine_size_z']]; self.parse_worker.set_parser_settings(self.settings['rapid_feed'], self.settings.get('arc_tolerance', 0.01)); self.parse_cache.max_bytes = int(self.settings.get('parse_cache_mb', 2048)) * 1024 ** 2
+        self.parse_worker.dynamics = MachineDynamics.from_settings(self.settings)
         if "tool_library" in self.settings: self.gl_widget.set_tool_library(self.settings["tool_library"])
         self.gl_widget.update()
     def toggle_play(self):
         self.is_playing = not self.is_playing
         if self.is_playing: self.btn_play.setText("⏸ Pause"); self.anim_timer.start(30); 
         else: self.btn_play.setText("▶ Play"); self.anim_timer.stop()
-        if self.current_anim_dist >= self.parser.total_length: self.current_anim_dist = 0
+        if self.current_anim_dist >= self.total_length(): self.current_anim_dist = 0
+    def total_length(self): return self.gl_widget.path_data.total_length  # Prikazana putanja (parser je u worker thread-u)
     def on_slider_move(self, val):
-        if self.parser.total_length > 0: self.current_anim_dist = (val / 1000.0) * self.parser.total_length; self.update_tool_visuals()
+        if self.total_length() > 0: self.current_anim_dist = (val / 1000.0) * self.total_length(); self.update_tool_visuals()
     def animate_step(self):
-        if self.parser.total_length == 0: return
+        total = self.total_length()
+        if total == 0: return
         step = 5.0 * self.anim_speed; self.current_anim_dist += step
-        if self.current_anim_dist >= self.parser.total_length: self.current_anim_dist = self.parser.total_length; self.toggle_play() 
-        percentage = (self.current_anim_dist / self.parser.total_length) * 1000; self.slider.setValue(int(percentage)); self.update_tool_visuals()
+        if self.current_anim_dist >= total: self.current_anim_dist = total; self.toggle_play() 
+        percentage = (self.current_anim_dist / total) * 1000; self.slider.setValue(int(percentage)); self.update_tool_visuals()
     def update_tool_visuals(self):
         pos, t_id, line_idx = self.get_pos_and_tool_at_distance(self.current_anim_dist)
-        self.gl_widget.set_tool_state(pos, t_id)
+        self.gl_widget.set_tool_state(pos, t_id); self.gl_widget.set_playhead(self.current_anim_dist)
         if line_idx != -1 and self.is_playing:
-            cursor = QTextCursor(self.editor.document().findBlockByNumber(line_idx)); self.editor.setTextCursor(cursor); self.editor.centerCursor()
+            self.anim_line = line_idx
+            if not self.editor_timer.isActive(): self.editor_timer.start(EDITOR_SYNC_MS)
+        if self.stock_sim is not None and not self.stock_timer.isActive(): self.stock_timer.start(STOCK_INTERVAL_MS)
+    def sync_editor(self):
+        # Poslednja linija animacije, najvise jednom u EDITOR_SYNC_MS
+        if self.anim_line != -1: self.goto_line(self.anim_line); self.anim_line = -1
+    # --- NOVO: SIMULACIJA SIROVINE (stock_sim) ---
+    def toggle_stock(self, enabled):
+        if enabled: self.rebuild_stock(); return
+        self.stock_generation = 0; self.stock_sim = None; self.gl_widget.set_stock(None)
+    def rebuild_stock(self):
+        """Nova sirovina za prikazanu putanju u pozadini: do tacke animacije, ili ceo program kada je animacija na pocetku."""
+        if not self.action_stock.isChecked(): return
+        shapes, default = self.current_tool_shapes()
+        self.stock_sim = None
+        self.stock_generation = self.parse_worker.simulate_stock(self.gl_widget.path_data, shapes, default, self.current_anim_dist or None)
+        self.status.showMessage("Simulating stock...")
+    def current_tool_shapes(self):
+        """Profili alata iz biblioteke ({T: ToolShape}) i podrazumevani alat, za simulaciju i proveru sudara."""
+        shapes = tool_shapes(self.settings.get("tool_library", {}), self.settings.get("tool_corner_radius", {}), self.settings.get("tool_flute_length", {}))
+        return shapes, ToolShape(self.settings.get("default_tool_dia", 10.0))
+    def advance_stock(self):
+        # Samo novi segmenti od prethodnog poziva (StockSimulator.advance_to), najvise jednom u STOCK_INTERVAL_MS
+        if self.stock_sim is None: return
+        self.stock_sim.advance_to(self.current_anim_dist); self.gl_widget.stock_changed()
+    def goto_line(self, line_idx):
+        """Kursor na liniju programa (editor ili large-file prikaz preko indeksa linija), centrirano."""
+        if self.large_file is not None: self.large_view.set_current_line(line_idx, center=True); return
+        cursor = QTextCursor(self.editor.document().findBlockByNumber(line_idx)); self.editor.setTextCursor(cursor); self.editor.centerCursor()
+    def select_lines(self, ranges):
+        """Shift + prevuci u 3D prikazu: kursor na prvi opseg linija, svi opsezi u status baru."""
+        self.goto_line(ranges[0][0])
+        if self.large_file is None:
+            cursor = self.editor.textCursor(); last = self.editor.document().findBlockByNumber(ranges[0][1])
+            cursor.setPosition(last.position() + last.length() - 1, QTextCursor.KeepAnchor); self.editor.setTextCursor(cursor)
+        text = ", ".join(f"{a + 1}" if a == b else f"{a + 1}-{b + 1}" for a, b in ranges[:20])
+        self.status.showMessage(f"Selected lines: {text}" + (f" ... ({len(ranges)} ranges)" if len(ranges) > 20 else ""))
     def get_pos_and_tool_at_distance(self, target_dist):
-        path = self.gl_widget.path_data
-        if not path: return (0,0,0), 1, -1
-        for seg in path:
-            if target_dist >= seg.get('dist_start', 0) and target_dist <= seg.get('dist_end', 0):
-                len_seg = seg['dist_end'] - seg['dist_start']; t_id = seg.get('tool', 1); line = seg.get('source_line', -1)
-                if len_seg == 0: return seg['start'], t_id, line
-                ratio = (target_dist - seg['dist_start']) / len_seg
-                x = seg['start'][0] + (seg['end'][0] - seg['start'][0]) * ratio; y = seg['start'][1] + (seg['end'][1] - seg['start'][1]) * ratio; z = seg['start'][2] + (seg['end'][2] - seg['start'][2]) * ratio
-                return (x, y, z), t_id, line
-        last = path[-1]; return last['end'], last.get('tool', 1), last.get('source_line', -1)
+        return self.gl_widget.path_data.position_at(target_dist)
     def apply_theme(self):
         if self.is_dark: self.setStyleSheet("QMainWindow { background-color: #2b2b2b; } QPlainTextEdit { background-color: #1e1e1e; color: #d4d4d4; border: 1px solid #3e3e42; } QMenuBar { background-color: #333333; color: white; border-bottom: 1px solid #444; } QMenuBar::item:selected { background-color: #505050; } QMenu { background-color: #252526; color: white; border: 1px solid #454545; } QToolBar { background-color: #333333; border-bottom: 2px solid #007acc; spacing: 5px; } QStatusBar { background-color: #007acc; color: white; } QLabel { color: white; } QPushButton { background-color: #007acc; color: white; border: none; padding: 5px; }")
         else: self.setStyleSheet("")
         if hasattr(self, 'gl_widget'): self.gl_widget.set_theme(self.is_dark)
+        if hasattr(self, 'large_view'): self.large_view.set_dark(self.is_dark)
     def toggle_theme(self): self.is_dark = not self.is_dark; self.settings['theme'] = 'dark' if self.is_dark else 'light'; self.cfg_manager.save_config(self.settings); self.apply_theme()
     def process_gcode(self):
-        text = self.editor.toPlainText(); lines = self.parser.parse(text); self.gl_widget.update_path(lines)
-        m = int(self.parser.estimated_time); s = int((self.parser.estimated_time - m) * 60); self.time_label.setText(f"Est. Time: {m:02d}:{s:02d}")
+        # Nova izmena prekida parsiranje koje je jos u toku (CancelToken u worker-u)
+        if self.large_file is not None: self.start_parse(self.parse_worker.parse_file(self.large_file.filepath)); return
+        self.start_parse(self.parse_worker.parse_text(self.editor.toPlainText()))
+    def start_parse(self, generation): self.parse_generation = generation; self.partial_shown = False
+    def on_parse_partial(self, generation, path):
+        if generation != self.parse_generation: return
+        self.gl_widget.update_path(path, grows=self.partial_shown, partial=True); self.partial_shown = True
+        self.status.showMessage(f"Parsing... {len(path):,} segments")
+    def on_worker_finished(self, generation, channel, result):
+        if channel == 'scan': self.show_scan_report(result); return
+        if channel == 'transform': self.file_op_dst = None; self.load_file_from_path(result); return
+        if channel == 'index': self.gl_widget.set_pick_index(result); return
+        if channel == 'lod': self.gl_widget.set_lod(result); return
+        if channel == 'stock':
+            if generation != self.stock_generation: return
+            self.stock_sim = result; self.gl_widget.set_stock(result.stock); self.status.clearMessage()
+            if self.current_anim_dist: self.advance_stock()
+            return
+        if generation != self.parse_generation: return
+        self.show_path(result.path, result.estimated_time, grows=self.partial_shown, cycle=result.cycle); self.partial_shown = False
+        if self.loading and self.loading[0] == generation:
+            _, filepath, started = self.loading; self.loading = None; self.drop_temp_files()
+            if profiling.is_enabled(): self.status.showMessage(f"Loaded: {filepath}  [{profiling.summary(LOAD_SPANS, started)}]")
+            else: self.status.showMessage(f"Loaded: {filepath}")
+    def on_worker_failed(self, generation, channel, msg):
+        if channel == 'scan': self.status.clearMessage(); QMessageBox.critical(self, "Smart Scan", f"Scan failed:\n{msg}"); return
+        if channel == 'transform': self.file_op_dst = None; self.drop_temp_files(); self.status.clearMessage(); QMessageBox.critical(self, "Error", f"File operation failed:\n{msg}"); return
+        if channel == 'stock': self.status.showMessage(f"Stock simulation failed: {msg}"); return
+        if channel in ('index', 'lod'): return
+        if generation != self.parse_generation: return
+        if self.loading and self.loading[0] == generation: self.loading = None; QMessageBox.critical(self, "Error", f"Cannot open file:\n{msg}")
+        else: self.status.showMessage(f"Parse error: {msg}")
+    def show_path(self, lines, estimated_time=0.0, grows=False, cycle=None):
+        self.gl_widget.update_path(lines, grows=grows); self.estimated_time = estimated_time
+        self.rebuild_stock(); self.parse_worker.build_index(lines); self.parse_worker.build_lod(lines)
+        self.time_label.setText(f"Est. Time: {format_minutes(estimated_time)}"); self.time_label.setToolTip(self.cycle_tooltip(cycle))
+    def cycle_tooltip(self, cycle, max_operations=20):
+        """Vreme po alatu i po operaciji (cycle_time.CycleTime) za tooltip vremena."""
+        if cycle is None: return "Length / feed (acceleration-aware estimate is off in Preferences)"
+        rows = ["Per tool:"] + [f"  T{t}: {format_minutes(m)}" for t, m in cycle.by_tool().items()]
+        ops = cycle.operations()
+        rows.append("Operations:")
+        rows += [f"  T{op['tool']}  lines {op['first_line']}-{op['last_line']}: {format_minutes(op['minutes'])}  (rapid {format_minutes(op['rapid'])})" for op in ops[:max_operations]]
+        if len(ops) > max_operations: rows.append(f"  ... {len(ops) - max_operations} more")
+        return "\n".join(rows)
     def on_cursor_move(self): current_line_idx = self.editor.textCursor().blockNumber(); self.gl_widget.set_highlight(current_line_idx)
     def load_file_from_path(self, filepath):
+        # Novi program prekida operaciju fajl u fajl koja je jos u toku (njen rezultat se vise ne otvara)
+        if self.file_op_dst is not None: self.parse_worker.cancel('transform'); self.file_op_dst = None
         try:
-            with open(filepath, 'r') as f: self.editor.setPlainText(f.read()); self.process_gcode(); self.status.showMessage(f"Loaded: {filepath}")
+            started = profiling.now()
+            size = os.path.getsize(filepath)
+            with span('load_file', bytes=size):
+                if size >= self.settings.get('large_file_mb', 20) * 1024 ** 2:
+                    with span('line_index'): self.set_large_file(LineIndex(filepath))
+                else:
+                    self.set_large_file(None)
+                    with span('editor.set_text'):
+                        with open(filepath, 'r') as f: self.editor.setPlainText(f.read())
+                # Putanju parsiramo direktno iz fajla (mmap), ne iz teksta editora, u pozadini;
+                # isti sadrzaj sa istim podesavanjima se ne parsira ponovo (kes na disku, mmap)
+                self.update_timer.stop()
+                parallel = size >= PARALLEL_PARSE_BYTES and (os.cpu_count() or 1) > 1
+                self.start_parse(self.parse_worker.parse_file(filepath, parallel))
+                self.loading = (self.parse_generation, filepath, started)
+            self.status.showMessage(f"Loading: {filepath}...")
         except Exception as e: QMessageBox.critical(self, "Error", f"Cannot open file:\n{str(e)}")
+    def set_large_file(self, index):
+        """Ukljucuje large-file mod (index je LineIndex) ili ga iskljucuje (None)."""
+        if self.large_file is not None:
+            self.large_file.close(); old = self.large_file.filepath
+            if old in self.temp_files and (index is None or index.filepath != old): self.temp_files.discard(old); os.remove(old)
+        self.large_file = index; self.large_view.set_index(index)
+        if index is not None:
+            # Editor se prazni bez textChanged (inace bi se parsirao prazan tekst)
+            self.editor.blockSignals(True); self.editor.clear(); self.editor.blockSignals(False)
+        self.editor_stack.setCurrentWidget(self.large_view if index is not None else self.editor)
+    def drop_temp_files(self):
+        """Brise rezultate operacija fajl u fajl koje vise niko ne cita (osim otvorenog large-file-a i posla u toku)."""
+        keep = {self.file_op_dst, self.large_file.filepath if self.large_file is not None else None}
+        if self.loading: keep.add(self.loading[1])  # Parsira se direktno iz fajla
+        for path in self.temp_files - keep:
+            self.temp_files.discard(path)
+            if os.path.exists(path): os.remove(path)
+    def run_file_op(self, op):
+        """Large-file mod: op(src, dst, progress) fajl u fajl u pozadini, rezultat se otvara kao novi program."""
+        fd, dst = tempfile.mkstemp(suffix=os.path.splitext(self.large_file.filepath)[1] or '.nc'); os.close(fd); self.temp_files.add(dst); self.file_op_dst = dst
+        self.parse_worker.transform_file(op, self.large_file.filepath, dst); self.status.showMessage("Processing file...")
     def open_file(self):
         f, _ = QFileDialog.getOpenFileName(self, "Open", "", "NC (*.nc *.gcode);;All (*)")
         if f: self.load_file_from_path(f)
     def save_file(self):
         f, _ = QFileDialog.getSaveFileName(self, "Save", "", "NC (*.nc);;All (*)")
         if f: 
+            if self.large_file is not None:
+                if os.path.abspath(f) != os.path.abspath(self.large_file.filepath): shutil.copyfile(self.large_file.filepath, f)
+                return
             with open(f, 'w') as file: file.write(self.editor.toPlainText())
-    def remove_line_numbers(self): text = self.editor.toPlainText(); new_text = re.sub(r'(?m)^N\d+\s*', '', text, flags=re.MULTILINE); self.editor.setPlainText(new_text)
+    def remove_line_numbers(self):
+        if self.large_file is not None: self.run_file_op(strip_line_numbers_file); return
+        self.editor.setPlainText(strip_line_numbers(self.editor.toPlainText()))
     def renumber_advanced(self):
         start, ok1 = QInputDialog.getInt(self, "Renumber", "Start:", 10, 1, 10000)
         if ok1:
             step, ok2 = QInputDialog.getInt(self, "Renumber", "Step:", 10, 1, 1000)
             if ok2:
-                text = self.editor.toPlainText(); lines = text.split('\n'); new_lines = []; counter = start
-                for line in lines:
-                    line = line.strip()
-                    if not line: new_lines.append(""); continue
-                    clean_line = re.sub(r'^N\d+\s*', '', line, flags=re.IGNORECASE); new_lines.append(f"N{counter} {clean_line}"); counter += step
-                self.editor.setPlainText('\n'.join(new_lines))
+                if self.large_file is not None: self.run_file_op(lambda src, dst, progress: renumber_file(src, dst, start, step, progress))
+                else: self.editor.setPlainText(renumber(self.editor.toPlainText(), start, step))
     def schedule_update(self): self.update_timer.start(500)
     def toggle_limits(self): self.gl_widget.show_limits = not self.gl_widget.show_limits; self.gl_widget.update()
     def set_limits(self): self.open_settings()
     def apply_transform(self, mode):
-        txt = self.editor.toPlainText()
-        if mode == "mirror_x": new = self.transformer.mirror_g2_g3(self.transformer.modify_values(txt, multipliers={'X':-1, 'I':-1}), True)
-        elif mode == "mirror_y": new = self.transformer.mirror_g2_g3(self.transformer.modify_values(txt, multipliers={'Y':-1, 'J':-1}), True)
-        elif mode == "inch_to_mm": new = self.transformer.modify_values(txt, multipliers={'X':25.4, 'Y':25.4, 'Z':25.4, 'I':25.4, 'J':25.4})
-        elif mode == "mm_to_inch": f=1/25.4; new = self.transformer.modify_values(txt, multipliers={'X':f, 'Y':f, 'Z':f, 'I':f, 'J':f})
-        elif mode == "swap_axes_maho": new = self.transformer.swap_axes_custom(txt)
-        self.editor.setPlainText(new)
+        # Jedan afini plan (ogledalo + G2/G3, skaliranje, zamena osa) u jednom prolazu kroz tekst
+        self.apply_plan(plan_for(mode))
+    def apply_plan(self, plan):
+        if self.large_file is None: self.editor.setPlainText(plan.apply(self.editor.toPlainText())); return
+        self.run_file_op(lambda src, dst, progress: plan.apply_file(src, dst, progress=progress))
     def open_shift_dialog(self):
         x, ok = QInputDialog.getDouble(self, "Shift", "Offset X:", 0, -9999, 9999, 3)
         if ok: 
             y, ok = QInputDialog.getDouble(self, "Shift", "Offset Y:", 0, -9999, 9999, 3)
             if ok: z, ok = QInputDialog.getDouble(self, "Shift", "Offset Z:", 0, -9999, 9999, 3); 
-            if ok: self.editor.setPlainText(self.transformer.modify_values(self.editor.toPlainText(), offsets={'X':x, 'Y':y, 'Z':z}))
+            if ok: self.apply_plan(TransformPlan.shift(x, y, z))
     def load_demo(self):
         demo = """(DEMO: Polished v1.5)
 (Drag & Drop files here!)
@@ -436,6 +690,7 @@ N100 G0 Z50 M5"""
         self.editor.setPlainText(demo)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # ProcessPoolExecutor u EXE verziji (PyInstaller)
     app = QApplication(sys.argv)
     app.setStyle("Fusion") 
     font = QFont("Segoe UI", 10)
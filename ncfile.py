@@ -0,0 +1,99 @@
+import mmap
+import os
+
+import numpy as np
+
+# Velicina jednog paketa linija pri citanju velikih fajlova
+BATCH_BYTES = 8 * 1024 * 1024
+
+
+def line_aligned_ranges(filepath, parts):
+    """Deli fajl na najvise 'parts' opsega bajtova (start, stop) koji pocinju na pocetku linije."""
+    size = os.path.getsize(filepath)
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for k in range(1, parts):
+            nl = mm.find(b'\n', max(size * k // parts, bounds[-1]))
+            if nl == -1 or nl + 1 >= size: break
+            if nl + 1 > bounds[-1]: bounds.append(nl + 1)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_text_batches(filepath, batch_bytes=BATCH_BYTES, encoding='utf-8', start=0, stop=None, errors='replace'):
+    """
+    Cita fajl preko mmap-a i vraca (indeks_prve_linije, tekst, broj_linija) paket po paket.
+    Paket se uvek zavrsava na kraju linije, pa u memoriji nikad nije vise od
+    jednog paketa dekodiranog teksta, bez obzira na velicinu fajla.
+    start/stop ogranicavaju citanje na deo fajla (indeks linije je tada relativan).
+    errors='surrogateescape' cuva bajtove koji nisu u encoding-u (za prepisivanje fajla).
+    """
+    if os.path.getsize(filepath) == 0:
+        return
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm) if stop is None else stop
+        pos = start
+        line_idx = 0
+        while pos < size:
+            end = min(pos + batch_bytes, size)
+            if end < size:
+                nl = mm.find(b'\n', end)
+                end = size if nl == -1 else nl + 1
+            text = mm[pos:end].decode(encoding, errors=errors)
+            n_lines = text.count('\n') + (not text.endswith('\n'))  # bez praznog ostatka posle '\n'
+            yield line_idx, text, n_lines
+            line_idx += n_lines
+            pos = end
+
+
+def iter_line_batches(filepath, batch_bytes=BATCH_BYTES, encoding='utf-8', start=0, stop=None):
+    """Kao iter_text_batches, ali vraca (indeks_prve_linije, [linije])."""
+    for line_idx, text, n_lines in iter_text_batches(filepath, batch_bytes, encoding, start, stop):
+        yield line_idx, text.split('\n')[:n_lines]
+
+
+# Velicina komada fajla pri trazenju '\n' (ogranicava privremeni bool niz)
+INDEX_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+class LineIndex:
+    """
+    Fajl otvoren preko mmap-a sa NumPy indeksom pocetaka linija: linija i su bajtovi
+    [offsets[i], offsets[i+1]). Za prikaz velikih programa bez ucitavanja celog teksta;
+    broj linija je isti kao u parseru (prazan ostatak posle poslednjeg '\\n' se ne broji).
+    """
+
+    def __init__(self, filepath, encoding='utf-8'):
+        self.filepath = filepath
+        self.encoding = encoding
+        self.size = os.path.getsize(filepath)
+        self.file = open(filepath, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        starts = [np.zeros(1, dtype=np.int64)]
+        for pos in range(0, self.size, INDEX_CHUNK_BYTES):
+            chunk = np.frombuffer(self.mm, dtype=np.uint8, count=min(INDEX_CHUNK_BYTES, self.size - pos), offset=pos)
+            starts.append(np.flatnonzero(chunk == 10) + (pos + 1))
+            del chunk  # mmap ne sme imati otvorene poglede kada se zatvara
+        offsets = np.concatenate(starts)
+        if offsets[-1] != self.size: offsets = np.append(offsets, self.size)  # poslednja linija bez '\n'
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lines(self, first, count):
+        """Linije [first, first + count) kao lista stringova (bez '\\r\\n')."""
+        first = max(0, min(first, len(self))); last = max(first, min(first + count, len(self)))
+        if first == last: return []
+        data = self.mm[self.offsets[first]:self.offsets[last]].decode(self.encoding, errors='replace')
+        return [line.rstrip('\r') for line in data.split('\n')[:last - first]]
+
+    def line(self, i):
+        found = self.lines(i, 1)
+        return found[0] if found else ''
+
+    def close(self):
+        if self.mm is not None: self.mm.close(); self.mm = None
+        self.file.close()
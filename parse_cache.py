@@ -0,0 +1,141 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+from profiling import traced
+from toolpath import Toolpath
+
+# Menja se kada parser pocne drugacije da tumaci G-kod (stari unosi se tada ignorisu)
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+HASH_CHUNK = 16 * 1024 * 1024
+STALE_SECONDS = 3600  # Nedovrseni upis starijeg procesa (pad programa) se posle ovoga brise
+META_FILE = 'meta.json'
+
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pyncviewer', 'parse_cache')
+
+
+class ParseCache:
+    """
+    Kes parsiranih putanja na disku: kljuc je hash sadrzaja fajla + podesavanja parsera,
+    a svaki unos je direktorijum sa .npy kolonama Toolpath-a i meta.json (duzina, vreme, granice).
+    Ponovno otvaranje istog programa je np.load(mmap_mode='r') umesto parsiranja.
+
+    Vise pokrenutih viewer-a moze da deli isti direktorijum: unos se pise u privremeni
+    direktorijum i objavljuje jednim os.rename, a brisanje (LRU, po vremenu poslednjeg
+    koriscenja) prvo preimenuje unos, pa ga tek onda brise.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @traced('cache.hash')
+    def key(self, filepath, parser):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(repr((CACHE_VERSION, parser.rapid_feed, parser.arc_tolerance)).encode())
+        if os.path.getsize(filepath):
+            with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for pos in range(0, len(mm), HASH_CHUNK): h.update(mm[pos:pos + HASH_CHUNK])
+        return h.hexdigest()
+
+    def parse_file(self, parser, filepath, parse=None):
+        """
+        Putanja iz kesa ili, ako je nema, parse(filepath) (podrazumevano parser.parse_file)
+        koja se onda upisuje u kes. Statistika parsera (duzina, vreme, granice) se postavlja u oba slucaja.
+        """
+        parse = parse or parser.parse_file
+        if self.max_bytes <= 0: return parse(filepath)
+        key = self.key(filepath, parser)
+        path = self.load(key, parser)
+        if path is None:
+            path = parse(filepath)
+            self.store(key, path, parser)
+        return path
+
+    @traced('cache.load', lambda path: {'hit': path is not None})
+    def load(self, key, parser=None):
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, META_FILE)) as f: meta = json.load(f)
+            if meta.get('version') != CACHE_VERSION: return None
+            path = Toolpath(*(np.load(os.path.join(entry, c + '.npy'), mmap_mode='r') for c in Toolpath.COLUMNS))
+            path.line_offsets = np.load(os.path.join(entry, 'line_offsets.npy'), mmap_mode='r')
+            os.utime(os.path.join(entry, META_FILE))  # LRU: poslednje koriscenje
+        except (OSError, ValueError, KeyError):
+            return None  # Nema unosa, ili ga je drugi proces upravo obrisao
+        if parser is not None:
+            parser.reset_stats()
+            parser.total_length = meta['total_length']; parser.estimated_time = meta['estimated_time']
+            parser.min_point = meta['min_point']; parser.max_point = meta['max_point']
+        return path
+
+    @traced('cache.store')
+    def store(self, key, path, parser):
+        if self.max_bytes <= 0: return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, f'{key}.tmp-{uuid.uuid4().hex}')
+        try:
+            os.mkdir(tmp)
+            for c in Toolpath.COLUMNS: np.save(os.path.join(tmp, c + '.npy'), getattr(path, c))
+            offsets = path.line_offsets if path.line_offsets is not None else np.zeros(1, dtype=np.int32)
+            np.save(os.path.join(tmp, 'line_offsets.npy'), offsets)
+            meta = {'version': CACHE_VERSION, 'segments': len(path), 'total_length': parser.total_length,
+                    'estimated_time': parser.estimated_time, 'min_point': [float(v) for v in parser.min_point],
+                    'max_point': [float(v) for v in parser.max_point]}
+            with open(os.path.join(tmp, META_FILE), 'w') as f: json.dump(meta, f)
+            os.rename(tmp, os.path.join(self.directory, key))
+        except OSError:
+            pass  # Disk pun ili je drugi viewer vec upisao isti unos
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """[(poslednje_koriscenje, bajtova, direktorijum)] za sve gotove unose."""
+        out = []
+        try: names = os.listdir(self.directory)
+        except OSError: return out
+        for name in names:
+            entry = os.path.join(self.directory, name)
+            if '.' in name:
+                # Privremeni ili preimenovan za brisanje; nedovrsene upise ostavljamo dok ne zastare
+                try:
+                    if '.trash-' in name or time.time() - os.path.getmtime(entry) > STALE_SECONDS: shutil.rmtree(entry, ignore_errors=True)
+                except OSError: pass
+                continue
+            try:
+                files = [os.path.join(entry, f) for f in os.listdir(entry)]
+                out.append((os.path.getmtime(os.path.join(entry, META_FILE)), sum(os.path.getsize(f) for f in files), entry))
+            except OSError:
+                continue
+        return out
+
+    def evict(self):
+        """Brise najdavnije koriscene unose dok ukupna velicina ne padne ispod max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes: break
+            if remove_entry(entry): total -= size
+
+    def clear(self):
+        for _, _, entry in self.entries(): remove_entry(entry)
+
+
+def remove_entry(entry):
+    """Preimenuje pa brise unos; proces koji ga upravo cita zadrzava vec otvorene fajlove."""
+    trash = f'{entry}.trash-{uuid.uuid4().hex}'
+    try: os.rename(entry, trash)
+    except OSError: return False
+    shutil.rmtree(trash, ignore_errors=True)
+    return True
@@ -0,0 +1,188 @@
+"""
+Parsiranje i Smart Scan u pozadinskom thread-u (QThread), da GUI ne stoji dok se putanja racuna.
+
+    worker = ParseWorker(parser, parse_cache)
+    worker.partial.connect(on_partial)     # (generacija, Toolpath do sada) dok se fajl cita
+    worker.finished.connect(on_finished)   # (generacija, kanal, rezultat)
+    worker.dynamics = MachineDynamics(...)  # vreme obrade sa ubrzanjem (cycle_time); None = duzina / feed
+    generation = worker.parse_text(text)
+
+Novi posao na istom kanalu ('parse', 'scan', 'transform', 'stock', 'index' ili 'lod') prekida prethodni preko CancelToken-a, a
+rezultati prekinutih poslova se ne salju. Parser i kes koristi samo worker thread; GUI
+statistiku (duzina, vreme) cita iz ParseResult-a, ne iz parsera. Podesavanja parsera se
+menjaju samo preko set_parser_settings: posao pamti podesavanja u trenutku slanja i postavlja
+ih parseru u worker thread-u, pa putanja, kljuc kesa i statistika uvek imaju ista podesavanja.
+"""
+import time
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+from parser import CancelToken, ParseCancelled
+
+# Delovi putanje se salju najvise ovoliko cesto (sekundi): svaki je jedan GPU upload u GUI thread-u
+PARTIAL_INTERVAL = 0.25
+# Manji paketi fajla u pozadini: jedan regex poziv krace drzi GIL, pa GUI ne preskace frejmove
+WORKER_BATCH_BYTES = 128 * 1024
+
+
+class ParseResult:
+    """Putanja i statistika parsera u trenutku kada je posao zavrsen; cycle je cycle_time.CycleTime ili None."""
+
+    def __init__(self, path, parser, dynamics=None):
+        self.path = path
+        self.total_length = parser.total_length
+        self.cycle = None
+        if dynamics is not None and len(path):
+            from cycle_time import estimate_cycle_time
+            self.cycle = estimate_cycle_time(path, dynamics)
+        self.estimated_time = parser.estimated_time if self.cycle is None else self.cycle.total
+        self.min_point = list(parser.min_point); self.max_point = list(parser.max_point)
+
+
+class ParseWorker(QObject):
+    partial = Signal(int, object)
+    finished = Signal(int, str, object)
+    failed = Signal(int, str, str)
+    progress = Signal(str, int)  # (kanal, procenat) za poslove fajl u fajl
+    _queued = Signal(int, str, object)  # Interno: posao prelazi u worker thread
+
+    def __init__(self, parser, parse_cache=None):
+        super().__init__()
+        self.parser = parser; self.parse_cache = parse_cache
+        self.dynamics = None  # cycle_time.MachineDynamics za ParseResult.cycle
+        self.parser_settings = (parser.rapid_feed, parser.arc_tolerance)  # Za sledece poslove parsiranja
+        self.generation = 0
+        self.tokens = {}   # kanal -> CancelToken poslednjeg posla
+        self.latest = {}   # kanal -> generacija poslednjeg posla
+        self.done = {}     # kanal -> generacija poslednjeg zavrsenog (ili prekinutog) posla
+        self.thread = QThread()
+        self.thread.setObjectName("parse_worker")
+        self.moveToThread(self.thread)
+        self._queued.connect(self._run)
+        self.thread.start()
+
+    def submit(self, channel, job):
+        """job(token, partial) se izvrsava u worker thread-u; vraca generaciju posla."""
+        if channel in self.tokens: self.tokens[channel].cancel()
+        self.generation += 1
+        token = self.tokens[channel] = CancelToken()
+        self.latest[channel] = self.generation
+        self._queued.emit(self.generation, channel, (job, token))
+        return self.generation
+
+    def cancel(self, channel):
+        """Prekida poslednji posao na kanalu; njegov rezultat se ne salje."""
+        if channel in self.tokens: self.tokens[channel].cancel()
+
+    def is_idle(self, channel='parse'):
+        return self.done.get(channel) == self.latest.get(channel)
+
+    def set_parser_settings(self, rapid_feed, arc_tolerance):
+        """Podesavanja za poslove poslate posle ovog poziva (parser se ne dira iz GUI thread-a)."""
+        self.parser_settings = (float(rapid_feed), float(arc_tolerance))
+
+    def configure(self, settings):
+        # Samo u worker thread-u, na pocetku posla
+        self.parser.set_rapid_feed(settings[0]); self.parser.set_arc_tolerance(settings[1])
+
+    def parse_text(self, text):
+        dynamics = self.dynamics; settings = self.parser_settings
+        def job(token, partial):
+            self.configure(settings)
+            return ParseResult(self.parser.parse_incremental(text, cancel=token), self.parser, dynamics)
+        return self.submit('parse', job)
+
+    def parse_file(self, filepath, parallel=False):
+        """Fajl (preko kesa ako postoji); bez paralelnog parsiranja delovi putanje stizu usput."""
+        dynamics = self.dynamics; settings = self.parser_settings
+        def job(token, partial):
+            self.configure(settings)
+            if parallel: parse = lambda fp: self.parser.parse_parallel(fp, cancel=token)
+            else: parse = lambda fp: self.parser.parse_file(fp, WORKER_BATCH_BYTES, token, partial)
+            if self.parse_cache is None: path = parse(filepath)
+            else: path = self.parse_cache.parse_file(self.parser, filepath, parse)
+            return ParseResult(path, self.parser, dynamics)
+        return self.submit('parse', job)
+
+    def scan(self, text, tool_library, machine_limits, path=None, shapes=None):
+        """path (putanja istog teksta) ukljucuje proveru sudara sa sirovinom (smart_scan.scan)."""
+        def job(token, partial):
+            from smart_scan import scan
+            return scan(text, tool_library, machine_limits, path=path, shapes=shapes)
+        return self.submit('scan', job)
+
+    def scan_file(self, filepath, tool_library, machine_limits, path=None, shapes=None):
+        """Smart Scan za large-file mod: tekst se cita u worker thread-u, ne iz editora."""
+        def job(token, partial):
+            from smart_scan import scan
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as f: text = f.read()
+            return scan(text, tool_library, machine_limits, path=path, shapes=shapes)
+        return self.submit('scan', job)
+
+    def simulate_stock(self, path, shapes, default_shape, dist=None):
+        """Nova sirovina (stock_sim.StockSimulator) za putanju, do duzine dist (None = ceo program)."""
+        def job(token, partial):
+            from stock_sim import StockSimulator
+            sim = StockSimulator(path, shapes, default_shape)
+            if dist is None: sim.run(token)
+            else: sim.advance_to(dist)
+            return sim
+        return self.submit('stock', job)
+
+    def build_index(self, path):
+        """Prostorni indeks putanje za izbor segmenta klikom (picking.SegmentIndex)."""
+        def job(token, partial):
+            from picking import SegmentIndex
+            return SegmentIndex(path)
+        return self.submit('index', job)
+
+    def build_lod(self, path):
+        """Nivoi detalja putanje za udaljenu kameru (lod.LodPyramid), da se ne prave u paintGL."""
+        def job(token, partial):
+            from lod import LodPyramid
+            return LodPyramid(path).build(token)
+        return self.submit('lod', job)
+
+    def transform_file(self, op, src, dst):
+        """
+        Posao fajl u fajl u pozadini (large-file mod): op(src, dst, progress), npr.
+        TransformPlan.apply_file ili transforms.renumber_file; rezultat je dst.
+        """
+        def job(token, partial):
+            shown = [-1]
+
+            def progress(done, total):
+                token.check()
+                percent = 100 * done // max(total, 1)
+                if percent != shown[0]: shown[0] = percent; self.progress.emit('transform', percent)
+            op(src, dst, progress)
+            return dst
+        return self.submit('transform', job)
+
+    def stop(self):
+        """Prekida sve poslove i ceka kraj thread-a (najvise jedan paket parsiranja)."""
+        for token in self.tokens.values(): token.cancel()
+        self.thread.quit()
+        self.thread.wait()
+
+    @Slot(int, str, object)
+    def _run(self, generation, channel, payload):
+        job, token = payload
+        last_partial = [0.0]
+
+        def partial(path, n_lines):
+            now = time.perf_counter()
+            if now - last_partial[0] < PARTIAL_INTERVAL or token.cancelled: return
+            last_partial[0] = now
+            self.partial.emit(generation, path)
+
+        try:
+            if token.cancelled: return
+            result = job(token, partial)
+            if not token.cancelled: self.finished.emit(generation, channel, result)
+        except ParseCancelled:
+            pass
+        except Exception as e:
+            if not token.cancelled: self.failed.emit(generation, channel, str(e))
+        finally:
+            self.done[channel] = max(self.done.get(channel, 0), generation)
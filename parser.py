@@ -1,14 +1,55 @@
 import math
-import re
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from arcs import DEFAULT_ARC_TOLERANCE, tessellate_arcs
+from lexer import lex, lex_cached
+from ncfile import BATCH_BYTES, iter_text_batches, line_aligned_ranges
+from profiling import span, traced
+from toolpath import Toolpath, ToolpathBuilder, TYPE_CODES
+
+# Razmak (u linijama) izmedju sacuvanih modalnih stanja za inkrementalno parsiranje
+CHECKPOINT_LINES = 1000
+
+
+class ParseCancelled(Exception):
+    """Parsiranje je prekinuto preko CancelToken-a (npr. nova izmena u editoru)."""
+
+
+class CancelToken:
+    """Zastavica za prekid parsiranja iz drugog thread-a; parser je proverava izmedju paketa."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set(): raise ParseCancelled()
+
 
 class SimpleParser:
     def __init__(self):
         self.rapid_feed = 3000.0 
+        self.arc_tolerance = DEFAULT_ARC_TOLERANCE
+        self.snapshot = None  # Poslednji rezultat parse_incremental (linije, putanja, checkpoint-i)
         self.reset_stats()
 
     def set_rapid_feed(self, feed):
         self.rapid_feed = float(feed)
 
+    def set_arc_tolerance(self, tolerance):
+        self.arc_tolerance = max(float(tolerance), 1e-6)
+
     def reset_stats(self):
         self.min_point = [0, 0, 0]
         self.max_point = [0, 0, 0]
@@ -20,196 +61,373 @@ class SimpleParser:
         """
         Vraca listu problema: 
         [{'line': 10, 'type': 'CRITICAL', 'msg': 'Crash detected!'}, ...]
+        Najvise smart_scan.MAX_ISSUES_PER_RULE po pravilu; ceo izvestaj daje smart_scan.scan().
         """
-        issues = []
-        
-        # Stanje simulacije
-        cx, cy, cz = 0.0, 0.0, 0.0 # Pretpostavljamo start na nuli
-        current_feed = 0.0
-        current_spindle = 0.0
-        current_tool = 0
-        
-        # Limiti
-        lim_x, lim_y, lim_z = machine_limits
-        
-        lines = text.split('\n')
-        
-        for i, line in enumerate(lines):
-            line_num = i + 1
-            line = line.upper().strip()
-            if not line: continue
-            
-            # 1. Citanje parametara
-            # Trazimo F, S, T pre nego sto obradimo kretanje
-            if 'F' in line:
-                m = re.search(r'F([\d\.]+)', line)
-                if m: current_feed = float(m.group(1))
-            
-            if 'S' in line:
-                m = re.search(r'S([\d\.]+)', line)
-                if m: current_spindle = float(m.group(1))
-                
-            if 'T' in line:
-                m = re.search(r'T(\d+)', line)
-                if m: 
-                    t_val = int(m.group(1))
-                    # PROVERA: Da li alat postoji?
-                    if str(t_val) not in tool_library and t_val != 0:
-                        issues.append({'line': line_num, 'type': 'WARNING', 'msg': f"Tool T{t_val} not in Tool Library."})
-                    current_tool = t_val
-
-            # Kretanje
-            clean_line = line.split('(')[0].split(';')[0]
-            if not clean_line: continue
-            
-            # Parsiranje koordinata
-            nx, ny, nz = cx, cy, cz
-            mode = None
-            
-            # Prosta detekcija G koda
-            if 'G0' in clean_line or 'G00' in clean_line: mode = 'G0'
-            elif 'G1' in clean_line or 'G01' in clean_line: mode = 'G1'
-            elif 'G2' in clean_line or 'G02' in clean_line: mode = 'G2'
-            elif 'G3' in clean_line or 'G03' in clean_line: mode = 'G3'
-            
-            # Koordinate
-            tokens = clean_line.replace('X',' X').replace('Y',' Y').replace('Z',' Z').split()
-            moved = False
-            for token in tokens:
-                if token.startswith('X'): nx = float(token[1:]); moved = True
-                if token.startswith('Y'): ny = float(token[1:]); moved = True
-                if token.startswith('Z'): nz = float(token[1:]); moved = True
-
-            if moved:
-                # 2. PROVERA: Limiti masine
-                if nx > lim_x or ny > lim_y or nz > lim_z:
-                    issues.append({'line': line_num, 'type': 'WARNING', 'msg': f"Move exceeds machine limits ({nx},{ny},{nz})"})
-                
-                # 3. PROVERA: Sudar (G0 ispod nule)
-                # Ako idemo brzo (G0) i cilj je ispod nule
-                if mode == 'G0' and nz < 0.0:
-                     issues.append({'line': line_num, 'type': 'CRITICAL', 'msg': f"Rapid move (G0) into material (Z{nz})!"})
-                
-                # Ako idemo brzo (G0) horizontalno, a vec smo ispod nule
-                if mode == 'G0' and cz < 0.0 and (nx != cx or ny != cy):
-                     issues.append({'line': line_num, 'type': 'CRITICAL', 'msg': f"Rapid lateral move inside material (Z{cz})!"})
-
-                # 4. PROVERA: Nema posmaka (F)
-                if mode in ['G1', 'G2', 'G3']:
-                    if current_feed <= 0.001:
-                        issues.append({'line': line_num, 'type': 'ERROR', 'msg': "Cutting move without Feed Rate (F)!"})
-                    
-                    # 5. PROVERA: Vreteno ne radi (S)
-                    # (Ovo je warning jer nekad ljudi pale vreteno rucno)
-                    if current_spindle <= 0.001:
-                         issues.append({'line': line_num, 'type': 'WARNING', 'msg': "Cutting move with Spindle Speed 0 (S)!"})
-
-                cx, cy, cz = nx, ny, nz
-
-        return issues
-
-    # --- STARA FUNKCIJA (Ostaje ista, samo je kopiraj ispod) ---
+        from smart_scan import scan  # smart_scan uvozi parser
+        return scan(text, tool_library, machine_limits).issues()
+
+    # --- PARSIRANJE: prvo blokovi (linija po linija), pa geometrija odjednom (NumPy) ---
+    @traced('parse', lambda path: {'segments': len(path)})
     def parse(self, text):
-        lines_to_draw = []
         self.reset_stats()
-        current_feed = 100.0
-        min_x, min_y, min_z = float('inf'), float('inf'), float('inf')
-        max_x, max_y, max_z = float('-inf'), float('-inf'), float('-inf')
-        cx, cy, cz = 0.0, 0.0, 0.0
-        current_mode = 'G0'
-        current_tool = 1
-        points_found = False
-        current_accumulated_dist = 0.0 
-        raw_lines = text.split('\n')
-        for line_idx, line in enumerate(raw_lines):
-            line = line.upper().strip()
-            if not line: continue
-            if 'F' in line:
-                m = re.search(r'F([\d\.]+)', line); 
-                if m: current_feed = float(m.group(1))
-            if 'T' in line:
-                m = re.search(r'T(\d+)', line)
-                if m: current_tool = int(m.group(1))
-            clean = line.split('(')[0].split(';')[0]
-            if not clean: continue
-            start_pos = (cx, cy, cz)
-            min_x, max_x = min(min_x, cx), max(max_x, cx)
-            min_y, max_y = min(min_y, cy), max(max_y, cy)
-            min_z, max_z = min(min_z, cz), max(max_z, cz)
-            points_found = True
-            tokens = clean.replace('G', ' G').replace('X', ' X').replace('Y', ' Y').replace('Z', ' Z').replace('I', ' I').replace('J', ' J').replace('R', ' R').split()
-            nx, ny, nz = cx, cy, cz; i_v, j_v, r_v = 0,0,0; mv = False; is_d = False; d_r = 0.0
-            for t in tokens:
-                if not t: continue
-                try:
-                    c = t[0]; v = float(t[1:])
-                    if c == 'G':
-                        code = int(v)
-                        if code in [0,1,2,3]: current_mode = f'G{code}'
-                        elif code in [81,83]: current_mode = f'G{code}'; is_d = True
-                    elif c == 'X': nx=v; mv=True
-                    elif c == 'Y': ny=v; mv=True
-                    elif c == 'Z': nz=v; mv=True
-                    elif c == 'I': i_v=v
-                    elif c == 'J': j_v=v
-                    elif c == 'R': r_v=v; d_r=v
-                except: pass
-            
-            segs = []
-            if mv or is_d:
-                base = {'source_line': line_idx, 'tool': current_tool}
-                if is_d:
-                    segs.append({**base, 'type': 'G0', 'start': start_pos, 'end': (nx, ny, d_r)})
-                    segs.append({**base, 'type': 'DRILL', 'start': (nx, ny, d_r), 'end': (nx, ny, nz)})
-                    nz = d_r
-                elif current_mode in ['G2', 'G3']:
-                    arcs, al = self.generate_arc((cx, cy), (nx, ny), (cx+i_v, cy+j_v), current_mode, cz, nz, line_idx, current_tool)
-                    segs.extend(arcs)
-                else:
-                    segs.append({**base, 'type': current_mode, 'start': start_pos, 'end': (nx, ny, nz)})
-                
-                for s in segs:
-                    dx, dy, dz = s['end'][0]-s['start'][0], s['end'][1]-s['start'][1], s['end'][2]-s['start'][2]
-                    sl = math.sqrt(dx*dx+dy*dy+dz*dz)
-                    s['dist_start'] = current_accumulated_dist; current_accumulated_dist += sl; s['dist_end'] = current_accumulated_dist
-                    lines_to_draw.append(s)
-                    
-                    # Time calc
-                    if s['type'] == 'G0': self.estimated_time += sl / self.rapid_feed
-                    elif current_feed > 0: self.estimated_time += sl / current_feed
-
-                cx, cy, cz = nx, ny, nz
-        
-        self.total_length = current_accumulated_dist
-        if points_found:
-            self.min_point = [min(min_x, cx), min(min_y, cy), min(min_z, cz)]
-            self.max_point = [max(max_x, cx), max(max_y, cy), max(max_z, cz)]
-        return lines_to_draw
-
-    def generate_arc(self, start, end, center, mode, start_z, end_z, line_idx, tool_id):
-        segments = []
-        radius = math.sqrt((start[0]-center[0])**2 + (start[1]-center[1])**2)
-        if radius < 0.001: return [], 0
-        start_angle = math.atan2(start[1] - center[1], start[0] - center[0])
-        end_angle = math.atan2(end[1] - center[1], end[0] - center[0])
-        if mode == 'G2': 
-            if end_angle > start_angle: end_angle -= 2 * math.pi
-        else:
-            if end_angle < start_angle: end_angle += 2 * math.pi
-        sweep = abs(end_angle - start_angle)
-        length = sweep * radius
-        steps = max(6, int(sweep * radius * 0.5))
-        for i in range(1, steps + 1):
-            theta = start_angle + i * (sweep / steps) * (-1 if mode=='G2' else 1)
-            # Fix za smer
-            if mode == 'G2': theta = start_angle + i * ((end_angle - start_angle) / steps)
-            else: theta = start_angle + i * ((end_angle - start_angle) / steps)
-            
-            cur_x = center[0] + radius * math.cos(theta)
-            cur_y = center[1] + radius * math.sin(theta)
-            cur_z = start_z + i * ((end_z - start_z) / steps)
-            prv_x = center[0] + radius * math.cos(start_angle + (i-1)*((end_angle-start_angle)/steps))
-            prv_y = center[1] + radius * math.sin(start_angle + (i-1)*((end_angle-start_angle)/steps))
-            prv_z = start_z + (i-1)*((end_z-start_z)/steps)
-            segments.append({'source_line': line_idx, 'tool': tool_id, 'type': mode, 'start': (prv_x, prv_y, prv_z), 'end': (cur_x, cur_y, cur_z)})
-        return segments, length
\ No newline at end of file
+        with span('parse.lex') as s:
+            words = lex_cached(text); s.count(lines=words.n_lines, words=len(words))
+        with span('parse.blocks') as s:
+            blocks = blocks_from_words(words, ModalState()); s.count(blocks=len(blocks))
+        path = expand_blocks(blocks, self.rapid_feed, self.arc_tolerance).index_lines(words.n_lines)
+        self.total_length = path.total_length
+        self.estimated_time = blocks.estimated_time
+        if len(path): self.min_point, self.max_point = path.bounds()
+        return path
+
+    # --- NOVO: Inkrementalno parsiranje (editor) ---
+    @traced('parse_incremental', lambda path: {'segments': len(path)})
+    def parse_incremental(self, text, cancel=None):
+        """
+        Kao parse(), ali pamti modalno stanje na svakih CHECKPOINT_LINES linija. Posle izmene
+        parsira se samo od poslednjeg checkpoint-a pre prve promenjene linije, dok se stanje
+        masine ne poklopi sa prethodnim prolazom. Taj opseg segmenata se ubacuje u stari
+        rezultat, a duzina i vreme ostatka se ponovo sabiraju redom (duzine iz tacaka, vremena
+        po segmentu iz snapshot-a), pa je putanja bit-identicna sa parse().
+        cancel (CancelToken) se proverava posle svakog checkpoint-a; prekid ne menja snapshot.
+        """
+        new_lines = text.split('\n')
+        snap = self.snapshot
+        if snap is None or snap.settings != (self.rapid_feed, self.arc_tolerance):
+            snap = ParseSnapshot([], Toolpath.empty(), {0: ModalState()}, None, np.zeros(0))
+        old_lines, n_new = snap.lines, len(new_lines)
+        n_old = len(old_lines)
+        if old_lines == new_lines: return snap.path
+
+        # Zajednicki pocetak i kraj starog i novog teksta
+        first, limit = 0, min(n_old, n_new)
+        while first < limit and old_lines[first] == new_lines[first]: first += 1
+        same_tail = 0
+        while same_tail < limit - first and old_lines[n_old - 1 - same_tail] == new_lines[n_new - 1 - same_tail]: same_tail += 1
+        delta = n_new - n_old
+        tail_start = n_new - same_tail
+
+        # Kandidati za spajanje: stari checkpoint-i u nepromenjenom kraju (u novim indeksima)
+        old_marks = sorted(snap.checkpoints)
+        rejoin = [o + delta for o in old_marks if o + delta >= tail_start and o > 0]
+        restart = old_marks[bisect_right(old_marks, first) - 1]
+        state = snap.checkpoints[restart].copy()
+        blocks = BlockBuffer(); new_marks = {restart: state.copy()}
+        line, stop = restart, n_new
+        while line < n_new:
+            if cancel is not None: cancel.check()
+            end = min(line + CHECKPOINT_LINES, n_new)
+            k = bisect_right(rejoin, line)
+            if k < len(rejoin): end = min(end, rejoin[k])
+            blocks.extend(self.read_blocks('\n'.join(new_lines[line:end]), state, line))
+            line = end
+            new_marks[line] = state.copy()
+            old = snap.checkpoints.get(line - delta) if line >= tail_start else None
+            if old is not None and old == state:
+                stop = line; break
+
+        # Zamena segmenata starih linija [restart, stop - delta) novim
+        old_path = snap.path
+        s0 = int(np.searchsorted(old_path.source_lines, restart))
+        s1 = int(np.searchsorted(old_path.source_lines, stop - delta))
+        dist0 = float(old_path.dist_end[s0 - 1]) if s0 else 0.0
+        time0 = float(old_path.time_end[s0 - 1]) if s0 else 0.0
+        part = expand_blocks(blocks, self.rapid_feed, self.arc_tolerance, dist0, time0)
+        times = np.concatenate((snap.times[:s0], blocks.segment_times, snap.times[s1:]))
+        tail = old_path.slice(s1, len(old_path))
+        if len(tail):
+            # Isti redosled sabiranja kao parse(): pomeraj za razliku bi se razlikovao u zaokruzivanju
+            new_dist = part.total_length if len(part) else dist0
+            new_time = part.total_time if len(part) else time0
+            tail = Toolpath(tail.start, tail.end, tail.types, tail.tools, tail.source_lines + delta,
+                            running_sum(segment_lengths(tail.start, tail.end), new_dist),
+                            running_sum(snap.times[s1:], new_time))
+        path = Toolpath.concatenate([old_path.slice(0, s0), part, tail]).index_lines(n_new)
+
+        checkpoints = {l: s for l, s in snap.checkpoints.items() if l < restart}
+        checkpoints.update(new_marks)
+        checkpoints.update({o + delta: s for o, s in snap.checkpoints.items() if o + delta > stop})
+        self.snapshot = ParseSnapshot(new_lines, path, checkpoints, (self.rapid_feed, self.arc_tolerance), times)
+
+        self.reset_stats()
+        self.total_length = path.total_length
+        self.estimated_time = path.total_time
+        if len(path): self.min_point, self.max_point = path.bounds()
+        return path
+
+    # --- NOVO: Parsiranje direktno iz fajla (mmap, paket po paket) ---
+    @traced('parse_file', lambda path: {'segments': len(path)})
+    def parse_file(self, filepath, batch_bytes=BATCH_BYTES, cancel=None, progress=None):
+        """
+        Isto kao parse(), ali fajl se ne ucitava ceo u memoriju: linije se
+        dekodiraju u paketima, modalno stanje (mod, posmak, alat, pozicija)
+        se prenosi iz paketa u paket, a segmenti se dodaju u rastuci bafer.
+        Posle svakog paketa: cancel.check() i progress(putanja_do_sada, broj_linija) -
+        putanja su pogledi na vec popunjen deo bafera (kasniji paketi ih ne menjaju).
+        """
+        self.reset_stats()
+        state = ModalState()
+        out = ToolpathBuilder()
+        dist, est_time, n_lines = 0.0, 0.0, 0
+        for line_offset, text, n in iter_text_batches(filepath, batch_bytes):
+            if cancel is not None: cancel.check()
+            blocks = self.read_blocks(text, state, line_offset)
+            part = expand_blocks(blocks, self.rapid_feed, self.arc_tolerance, dist, est_time)
+            out.extend(part)
+            if len(part): dist = part.total_length
+            est_time = blocks.estimated_time
+            n_lines = line_offset + n
+            if progress is not None: progress(out.build(), n_lines)
+        path = out.build().index_lines(n_lines)
+        self.total_length = path.total_length
+        self.estimated_time = est_time
+        if len(path): self.min_point, self.max_point = path.bounds()
+        return path
+
+    # --- NOVO: Paralelno parsiranje (vise procesa) ---
+    @traced('parse_parallel', lambda path: {'segments': len(path)})
+    def parse_parallel(self, filepath, workers=None, cancel=None):
+        """
+        Fajl se deli na komade poravnate na kraj linije i svaki proces cita blokove svog komada
+        pocevsi od nepoznatog modalnog stanja. Zatim se redom (jeftino, po komadu) racuna stanje
+        na granicama i popunjava ono sto je komad nasledio, a geometrija, duzina i vreme se
+        racunaju jednom za sve - rezultat je bit-identican sa parse_file().
+        """
+        workers = workers or os.cpu_count() or 1
+        ranges = line_aligned_ranges(filepath, workers)
+        if workers == 1 or len(ranges) < 2: return self.parse_file(filepath, cancel=cancel)
+        self.reset_stats()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(read_file_range, [filepath] * len(ranges), *zip(*ranges)))
+        if cancel is not None: cancel.check()
+        blocks = BlockBuffer(); state = ModalState(); line_offset = 0
+        for part, exit_state, n_lines in parts:
+            part.resolve(state, line_offset)
+            blocks.extend(part)
+            state = state.followed_by(exit_state); line_offset += n_lines
+        path = expand_blocks(blocks, self.rapid_feed, self.arc_tolerance).index_lines(line_offset)
+        self.total_length = path.total_length
+        self.estimated_time = blocks.estimated_time
+        if len(path): self.min_point, self.max_point = path.bounds()
+        return path
+
+    def read_blocks(self, text, state=None, line_offset=0):
+        """Blokovi kretanja za komad teksta; state se azurira na stanje posle poslednje linije."""
+        return blocks_from_words(lex(text), ModalState() if state is None else state, line_offset)
+
+
+class ParseSnapshot:
+    """Stanje prethodnog parse_incremental poziva; times su vremena po segmentu putanje."""
+    def __init__(self, lines, path, checkpoints, settings, times):
+        self.lines = lines; self.path = path; self.checkpoints = checkpoints; self.settings = settings; self.times = times
+
+
+class ModalState:
+    """Modalno stanje masine izmedju blokova (i izmedju paketa linija)."""
+    def __init__(self, mode='G0', feed=100.0, tool=1, pos=(0.0, 0.0, 0.0)):
+        self.mode = mode; self.feed = feed; self.tool = tool; self.pos = pos
+
+    @classmethod
+    def unknown(cls):
+        # Pocetak komada fajla kada prethodni jos nije obradjen: sve "nasledjeno"
+        nan = float('nan')
+        return cls(None, nan, TOOL_UNKNOWN, (nan, nan, nan))
+
+    def copy(self):
+        return ModalState(self.mode, self.feed, self.tool, self.pos)
+
+    def __eq__(self, other):
+        return (self.mode, self.feed, self.tool, self.pos) == (other.mode, other.feed, other.tool, other.pos)
+
+    def followed_by(self, exit_state):
+        """Stanje posle komada koji je poceo od 'self', a zavrsio se sa exit_state (nepoznato = nasledjeno)."""
+        return ModalState(self.mode if exit_state.mode is None else exit_state.mode,
+                          self.feed if math.isnan(exit_state.feed) else exit_state.feed,
+                          self.tool if exit_state.tool == TOOL_UNKNOWN else exit_state.tool,
+                          tuple(a if math.isnan(b) else b for a, b in zip(self.pos, exit_state.pos)))
+
+
+# --- BLOKOVI KRETANJA ---
+KIND_DRILL = TYPE_CODES['DRILL']
+KIND_UNKNOWN = 255
+TOOL_UNKNOWN = 0xFFFF
+ARC_KINDS = (TYPE_CODES['G2'], TYPE_CODES['G3'])
+
+class BlockBuffer:
+    """Jedan zapis po G-kod bloku sa kretanjem (pre razbijanja lukova u tetive), kolone su NumPy nizovi."""
+    DTYPES = (('kinds', np.uint8, ()), ('lines', np.int32, ()), ('tools', np.uint16, ()), ('feeds', np.float64, ()),
+              ('start', np.float64, (3,)), ('end', np.float64, (3,)), ('ij', np.float64, (2,)), ('drill_r', np.float64, ()))
+
+    def __init__(self, *columns):
+        self.parts = [columns] if columns else []  # Delovi se spajaju tek u arrays()
+        self.estimated_time = 0.0
+
+    def __len__(self): return sum(len(part[0]) for part in self.parts)
+
+    def extend(self, other):
+        self.parts.extend(other.parts)
+
+    def arrays(self):
+        if not self.parts: return tuple(np.empty((0,) + shape, dtype=dt) for _, dt, shape in self.DTYPES)
+        if len(self.parts) > 1: self.parts = [tuple(np.concatenate(col) for col in zip(*self.parts))]
+        return self.parts[0]
+
+    def resolve(self, state, line_offset=0):
+        """Popunjava vrednosti nasledjene sa pocetka komada (procitanog od ModalState.unknown())."""
+        if not len(self): return
+        kinds, lines, tools, feeds, start, end, _, _ = self.arrays()
+        lines += line_offset
+        kinds[kinds == KIND_UNKNOWN] = TYPE_CODES[state.mode]
+        tools[tools == TOOL_UNKNOWN] = state.tool
+        feeds[np.isnan(feeds)] = state.feed
+        for axis in range(3):
+            start[np.isnan(start[:, axis]), axis] = state.pos[axis]
+            end[np.isnan(end[:, axis]), axis] = state.pos[axis]
+
+
+# --- NOVO: Modalno stanje po liniji iz toka reci (bez Python petlje po linijama) ---
+MOTION_CODES = (0, 1, 2, 3, 81, 83)
+DRILL_CODES = (81, 83)
+KIND_OF_CODE = np.full(84, KIND_UNKNOWN, dtype=np.uint8)
+for _code in MOTION_CODES: KIND_OF_CODE[_code] = TYPE_CODES[f'G{_code}']
+
+
+def forward_fill(values, initial):
+    """Svaki NaN dobija poslednju zadatu vrednost pre sebe (ili initial ako je nema)."""
+    idx = np.where(np.isnan(values), -1, np.arange(len(values)))
+    np.maximum.accumulate(idx, out=idx)
+    return np.where(idx >= 0, values[idx], initial)
+
+
+class LineTable:
+    """
+    Stanje masine za svaku liniju teksta, izracunato iz WordStream-a i pocetnog ModalState-a:
+      mode    -> G broj aktivnog moda (0/1/2/3/81/83, NaN = nepoznat)
+      moved   -> linija ima X/Y/Z;  drill -> linija ima G81/G83;  block = moved | drill
+      before  -> pozicija pre linije, target -> zadata tacka, after -> pozicija posle linije
+      feed, tool (NaN = nepoznat), ij (centar luka relativno), r (R ravan busenja)
+    Parser i Smart Scan koriste istu tabelu, pa "G0 u G01" vise ne moze da se desi.
+    """
+
+    def __init__(self, words, state):
+        n = words.n_lines
+        self.drill = words.has('G', DRILL_CODES)
+        raw = [words.last(axis) for axis in 'XYZ']
+        coords = list(raw)
+        self.moved = ~(np.isnan(coords[0]) & np.isnan(coords[1]) & np.isnan(coords[2]))
+        self.block = self.moved | self.drill
+        self.mode = forward_fill(words.last('G', codes=MOTION_CODES), np.nan if state.mode is None else float(state.mode[1:]))
+        self.feed = forward_fill(words.last('F'), state.feed)
+        self.tool = forward_fill(words.last('T'), np.nan if state.tool == TOOL_UNKNOWN else state.tool)
+        self.ij = np.column_stack((words.last('I', 0.0), words.last('J', 0.0)))
+        self.r = words.last('R', 0.0)
+
+        # Posle busenja alat ostaje na R ravni
+        coords[2] = np.where(self.drill, self.r, coords[2])
+        self.after = np.column_stack([forward_fill(c, p) for c, p in zip(coords, state.pos)]).reshape(n, 3)
+        self.before = np.concatenate((np.array([state.pos], dtype=np.float64), self.after[:-1]))
+        self.target = np.column_stack(raw).reshape(n, 3)
+        missing = np.isnan(self.target)
+        self.target[missing] = self.before[missing]
+
+    def exit_state(self):
+        """ModalState posle poslednje linije."""
+        mode, feed, tool = self.mode[-1], self.feed[-1], self.tool[-1]
+        return ModalState(None if np.isnan(mode) else f'G{int(mode)}', float(feed),
+                          TOOL_UNKNOWN if np.isnan(tool) else int(tool), tuple(self.after[-1].tolist()))
+
+
+def blocks_from_words(words, state, line_offset=0):
+    """BlockBuffer za sve linije sa kretanjem; state se azurira na stanje posle poslednje linije."""
+    table = LineTable(words, state)
+    exit_state = table.exit_state()
+    state.mode, state.feed, state.tool, state.pos = exit_state.mode, exit_state.feed, exit_state.tool, exit_state.pos
+    sel = np.flatnonzero(table.block)
+    mode = table.mode[sel]
+    kinds = np.where(np.isnan(mode), KIND_UNKNOWN, KIND_OF_CODE[np.nan_to_num(mode).astype(np.int64)]).astype(np.uint8)
+    drill = table.drill[sel]
+    kinds[drill] = KIND_DRILL
+    tools = table.tool[sel]
+    tools = np.where(np.isnan(tools), TOOL_UNKNOWN, tools).astype(np.uint16)
+    # Busenje ne koristi I/J, a luk ne koristi R
+    ij = table.ij[sel]; ij[drill] = 0.0
+    drill_r = np.where(drill, table.r[sel], 0.0)
+    return BlockBuffer(kinds, (sel + line_offset).astype(np.int32), tools, table.feed[sel],
+                       table.before[sel], table.target[sel], ij, drill_r)
+
+
+def expand_blocks(blocks, rapid_feed, arc_tolerance=DEFAULT_ARC_TOLERANCE, dist_offset=0.0, time_offset=0.0):
+    """
+    Pretvara blokove u segmente: prave 1, busenje 2, lukovi N tetiva (svi lukovi u jednom NumPy prolazu).
+    dist_offset/time_offset su duzina i vreme pre ovih blokova; sabiranje ide redom od njih,
+    pa je rezultat po paketima bit-identican rezultatu za ceo program odjednom.
+    Vremena po segmentu ostaju u blocks.segment_times (parse_incremental ih cuva za ostatak).
+    """
+    blocks.estimated_time = time_offset; blocks.segment_times = np.zeros(0)
+    if not len(blocks): return Toolpath.empty()
+    kinds, lines, tools, feeds, start, end, ij, drill_r = blocks.arrays()
+    center = start[:, :2] + ij
+    is_arc = np.isin(kinds, ARC_KINDS); is_drill = kinds == KIND_DRILL
+
+    counts = np.ones(len(kinds), dtype=np.int64)
+    counts[is_drill] = 2
+    arc_ids = np.flatnonzero(is_arc)
+    with span('parse.arcs', arcs=len(arc_ids)) as s:
+        steps, arc_pts = tessellate_arcs(start[arc_ids], end[arc_ids], center[arc_ids], kinds[arc_ids] == TYPE_CODES['G2'], arc_tolerance)
+        s.count(chords=int(steps.sum()))
+    counts[arc_ids] = steps
+    offsets = np.cumsum(counts) - counts
+    total = int(counts.sum())
+
+    seg_block = np.repeat(np.arange(len(kinds)), counts)
+    seg_start = np.empty((total, 3)); seg_end = np.empty((total, 3))
+    seg_type = np.repeat(kinds, counts)
+
+    lin = ~is_arc & ~is_drill
+    seg_start[offsets[lin]] = start[lin]; seg_end[offsets[lin]] = end[lin]
+
+    d = np.flatnonzero(is_drill)
+    r_plane = end[d].copy(); r_plane[:, 2] = drill_r[d]
+    seg_start[offsets[d]] = start[d]; seg_end[offsets[d]] = r_plane; seg_type[offsets[d]] = TYPE_CODES['G0']
+    seg_start[offsets[d] + 1] = r_plane; seg_end[offsets[d] + 1] = end[d]
+
+    if len(arc_ids):
+        # Tacke luka k su [first_k, first_k + steps_k]; tetiva j ide od tacke j do j+1
+        first = np.cumsum(steps + 1) - (steps + 1)
+        arc_of_seg = np.repeat(np.arange(len(arc_ids)), steps)
+        j = np.arange(int(steps.sum())) - np.repeat(np.cumsum(steps) - steps, steps)
+        pt = first[arc_of_seg] + j
+        dst = offsets[arc_ids][arc_of_seg] + j
+        seg_start[dst] = arc_pts[pt]; seg_end[dst] = arc_pts[pt + 1]
+
+    lengths = segment_lengths(seg_start, seg_end)
+    seg_feed = feeds[seg_block]
+    rapid = seg_type == TYPE_CODES['G0']
+    times = np.zeros(total)
+    times[rapid] = lengths[rapid] / rapid_feed
+    cut = ~rapid & (seg_feed > 0)
+    times[cut] = lengths[cut] / seg_feed[cut]
+    time_end = running_sum(times, time_offset)
+    if total: blocks.estimated_time = float(time_end[-1])
+    blocks.segment_times = times
+
+    return Toolpath(seg_start, seg_end, seg_type, tools[seg_block], lines[seg_block], running_sum(lengths, dist_offset), time_end)
+
+
+def segment_lengths(start, end):
+    return np.sqrt(((end - start) ** 2).sum(axis=1))
+
+
+def running_sum(values, offset=0.0):
+    """Kumulativni zbir koji krece od offset-a (isti redosled sabiranja kao za ceo niz)."""
+    return np.cumsum(np.concatenate(([offset], values)))[1:]
+
+
+
+def read_file_range(filepath, start, stop):
+    """Posao jednog procesa u parse_parallel: blokovi jednog komada fajla."""
+    parser = SimpleParser(); state = ModalState.unknown(); blocks = BlockBuffer(); n_lines = 0
+    for line_offset, text, n in iter_text_batches(filepath, start=start, stop=stop):
+        blocks.extend(parser.read_blocks(text, state, line_offset))
+        n_lines = line_offset + n
+    return blocks, state, n_lines
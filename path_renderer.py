@@ -0,0 +1,119 @@
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+
+from toolpath import SEGMENT_TYPES
+
+# Boje po tipu segmenta (isti redosled kao SEGMENT_TYPES)
+TYPE_COLORS = {
+    'G0': (1.0, 0.3, 0.3, 1.0),
+    'G1': (0.0, 0.6, 1.0, 1.0),
+    'DRILL': (1.0, 1.0, 0.0, 1.0),
+}
+DEFAULT_COLOR = (0.0, 0.8, 0.4, 1.0)  # G2/G3 i ostalo
+
+VERTEX_SHADER = """
+#version 120
+attribute vec3 a_pos;
+attribute float a_type;
+uniform vec4 u_colors[8];
+uniform vec4 u_override;
+uniform float u_alpha;
+varying vec4 v_color;
+void main() {
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(a_pos, 1.0);
+    vec4 c = u_override.a > 0.0 ? u_override : u_colors[int(a_type + 0.5)];
+    v_color = vec4(c.rgb, c.a * u_alpha);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+varying vec4 v_color;
+void main() {
+    gl_FragColor = v_color;
+}
+"""
+
+
+class PathRenderer:
+    """
+    Putanja alata u GPU baferima (VBO): pozicije temena + tip segmenta po temenu.
+    Upload se radi jednom po update_path, a crtanje je jedan glDrawArrays bez Python petlje.
+    Boje i prigusivanje idu preko uniform promenljivih, bez ponovnog slanja podataka.
+    """
+
+    def __init__(self):
+        self.program = None
+        self.buffers = {}  # nivo detalja -> [vbo_pos, vbo_type, broj_temena, kapacitet u segmentima]
+
+    def init_gl(self):
+        self.program = shaders.compileProgram(
+            shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER),
+            shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        self.buffers = {}
+        self.loc_pos = glGetAttribLocation(self.program, "a_pos")
+        self.loc_type = glGetAttribLocation(self.program, "a_type")
+        self.loc_colors = glGetUniformLocation(self.program, "u_colors")
+        self.loc_override = glGetUniformLocation(self.program, "u_override")
+        self.loc_alpha = glGetUniformLocation(self.program, "u_alpha")
+        palette = np.array([TYPE_COLORS.get(t, DEFAULT_COLOR) for t in SEGMENT_TYPES] +
+                           [DEFAULT_COLOR] * (8 - len(SEGMENT_TYPES)), dtype=np.float32)
+        glUseProgram(self.program)
+        glUniform4fv(self.loc_colors, 8, palette)
+        glUseProgram(0)
+
+    def has_level(self, level):
+        return level in self.buffers
+
+    def clear_levels(self):
+        """Brise bafere svih nivoa detalja osim originalne putanje (nivo 0)."""
+        for level in [k for k in self.buffers if k]:
+            glDeleteBuffers(2, self.buffers.pop(level)[:2])
+
+    def upload(self, path, level=0, first=0):
+        """
+        Salje segmente (Toolpath) na GPU: 2 temena po segmentu. Sa first > 0 putanja je samo
+        porasla (progresivno ucitavanje): salju se segmenti [first, n), a bafer raste duplo.
+        """
+        if level not in self.buffers: self.buffers[level] = [*glGenBuffers(2), 0, 0]
+        vbo_pos, vbo_type, _, capacity = self.buffers[level]
+        n = len(path)
+        if first <= 0 or n > capacity:
+            capacity = max(n, 2 * capacity) if first > 0 else n
+            first = 0
+            for vbo, nbytes in ((vbo_pos, 24), (vbo_type, 8)):  # po segmentu: 2 x vec3 / 2 x float
+                glBindBuffer(GL_ARRAY_BUFFER, vbo)
+                glBufferData(GL_ARRAY_BUFFER, capacity * nbytes, None, GL_STATIC_DRAW)
+        if n > first:
+            positions = np.empty((n - first, 2, 3), dtype=np.float32)
+            positions[:, 0] = path.start[first:]
+            positions[:, 1] = path.end[first:]
+            types = np.repeat(path.types[first:].astype(np.float32), 2)
+            glBindBuffer(GL_ARRAY_BUFFER, vbo_pos)
+            glBufferSubData(GL_ARRAY_BUFFER, first * 24, positions.nbytes, positions)
+            glBindBuffer(GL_ARRAY_BUFFER, vbo_type)
+            glBufferSubData(GL_ARRAY_BUFFER, first * 8, types.nbytes, types)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.buffers[level][2:] = [2 * n, capacity]
+
+    def draw(self, first=0, count=None, alpha=1.0, override=None, level=0):
+        """Crta segmente [first, first + count) zadatog nivoa detalja kao GL_LINES."""
+        if level not in self.buffers: return
+        vbo_pos, vbo_type, vertex_count, _ = self.buffers[level]
+        if count is None: count = vertex_count // 2 - first
+        if count <= 0 or not vertex_count: return
+        glUseProgram(self.program)
+        glUniform1f(self.loc_alpha, alpha)
+        glUniform4f(self.loc_override, *(override or (0.0, 0.0, 0.0, 0.0)))
+        glBindBuffer(GL_ARRAY_BUFFER, vbo_pos)
+        glEnableVertexAttribArray(self.loc_pos)
+        glVertexAttribPointer(self.loc_pos, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo_type)
+        glEnableVertexAttribArray(self.loc_type)
+        glVertexAttribPointer(self.loc_type, 1, GL_FLOAT, GL_FALSE, 0, None)
+        glDrawArrays(GL_LINES, 2 * first, 2 * count)
+        glDisableVertexAttribArray(self.loc_pos)
+        glDisableVertexAttribArray(self.loc_type)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glUseProgram(0)
@@ -0,0 +1,174 @@
+"""
+Izbor segmenta klikom u 3D prikazu: uniformna mreza nad okvirima (AABB) segmenata.
+
+    index = SegmentIndex(path)                     (jednom po putanji)
+    seg = index.pick(origin, direction, radius)    -> indeks segmenta najblizeg kameri ili -1
+    path.source_lines[seg]                         (linija u editoru)
+    index.select_rect(mvp, (w, h), (x0, y0, x1, y1))  -> [(prva_linija, poslednja_linija), ...]
+
+Mreza ima oko CELL_SEGMENTS segmenata po celiji; osa koja je tanja od celije (npr. Z kod
+ravnih programa) dobija jednu celiju. Segment se upisuje u sve celije koje dodiruje njegov
+okvir (CSR: offsets po celiji + niz segmenata), sve u NumPy bez petlje po segmentima.
+Dugi segmenti (okvir preko vise od MAX_SEGMENT_CELLS celija, npr. dijagonalni G0) ne ulaze
+u mrezu nego u posebnu listu koja se uvek proverava cela.
+Upit uzorkuje zrak kroz mrezu na pola celije, uzima susedne celije (za radius) i tacno
+racuna rastojanje zrak-segment samo za te kandidate.
+"""
+import numpy as np
+
+# Prosecno segmenata po celiji mreze
+CELL_SEGMENTS = 2.0
+# Najvise celija po strani mreze
+MAX_AXIS_CELLS = 4096
+# Segmenti ciji okvir pokriva vise celija idu u listu dugih segmenata
+MAX_SEGMENT_CELLS = 64
+# Segmenata po paketu za select_rect (projekcija)
+RECT_CHUNK = 1_000_000
+
+
+class SegmentIndex:
+    """Prostorni indeks putanje (Toolpath) za pick i izbor pravougaonikom."""
+
+    def __init__(self, path):
+        self.path = path
+        n = len(path)
+        self.long = np.empty(0, dtype=np.int64)
+        if not n:
+            self.lo = np.zeros(3); self.cell = np.ones(3); self.dims = np.ones(3, dtype=np.int64)
+            self.offsets = np.zeros(2, dtype=np.int64); self.items = np.empty(0, dtype=np.int32)
+            return
+        lo = np.minimum(path.start, path.end); hi = np.maximum(path.start, path.end)
+        self.lo = lo.min(axis=0); extent = hi.max(axis=0) - self.lo
+        self.cell, self.dims = grid_shape(extent, n / CELL_SEGMENTS)
+        c0 = self.cells_of(lo); c1 = self.cells_of(hi)
+        span = c1 - c0 + 1
+        counts = span.prod(axis=1)
+        small = counts <= MAX_SEGMENT_CELLS
+        self.long = np.flatnonzero(~small)
+
+        # Svaki (segment, celija) par: pomeraj unutar okvira segmenta iz rednog broja para
+        seg = np.flatnonzero(small)
+        reps = counts[seg]
+        owner = np.repeat(seg, reps)
+        k = np.arange(int(reps.sum())) - np.repeat(np.cumsum(reps) - reps, reps)
+        sx, sy = span[owner, 0], span[owner, 1]
+        cx = c0[owner, 0] + k % sx; cy = c0[owner, 1] + (k // sx) % sy; cz = c0[owner, 2] + k // (sx * sy)
+        cell_ids = self.flat(cx, cy, cz)
+        order = np.argsort(cell_ids, kind='stable')
+        self.items = owner[order].astype(np.int32)
+        self.offsets = np.searchsorted(cell_ids[order], np.arange(int(self.dims.prod()) + 1))
+
+    def cells_of(self, points):
+        return np.clip(((points - self.lo) / self.cell).astype(np.int64), 0, self.dims - 1)
+
+    def flat(self, cx, cy, cz):
+        return (cz * self.dims[1] + cy) * self.dims[0] + cx
+
+    def candidates(self, cells):
+        """Segmenti iz celija (jedinstveni flat indeksi) plus svi dugi segmenti."""
+        starts = self.offsets[cells]; counts = self.offsets[cells + 1] - starts
+        k = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        found = self.items[np.repeat(starts, counts) + k]
+        return np.unique(np.concatenate((found.astype(np.int64), self.long)))
+
+    def ray_cells(self, origin, direction, radius):
+        """Celije kroz koje prolazi zrak (cev poluprecnika radius) unutar okvira mreze."""
+        hi = self.lo + self.cell * self.dims
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t0 = (self.lo - radius - origin) / direction; t1 = (hi + radius - origin) / direction
+        inside = (origin >= self.lo - radius) & (origin <= hi + radius)
+        near = np.where(direction == 0, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1))
+        far = np.where(direction == 0, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1))
+        t_in = max(float(near.max()), 0.0); t_out = float(far.min())
+        if not t_out >= t_in: return np.empty(0, dtype=np.int64)
+        # Korak je pola najmanje celije (ose sa jednom celijom se ne racunaju, mogu biti tanke)
+        split = self.dims > 1
+        step = 0.5 * float(self.cell[split].min() if split.any() else self.cell.max())
+        t = np.arange(t_in, t_out + step, step)
+        base = self.cells_of(origin + t[:, None] * direction)
+        # Susedne celije do udaljenosti radius + pola celije (korak uzorkovanja)
+        reach = np.minimum(np.ceil((radius + step) / self.cell), self.dims - 1).astype(np.int64)
+        axes = [np.arange(-r, r + 1) for r in reach]
+        shifts = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+        cells = np.unique(self.flat(*(np.clip(base[:, None, :] + shifts[None], 0, self.dims - 1).reshape(-1, 3).T)))
+        return cells
+
+    def pick(self, origin, direction, radius):
+        """Segment koji zrak (origin + t * direction, t >= 0) promasuje za najvise radius; najblizi kameri."""
+        if not len(self.path): return -1
+        origin = np.asarray(origin, dtype=np.float64); direction = np.asarray(direction, dtype=np.float64)
+        direction = direction / np.linalg.norm(direction)
+        segs = self.candidates(self.ray_cells(origin, direction, radius))
+        if not len(segs): return -1
+        dist, t = ray_segment_distance(origin, direction, self.path.start[segs], self.path.end[segs])
+        hit = np.flatnonzero(dist <= radius)
+        if not len(hit): return -1
+        # Najblizi kameri; iste dubine (npr. G0 iznad reza) resava manje rastojanje
+        best = hit[np.lexsort((dist[hit], np.round(t[hit] / max(radius, 1e-9))))[0]]
+        return int(segs[best])
+
+    def select_rect(self, mvp, viewport, rect):
+        """
+        Linije svih segmenata cija su oba kraja unutar pravougaonika ekrana rect = (x0, y0, x1, y1)
+        u pikselima (y nadole); mvp je 4x4 projekcija * model-view. Vraca opsege linija (od 0).
+        """
+        x0, x1 = sorted(rect[0::2]); y0, y1 = sorted(rect[1::2])
+        w, h = viewport
+        chosen = []
+        for first in range(0, len(self.path), RECT_CHUNK):
+            part = slice(first, first + RECT_CHUNK)
+            ok = None
+            for pts in (self.path.start[part], self.path.end[part]):
+                clip = pts @ mvp[:3, :3].T + mvp[:3, 3]
+                wc = pts @ mvp[3, :3] + mvp[3, 3]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    sx = (clip[:, 0] / wc + 1.0) * 0.5 * w; sy = (1.0 - clip[:, 1] / wc) * 0.5 * h
+                inside = (wc > 0) & (sx >= x0) & (sx <= x1) & (sy >= y0) & (sy <= y1)
+                ok = inside if ok is None else ok & inside
+            chosen.append(np.flatnonzero(ok) + first)
+        return line_ranges(self.path.source_lines[np.concatenate(chosen)] if chosen else np.empty(0, dtype=np.int32))
+
+
+def grid_shape(extent, target_cells):
+    """Velicina celije i broj celija po osi: ~target_cells celija, tanke ose dobijaju jednu celiju."""
+    extent = np.maximum(extent, 1e-9)
+    active = np.ones(3, dtype=bool)
+    target = max(float(target_cells), 1.0)
+    for _ in range(3):
+        cell = (np.prod(extent[active]) / target) ** (1.0 / active.sum())
+        thin = active & (extent < cell)
+        if not thin.any() or thin.all(): break
+        active &= ~thin
+    cell = max(cell, float(extent.max()) / MAX_AXIS_CELLS)
+    dims = np.clip(np.ceil(extent / cell).astype(np.int64), 1, MAX_AXIS_CELLS)
+    return extent / dims, dims
+
+
+def ray_segment_distance(origin, direction, a, b):
+    """Najmanje rastojanje zraka (jedinicni direction, t >= 0) od segmenata a-b i t te tacke na zraku."""
+    u = b - a; w = a - origin
+    uu = (u * u).sum(axis=1); ud = u @ direction; wd = w @ direction; wu = (w * u).sum(axis=1)
+    denom = uu - ud * ud
+    # Parametar na segmentu za najblizu tacku beskonacne prave zraka (paralelni: pocetak segmenta)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(denom > 1e-12 * np.maximum(uu, 1e-300), (ud * wd - wu) / denom, 0.0)
+    s = np.clip(np.nan_to_num(s), 0.0, 1.0)
+    p = a + s[:, None] * u
+    t = np.maximum((p - origin) @ direction, 0.0)
+    # Posle odsecanja t >= 0 najbliza tacka segmenta se trazi ponovo (projekcija tacke zraka)
+    q = origin + t[:, None] * direction
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.clip(np.nan_to_num(((q - a) * u).sum(axis=1) / uu), 0.0, 1.0)
+    p = a + s[:, None] * u
+    t = np.maximum((p - origin) @ direction, 0.0)
+    d = p - (origin + t[:, None] * direction)
+    return np.sqrt((d * d).sum(axis=1)), t
+
+
+def line_ranges(lines):
+    """Sortirane jedinstvene linije spojene u opsege uzastopnih: [(prva, poslednja), ...]."""
+    lines = np.unique(lines)
+    if not len(lines): return []
+    breaks = np.flatnonzero(np.diff(lines) > 1)
+    firsts = np.concatenate(([lines[0]], lines[breaks + 1])); lasts = np.concatenate((lines[breaks], [lines[-1]]))
+    return [(int(f), int(l)) for f, l in zip(firsts, lasts)]
@@ -0,0 +1,171 @@
+"""
+Merenje vrucih putanja (ucitavanje, parsiranje, scan, GPU upload, crtanje, DXF export).
+
+    from profiling import span
+    with span('parse', lines=n) as s:
+        ...
+        s.count(segments=len(path))
+
+Dok je merenje iskljuceno span() vraca jedan zajednicki prazan objekat (bez merenja i alokacija).
+Ukljucuje se sa enable() ili promenljivom okruzenja PYNC_PROFILE=1 (PYNC_PROFILE=memory meri i
+vrsno zauzece memorije preko tracemalloc-a, sto usporava Python kod). Rezultati: last(), summary()
+i write_chrome_trace() (chrome://tracing / Perfetto).
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+MAX_EVENTS = 100000  # Najstariji dogadjaji se odbacuju (dugo pokrenut viewer)
+
+
+class _NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def count(self, **counts): pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, recorder, name, counts):
+        self.recorder = recorder; self.name = name; self.counts = counts
+        self.peak = None
+
+    def count(self, **counts):
+        self.counts.update(counts)
+
+    def __enter__(self):
+        if self.recorder.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # Spoljasnji span pamti svoj dosadasnji vrh, jer reset_peak() brise zajednicki brojac
+            stack = self.recorder.memory_stack()
+            if stack: stack[-1][1] = max(stack[-1][1], peak)
+            stack.append([current, 0])
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.recorder.memory and tracemalloc.is_tracing():
+            stack = self.recorder.memory_stack()
+            if stack:
+                base, inner_peak = stack.pop()
+                peak = max(tracemalloc.get_traced_memory()[1], inner_peak)
+                self.peak = peak - base
+                if stack: stack[-1][1] = max(stack[-1][1], peak)
+        self.recorder.record(self, end)
+        return False
+
+
+class Recorder:
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.events = []
+        self.latest = {}  # ime -> poslednji zavrseni span
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def memory_stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None: stack = self.local.stack = []
+        return stack
+
+    def record(self, span, end):
+        event = {'name': span.name, 'ts': (span.start - self.origin) * 1e6, 'dur': (end - span.start) * 1e6,
+                 'tid': threading.get_ident(), 'counts': dict(span.counts), 'peak': span.peak}
+        with self.lock:
+            self.events.append(event)
+            if len(self.events) > MAX_EVENTS: del self.events[:len(self.events) - MAX_EVENTS]
+            self.latest[span.name] = event
+
+
+recorder = Recorder()
+
+
+def span(name, **counts):
+    if not recorder.enabled: return NULL_SPAN
+    return Span(recorder, name, counts)
+
+
+def traced(name, counts=None):
+    """Dekorator: ceo poziv funkcije je jedan span; counts(rezultat) daje brojace (npr. segmente)."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not recorder.enabled: return fn(*args, **kwargs)
+            with Span(recorder, name, {}) as s:
+                result = fn(*args, **kwargs)
+                if counts is not None: s.count(**counts(result))
+                return result
+        return inner
+    return wrap
+
+
+def enable(memory=False):
+    recorder.enabled = True
+    recorder.memory = memory
+    if memory and not tracemalloc.is_tracing(): tracemalloc.start()
+
+
+def disable():
+    recorder.enabled = False
+    if recorder.memory and tracemalloc.is_tracing(): tracemalloc.stop()
+    recorder.memory = False
+
+
+def is_enabled():
+    return recorder.enabled
+
+
+def clear():
+    with recorder.lock:
+        recorder.events = []; recorder.latest = {}
+
+
+def last(name):
+    """Poslednji zavrseni span sa tim imenom (dict sa 'dur' u mikrosekundama, 'counts', 'peak') ili None."""
+    return recorder.latest.get(name)
+
+
+def now():
+    """Trenutno vreme u jedinicama 'ts' dogadjaja (mikrosekunde od pokretanja)."""
+    return (time.perf_counter() - recorder.origin) * 1e6
+
+
+def summary(names=None, since=None):
+    """Kratak tekst za status bar: 'parse_file 1.23 s, gl.upload 45 ms' (samo spanovi zapoceti posle 'since')."""
+    parts = []
+    for name in (names or recorder.latest):
+        e = recorder.latest.get(name)
+        if e is None or (since is not None and e['ts'] < since): continue
+        ms = e['dur'] / 1000.0
+        text = f"{name} {ms / 1000:.2f} s" if ms >= 1000 else f"{name} {ms:.0f} ms"
+        if e['peak'] is not None: text += f" / {e['peak'] / 1e6:.0f} MB"
+        parts.append(text)
+    return ", ".join(parts)
+
+
+def write_chrome_trace(filepath):
+    """Chrome trace format (JSON): otvara se u chrome://tracing ili ui.perfetto.dev."""
+    pid = os.getpid()
+    with recorder.lock: events = list(recorder.events)
+    trace = []
+    for e in events:
+        args = dict(e['counts'])
+        if e['peak'] is not None: args['peak_bytes'] = e['peak']
+        trace.append({'name': e['name'], 'cat': e['name'].split('.')[0], 'ph': 'X', 'ts': e['ts'], 'dur': e['dur'],
+                      'pid': pid, 'tid': e['tid'], 'args': args})
+    with open(filepath, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+    return len(trace)
+
+
+if os.environ.get('PYNC_PROFILE'):
+    enable(memory=os.environ['PYNC_PROFILE'] == 'memory')
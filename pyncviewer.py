@@ -0,0 +1,176 @@
+"""
+PyNC Viewer bez GUI-ja: parsiranje, Smart Scan, transformacije i DXF export iz komandne linije.
+
+    python pyncviewer.py stats program.nc
+    python pyncviewer.py scan program.nc            (exit kod: 0 ok, 1 warning, 2 error, 3 critical)
+    python pyncviewer.py scan program.nc --no-collision   (bez simulacije sirovine: samo G0 ispod Z0)
+    python pyncviewer.py transform program.nc -o out.nc --mirror-x
+    python pyncviewer.py transform program.nc -o out.nc --mm-to-inch --shift 10 0 0   (redom, jedan prolaz)
+    python pyncviewer.py renumber program.nc -o out.nc --start 10 --step 10
+    python pyncviewer.py strip-n program.nc -o out.nc
+    python pyncviewer.py export-dxf program.nc -o program.dxf
+
+Ne uvozi Qt ni OpenGL; NumPy/ezdxf se uvoze tek u komandi koja ih koristi.
+Iste funkcije (stats, scan, transform, renumber, strip_numbers, export_dxf) mogu da se zovu
+i iz Python skripti; transform/renumber/strip-n rade fajl u fajl, paket po paket (progress).
+"""
+import argparse
+import json
+import sys
+
+SEVERITY_EXIT = {'WARNING': 1, 'ERROR': 2, 'CRITICAL': 3}
+
+
+def load_settings(path=None):
+    from config_manager import ConfigManager
+    return ConfigManager(path or "settings.json").load_config()
+
+
+def make_parser(settings):
+    from parser import SimpleParser
+    parser = SimpleParser()
+    parser.set_rapid_feed(settings['rapid_feed'])
+    parser.set_arc_tolerance(settings.get('arc_tolerance', 0.01))
+    return parser
+
+
+def read_text(path):
+    with open(path, 'r') as f: return f.read()
+
+
+def stats(path, settings=None):
+    settings = settings or load_settings()
+    parser = make_parser(settings)
+    toolpath = parser.parse_file(path)
+    from toolpath import SEGMENT_TYPES
+    counts = {name: int((toolpath.types == code).sum()) for code, name in enumerate(SEGMENT_TYPES)}
+    from cycle_time import MachineDynamics, estimate_cycle_time
+    dynamics = MachineDynamics.from_settings(settings)
+    cycle = estimate_cycle_time(toolpath, dynamics) if dynamics else None
+    return {
+        'file': path,
+        'segments': len(toolpath),
+        'segments_by_type': {k: v for k, v in counts.items() if v},
+        'tools': sorted({int(t) for t in set(toolpath.tools.tolist())}),
+        'total_length': parser.total_length,
+        'estimated_time_min': parser.estimated_time,
+        'cycle_time_min': cycle.total if cycle else parser.estimated_time,
+        'cycle_time_by_tool': {f"T{t}": m for t, m in cycle.by_tool().items()} if cycle else {},
+        'operations': cycle.operations() if cycle else [],
+        'min_point': parser.min_point,
+        'max_point': parser.max_point,
+    }
+
+
+def scan(path, settings=None, collisions=True):
+    """collisions: putanja se parsira i G0 / drska se proveravaju protiv sirovine koja se skida."""
+    settings = settings or load_settings()
+    limits = [settings['machine_size_x'], settings['machine_size_y'], settings['machine_size_z']]
+    from smart_scan import scan as smart_scan
+    toolpath = shapes = None
+    if collisions:
+        from stock_sim import tool_shapes
+        toolpath = make_parser(settings).parse_file(path)
+        shapes = tool_shapes(settings.get('tool_library', {}), settings.get('tool_corner_radius'), settings.get('tool_flute_length'))
+    report = smart_scan(read_text(path), settings.get('tool_library', {}), limits, path=toolpath, shapes=shapes)
+    worst = report.worst()
+    return {'file': path, 'issues': report.issues(), 'count': len(report), 'counts': report.counts(),
+            'exit_code': SEVERITY_EXIT.get(worst, 1) if worst else 0}
+
+
+def transform(path, out_path, mode, offsets=None, progress=None):
+    """mode: jedna transformacija ili lista (npr. ['mm_to_inch', ('shift', (10, 0, 0))]), sve u jednom prolazu."""
+    from transforms import plan_for
+    lines = plan_for(mode, offsets).apply_file(path, out_path, progress=progress)
+    names = [m[0] if isinstance(m, tuple) else m for m in ([mode] if isinstance(mode, (str, tuple)) else mode)]
+    return {'file': path, 'output': out_path, 'transform': names, 'lines': lines}
+
+
+def renumber(path, out_path, start=10, step=10, progress=None):
+    from transforms import renumber_file
+    lines = renumber_file(path, out_path, start, step, progress)
+    return {'file': path, 'output': out_path, 'start': start, 'step': step, 'lines': lines}
+
+
+def strip_numbers(path, out_path, progress=None):
+    from transforms import strip_line_numbers_file
+    return {'file': path, 'output': out_path, 'lines': strip_line_numbers_file(path, out_path, progress)}
+
+
+class AppendShift(argparse.Action):
+    """--shift X Y Z se dodaje u listu transformacija na svom mestu (redosled iz komandne linije)."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        namespace.modes = (namespace.modes or []) + [('shift', tuple(values))]
+
+
+def export_dxf(path, out_path, settings=None, stream=None):
+    from dxf_exporter import DXFExporter
+    toolpath = make_parser(settings or load_settings()).parse_file(path)
+    ok, msg = DXFExporter().export(out_path, toolpath, stream)
+    return {'file': path, 'output': out_path, 'segments': len(toolpath), 'success': ok, 'message': msg}
+
+
+def build_arg_parser():
+    ap = argparse.ArgumentParser(prog="pyncviewer", description="PyNC Viewer command line tools (no GUI).")
+    ap.add_argument("--settings", help="settings.json to use (machine limits, rapid feed, tool library)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("stats", help="parse a program and print path statistics")
+    p.add_argument("file")
+    p = sub.add_parser("scan", help="Smart Scan; exit code 0 clean, 1 warning, 2 error, 3 critical")
+    p.add_argument("file")
+    p.add_argument("--no-collision", dest="collisions", action="store_false",
+                   help="skip the stock collision check (rapids are only checked against Z0)")
+    p = sub.add_parser("transform", help="mirror / scale / shift / swap axes (several are applied in the given order)")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--mirror-x", dest="modes", action="append_const", const="mirror_x")
+    p.add_argument("--mirror-y", dest="modes", action="append_const", const="mirror_y")
+    p.add_argument("--mm-to-inch", dest="modes", action="append_const", const="mm_to_inch")
+    p.add_argument("--inch-to-mm", dest="modes", action="append_const", const="inch_to_mm")
+    p.add_argument("--swap-axes", dest="modes", action="append_const", const="swap_axes_maho")
+    p.add_argument("--shift", dest="modes", nargs=3, type=float, metavar=("X", "Y", "Z"), action=AppendShift)
+    p = sub.add_parser("renumber", help="renumber N words (blank lines are kept, other lines get a new N)")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--start", type=int, default=10)
+    p.add_argument("--step", type=int, default=10)
+    p = sub.add_parser("strip-n", help="remove N words from the start of each line")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p = sub.add_parser("export-dxf", help="export the toolpath to DXF")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--r12", dest="stream", action="store_const", const=True,
+                   help="stream entities straight to an R12 file (default above 1M segments; otherwise R2010)")
+    return ap
+
+
+def main(argv=None):
+    ap = build_arg_parser()
+    args = ap.parse_args(argv)
+    if args.command == "transform" and not args.modes:
+        ap.error("transform: choose at least one of --mirror-x, --mirror-y, --mm-to-inch, --inch-to-mm, --swap-axes, --shift")
+    try:
+        if args.command == "transform":
+            result = transform(args.file, args.output, args.modes)
+            code = 0
+        elif args.command == "renumber":
+            result = renumber(args.file, args.output, args.start, args.step); code = 0
+        elif args.command == "strip-n":
+            result = strip_numbers(args.file, args.output); code = 0
+        else:
+            settings = load_settings(args.settings)
+            if args.command == "stats": result = stats(args.file, settings); code = 0
+            elif args.command == "scan": result = scan(args.file, settings, args.collisions); code = result['exit_code']
+            else: result = export_dxf(args.file, args.output, settings, args.stream); code = 0 if result['success'] else 4
+    except OSError as e:
+        result = {'error': str(e)}; code = 4
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Smart Scan: pravila su NumPy maske nad modalnim stanjem po liniji (parser.LineTable).
+
+Svako pravilo vraca masku linija sa problemom; poruke (dict-ovi) se prave tek kada se
+izvestaj prikazuje, i to najvise MAX_ISSUES_PER_RULE po pravilu. Sa putanjom (scan(..., path=))
+brzi hodovi i drska alata se proveravaju protiv sirovine koja se skida (collision), a ne Z < 0.
+Dodatno pravilo:
+
+    from smart_scan import ScanRule, register_rule
+    register_rule(ScanRule('max_depth_t1', 'WARNING',
+                           lambda ctx: ctx.table.moved & (ctx.table.tool == 1) & (ctx.table.target[:, 2] < -5.0),
+                           lambda ctx, i: f"T1 deeper than 5 mm (Z{ctx.table.target[i, 2]})"))
+"""
+import numpy as np
+
+from collision import check_collisions
+from lexer import lex_cached
+from parser import LineTable, ModalState, forward_fill
+from profiling import traced
+from stock_sim import tool_shapes
+
+MAX_ISSUES_PER_RULE = 200
+SEVERITY_ORDER = ('WARNING', 'ERROR', 'CRITICAL')
+
+
+class ScanRule:
+    """
+    name     -> kratak naziv (kljuc u izvestaju)
+    severity -> 'WARNING' / 'ERROR' / 'CRITICAL'
+    check    -> check(ctx) vraca bool masku duzine ctx.n_lines
+    message  -> message(ctx, i) tekst za liniju i (zove se samo za prikazane linije)
+    """
+
+    def __init__(self, name, severity, check, message):
+        self.name = name; self.severity = severity; self.check = check; self.message = message
+
+
+class ScanContext:
+    """Podaci koje pravila koriste: tok reci, LineTable i podesavanja; skuplje kolone se racunaju na zahtev."""
+
+    def __init__(self, words, tool_library, machine_limits, path=None, shapes=None):
+        self.words = words
+        self.n_lines = words.n_lines
+        # Stanje simulacije: start na nuli, bez posmaka, vretena i alata
+        self.table = LineTable(words, ModalState(None, 0.0, 0))
+        self.tool_library = tool_library
+        self.machine_limits = np.asarray(machine_limits, dtype=np.float64)
+        self.path = path  # Toolpath istog teksta (None: bez provere sudara sa sirovinom)
+        self.shapes = shapes
+        self._cache = {}
+
+    def column(self, key, compute):
+        if key not in self._cache: self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def spindle(self):
+        return self.column('spindle', lambda: forward_fill(self.words.last('S'), 0.0))
+
+    @property
+    def rapid(self):
+        return self.column('rapid', lambda: self.table.moved & (self.table.mode == 0))
+
+    @property
+    def cutting(self):
+        return self.column('cutting', lambda: self.table.moved & np.isin(self.table.mode, (1, 2, 3)))
+
+    @property
+    def tool_words(self):
+        """Po liniji: poslednji T broj na liniji (NaN ako ga nema)."""
+        return self.column('tool_words', lambda: self.words.last('T'))
+
+    @property
+    def collisions(self):
+        """collision.CollisionReport za putanju (racuna se jednom, za sva pravila)."""
+        shapes = self.shapes if self.shapes is not None else tool_shapes(self.tool_library)
+        return self.column('collisions', lambda: check_collisions(self.path, shapes))
+
+    def collision_depth(self, kind):
+        """Po liniji: najveca dubina sudara 'rapid' ili 'shank' (0 bez sudara ili bez putanje)."""
+        if self.path is None: return np.zeros(self.n_lines)
+        return self.column(('collision', kind), lambda: self.collisions.line_depths(self.n_lines, kind))
+
+
+def _unknown_tools(ctx):
+    known = [int(k) for k in ctx.tool_library if str(k).isdigit()]
+    lines, values = ctx.words.words('T')
+    t = np.trunc(values)
+    mask = np.zeros(ctx.n_lines, dtype=bool)
+    mask[lines[~np.isin(t, known) & (t != 0)]] = True
+    return mask
+
+
+def _target(ctx, i):
+    return tuple(ctx.table.target[i].tolist())
+
+
+def _without_path(check):
+    """Pravilo Z < 0 vazi samo kada nema putanje (sa putanjom ga zamenjuje provera sudara)."""
+    return lambda ctx: check(ctx) if ctx.path is None else np.zeros(ctx.n_lines, dtype=bool)
+
+
+BUILTIN_RULES = [
+    ScanRule('unknown_tool', 'WARNING', _unknown_tools,
+             lambda ctx, i: f"Tool T{int(ctx.tool_words[i])} not in Tool Library."),
+    ScanRule('machine_limits', 'WARNING',
+             lambda ctx: ctx.table.moved & (ctx.table.target > ctx.machine_limits).any(axis=1),
+             lambda ctx, i: "Move exceeds machine limits ({},{},{})".format(*_target(ctx, i))),
+    ScanRule('rapid_into_material', 'CRITICAL',
+             _without_path(lambda ctx: ctx.rapid & (ctx.table.target[:, 2] < 0.0)),
+             lambda ctx, i: f"Rapid move (G0) into material (Z{_target(ctx, i)[2]})!"),
+    ScanRule('rapid_lateral_in_material', 'CRITICAL',
+             _without_path(lambda ctx: ctx.rapid & (ctx.table.before[:, 2] < 0.0) &
+                                       (ctx.table.target[:, :2] != ctx.table.before[:, :2]).any(axis=1)),
+             lambda ctx, i: f"Rapid lateral move inside material (Z{float(ctx.table.before[i, 2])})!"),
+    ScanRule('rapid_collision', 'CRITICAL',
+             lambda ctx: ctx.collision_depth('rapid') > 0,
+             lambda ctx, i: f"Rapid move (G0) collides with remaining stock ({ctx.collision_depth('rapid')[i]:.2f} mm deep)!"),
+    ScanRule('shank_collision', 'ERROR',
+             lambda ctx: ctx.collision_depth('shank') > 0,
+             lambda ctx, i: f"Tool shank hits stock above flute length ({ctx.collision_depth('shank')[i]:.2f} mm)!"),
+    ScanRule('no_feed', 'ERROR',
+             lambda ctx: ctx.cutting & (ctx.table.feed <= 0.001),
+             lambda ctx, i: "Cutting move without Feed Rate (F)!"),
+    # Warning jer nekad ljudi pale vreteno rucno
+    ScanRule('no_spindle', 'WARNING',
+             lambda ctx: ctx.cutting & (ctx.spindle <= 0.001),
+             lambda ctx, i: "Cutting move with Spindle Speed 0 (S)!"),
+]
+RULES = list(BUILTIN_RULES)
+
+
+def register_rule(rule):
+    """Dodaje pravilo koje ce svaki sledeci scan() proveriti (posle ugradjenih)."""
+    RULES.append(rule)
+    return rule
+
+
+def unregister_rule(name):
+    RULES[:] = [r for r in RULES if r.name != name]
+
+
+class ScanReport:
+    """Rezultat scan(): za svako pravilo indeksi linija sa problemom; dict-ovi se prave tek u issues()."""
+
+    def __init__(self, ctx, hits):
+        self.ctx = ctx
+        self.hits = hits  # [(pravilo, indeksi linija)]
+
+    def __len__(self):
+        return sum(len(lines) for _, lines in self.hits)
+
+    def counts(self):
+        return {rule.name: len(lines) for rule, lines in self.hits if len(lines)}
+
+    def worst(self):
+        """Najvisi nivo medju pogodjenim pravilima (None ako nema problema)."""
+        found = [r.severity for r, lines in self.hits if len(lines)]
+        return max(found, key=lambda s: SEVERITY_ORDER.index(s) if s in SEVERITY_ORDER else 0, default=None)
+
+    def is_capped(self, limit=MAX_ISSUES_PER_RULE):
+        return any(len(lines) > limit for _, lines in self.hits)
+
+    def issues(self, limit=MAX_ISSUES_PER_RULE):
+        """Lista [{'line', 'type', 'msg', 'rule'}], najvise 'limit' po pravilu, sortirana po liniji."""
+        rows = []
+        for order, (rule, lines) in enumerate(self.hits):
+            for i in lines[:limit].tolist():
+                rows.append((i, order, {'line': i + 1, 'type': rule.severity, 'msg': rule.message(self.ctx, i), 'rule': rule.name}))
+        rows.sort(key=lambda row: row[:2])
+        return [row[2] for row in rows]
+
+
+@traced('scan', lambda report: {'issues': len(report), 'rules': len(report.hits)})
+def scan(text, tool_library, machine_limits, rules=None, path=None, shapes=None):
+    """
+    Pokrece sva pravila (RULES ili zadata) nad tekstom programa. path je putanja istog teksta
+    (ukljucuje proveru sudara sa sirovinom), shapes {alat: stock_sim.ToolShape} (podrazumevano iz tool_library).
+    """
+    ctx = ScanContext(lex_cached(text), tool_library, machine_limits, path, shapes)
+    return ScanReport(ctx, [(rule, np.flatnonzero(rule.check(ctx))) for rule in (RULES if rules is None else rules)])
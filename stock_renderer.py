@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+from OpenGL.GL import *
+
+# Najvise temena po strani mreze za prikaz (mapa visina se smanjuje minimumom po bloku)
+MESH_MAX_CELLS = 1024
+# Boja netaknute povrsine i najdubljeg reza (dubina se boji linearno izmedju njih)
+TOP_COLOR = (0.72, 0.72, 0.68)
+DEEP_COLOR = (0.25, 0.55, 0.85)
+
+
+def mesh_factor(stock):
+    return max(1, int(math.ceil(max(stock.nx, stock.ny) / MESH_MAX_CELLS)))
+
+
+def display_heights(stock, factor, r0=0, r1=None):
+    """Redovi [r0, r1) mreze za prikaz: minimum po bloku factor x factor (rez se ne gubi)."""
+    nxd = -(-stock.nx // factor); r1 = -(-stock.ny // factor) if r1 is None else r1
+    h = stock.heights[r0 * factor:r1 * factor]
+    if factor == 1: return h
+    pad = np.full((-(-h.shape[0] // factor) * factor, nxd * factor), np.inf, dtype=np.float32)
+    pad[:h.shape[0], :h.shape[1]] = h
+    return pad.reshape(-1, factor, nxd, factor).min(axis=(1, 3))
+
+
+def mesh_rows(stock, factor, r0, r1):
+    """
+    Temena redova [r0, r1) mreze za prikaz: pozicije, normale i boje (float32, po temenu).
+    Normale su centralne razlike, pa se racunaju sa po jednim susednim redom.
+    """
+    nyd = -(-stock.ny // factor); step = stock.cell * factor
+    a, b = max(r0 - 1, 0), min(r1 + 1, nyd)
+    z = display_heights(stock, factor, a, b)
+    gy, gx = np.gradient(z, step) if min(z.shape) > 1 else (np.zeros_like(z), np.zeros_like(z))
+    z, gx, gy = z[r0 - a:r1 - a], gx[r0 - a:r1 - a], gy[r0 - a:r1 - a]
+    nxd = z.shape[1]
+    xs = stock.x0 + (np.arange(nxd) + 0.5) * step; ys = stock.y0 + (np.arange(r0, r1) + 0.5) * step
+    positions = np.empty(z.shape + (3,), dtype=np.float32)
+    positions[..., 0] = xs[None, :]; positions[..., 1] = ys[:, None]; positions[..., 2] = z
+    normals = np.empty_like(positions)
+    normals[..., 0] = -gx; normals[..., 1] = -gy; normals[..., 2] = 1.0
+    depth = np.clip((stock.top - z) / max(stock.top - stock.bottom, 1e-9), 0.0, 1.0)[..., None]
+    colors = (np.asarray(TOP_COLOR, np.float32) * (1.0 - depth) + np.asarray(DEEP_COLOR, np.float32) * depth).astype(np.float32)
+    return positions, normals, colors
+
+
+def grid_indices(rows, cols):
+    """Dva trougla po kvadratu mreze rows x cols temena (uint32, GL_TRIANGLES)."""
+    if rows < 2 or cols < 2: return np.empty(0, dtype=np.uint32)
+    v = np.arange(rows * cols, dtype=np.uint32).reshape(rows, cols)
+    a, b, c, d = v[:-1, :-1], v[:-1, 1:], v[1:, :-1], v[1:, 1:]
+    return np.stack((a, b, d, a, d, c), axis=-1).reshape(-1)
+
+
+class StockRenderer:
+    """
+    Sirovina (stock_sim.Stock) kao mreza trouglova u GPU baferima. Posle rezanja se salju
+    samo promenjeni redovi (Stock.take_dirty), pa je animacija sa simulacijom jeftina.
+    """
+
+    def __init__(self):
+        self.stock = None
+        self.buffers = None   # [vbo_pos, vbo_normal, vbo_color, ibo]
+        self.index_count = 0
+        self.full_upload = False
+
+    def init_gl(self):
+        self.buffers = None; self.full_upload = True  # Nov kontekst: stari baferi ne vaze
+
+    def set_stock(self, stock):
+        self.stock = stock; self.full_upload = True
+
+    def sync(self):
+        """Salje promene na GPU (poziva se u paintGL, kada je kontekst aktivan)."""
+        stock = self.stock
+        if stock is None: return
+        factor = mesh_factor(stock); nyd = -(-stock.ny // factor); nxd = -(-stock.nx // factor)
+        if self.full_upload or self.buffers is None:
+            if self.buffers is None: self.buffers = list(glGenBuffers(4))
+            stock.take_dirty()
+            positions, normals, colors = mesh_rows(stock, factor, 0, nyd)
+            for vbo, data in zip(self.buffers[:3], (positions, normals, colors)):
+                glBindBuffer(GL_ARRAY_BUFFER, vbo)
+                glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_DYNAMIC_DRAW)
+            indices = grid_indices(nyd, nxd)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.buffers[3])
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+            self.index_count = len(indices); self.full_upload = False
+        else:
+            dirty = stock.take_dirty()
+            if dirty is None: return
+            # Promenjeni redovi prikaza (+1 sused zbog normala), celi redovi su kontinualni u baferu
+            r0 = max(dirty[0] // factor - 1, 0); r1 = min(-(-dirty[1] // factor) + 1, nyd)
+            offset = r0 * nxd * 12  # 3 x float32 po temenu
+            for vbo, data in zip(self.buffers[:3], mesh_rows(stock, factor, r0, r1)):
+                glBindBuffer(GL_ARRAY_BUFFER, vbo)
+                glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        if self.stock is None or self.buffers is None or not self.index_count: return
+        vbo_pos, vbo_normal, vbo_color, ibo = self.buffers
+        glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_NORMAL_ARRAY); glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo_pos); glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo_normal); glNormalPointer(GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo_color); glColorPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+        glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0); glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY); glDisableClientState(GL_NORMAL_ARRAY); glDisableClientState(GL_COLOR_ARRAY)
+
+    def release(self):
+        if self.buffers is not None: glDeleteBuffers(4, self.buffers); self.buffers = None
@@ -0,0 +1,345 @@
+"""
+Simulacija skidanja materijala: Z mapa visina (dexel mreza) nad sirovinom.
+
+    from stock_sim import StockSimulator, tool_shapes
+    sim = StockSimulator(path, tool_shapes(settings['tool_library'], settings.get('tool_corner_radius'),
+                                           settings.get('tool_flute_length')))
+    sim.advance_to(dist)       (sirovina do kumulativne duzine dist; za animaciju, inkrementalno)
+    sim.run()                  (ceo program)
+    sim.stock.heights          (ny, nx) float32, sim.stock.take_dirty() -> promenjeni opseg celija
+
+Alat je valjak sa zaobljenim uglom: corner_radius 0 je ravno glodalo, r = D/2 kuglasto,
+izmedju toroidno (bull nose). Vrh alata je najniza tacka, kao u putanji parsera.
+
+Rezanje jednog alata je sivo erodiranje (min filter) mape vrhova alata profilom alata:
+  1. tacke vrha se uzorkuju duz segmenata (bar jedna po celiji) i upisuju u mapu vrhova
+     kao minimalni Z po celiji (np.minimum.at),
+  2. mapa vrhova se erodira diskom po redovima: za svaki pomeraj reda dy minimum prozora
+     sirine 2w+1 dolazi iz sparse tabele (dva pogleda), bez petlje po celijama,
+  3. zaobljeni deo profila je niz prstenova jednake visine (PROFILE_BANDS).
+Rezultat ne zavisi od redosleda segmenata (minimum), pa se ceo alat radi odjednom.
+Za pojedinacne segmente Stock.segment_surface racuna isto iz rastojanja celija od segmenta
+(collision.py rece tako kratke delove putanje izmedju provera).
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from profiling import span, traced
+
+# Najvise celija po strani mreze (2000 x 2000 = 16 MB float32)
+DEFAULT_MAX_CELLS = 2000
+# Gornja povrsina sirovine (Z0 kao u Smart Scan-u) i dodatak oko putanje (mm)
+STOCK_TOP = 0.0
+STOCK_MARGIN = 2.0
+# Stepenici visine za zaobljeni deo alata (greska visine <= corner_radius / (2 * PROFILE_BANDS))
+PROFILE_BANDS = 16
+# Najvise uzoraka vrha alata u memoriji odjednom, i redova mape po prolazu erodiranja
+MAX_SAMPLES = 2_000_000
+STRIP_ROWS = 256
+# Duzina reznog dela alata (iznad nje je drska); ista kao alat koji crta viewer
+FLUTE_LENGTH = 20.0
+
+
+class ToolShape:
+    """Profil alata: precnik, radijus ugla (0 ravno, D/2 kuglasto) i duzina reznog dela."""
+
+    def __init__(self, diameter, corner_radius=0.0, flute_length=FLUTE_LENGTH):
+        self.radius = max(float(diameter), 0.0) / 2.0
+        self.corner_radius = min(max(float(corner_radius), 0.0), self.radius)
+        self.flute_length = max(float(flute_length), 0.0)
+
+    def height(self, r):
+        """Visina profila iznad vrha na rastojanju r od ose (inf van alata)."""
+        r = np.asarray(r, dtype=np.float64)
+        core = self.radius - self.corner_radius; rc = self.corner_radius
+        ring = rc - np.sqrt(np.maximum(rc * rc - (r - core) ** 2, 0.0))
+        return np.where(r <= core, 0.0, np.where(r <= self.radius, ring, np.inf))
+
+    def bands(self, cell):
+        """Stepenici profila u celijama: [(radijus, visina)], od ravnog dna ka obodu."""
+        core = self.radius - self.corner_radius; rc = self.corner_radius
+        bands = [(core / cell, 0.0)]
+        n = min(PROFILE_BANDS, int(math.ceil(rc / cell))) if rc > 0 else 0
+        for k in range(1, n + 1):
+            # Radijus na kome profil dostize visinu k/n * rc; prsten dobija srednju visinu stepenika
+            h = rc * k / n
+            r = core + math.sqrt(max(rc * rc - (rc - h) ** 2, 0.0))
+            bands.append((r / cell, rc * (k - 0.5) / n))
+        return bands
+
+    def __repr__(self):
+        return f"ToolShape(d={2 * self.radius:g}, r={self.corner_radius:g})"
+
+
+def tool_shapes(tool_library, corner_radii=None, flute_lengths=None):
+    """{broj_alata: ToolShape} iz tool_library ({"1": precnik}), tool_corner_radius i tool_flute_length ({"1": mm})."""
+    corner_radii = corner_radii or {}; flute_lengths = flute_lengths or {}
+    return {int(t): ToolShape(d, corner_radii.get(str(t), 0.0), flute_lengths.get(str(t), FLUTE_LENGTH))
+            for t, d in tool_library.items()}
+
+
+def sample_segments(start, end, spacing, z_spacing=None):
+    """
+    Tacke duz segmenata, paket po paket (najvise MAX_SAMPLES): (indeks_segmenta, tacke (S, 3)),
+    redom kao na putanji. Razmak je najvise 'spacing' u XY (i 'z_spacing' po Z, ako je zadat).
+    """
+    if not len(start): return
+    delta = end - start
+    steps = np.ceil(np.hypot(delta[:, 0], delta[:, 1]) / spacing)
+    if z_spacing: steps = np.maximum(steps, np.ceil(np.abs(delta[:, 2]) / z_spacing))
+    steps = np.maximum(steps, 1).astype(np.int64)
+    counts = steps + 1; total = np.cumsum(counts)
+    # Segment duzi od MAX_SAMPLES je sam svoj paket
+    edges = np.searchsorted(total, np.arange(MAX_SAMPLES, total[-1], MAX_SAMPLES), side='right')
+    edges = sorted({0, len(start), *edges.tolist()})
+    for first, last in zip(edges[:-1], edges[1:]):
+        n = counts[first:last]; seg = np.repeat(np.arange(first, last), n)
+        # t = k / steps za k = 0..steps unutar svakog segmenta
+        k = np.arange(len(seg)) - np.repeat(np.cumsum(n) - n, n)
+        t = (k / steps[seg])[:, None]
+        yield seg, start[seg] + delta[seg] * t
+
+
+@lru_cache(maxsize=32)
+def erode_plan(bands, half):
+    """
+    Prolazi erodiranja: (dy, nivo sparse tabele, pocetak prvog i drugog pogleda, visina).
+    Za isti dy prsten sa istom sirinom prozora kao uzi (nizi) prsten se preskace.
+    """
+    plan = []
+    for dy in range(-half, half + 1):
+        last_w = -1
+        for radius, height in bands:
+            if dy * dy > radius * radius: continue
+            w = min(int(math.floor(math.sqrt(radius * radius - dy * dy))), half)
+            if w <= last_w: continue
+            last_w = w; k = int(math.floor(math.log2(2 * w + 1)))
+            plan.append((dy, k, half - w, half + w - (1 << k) + 1, np.float32(height)))
+    return tuple(plan)
+
+
+def erode(tips, half, bands):
+    """
+    Sivo erodiranje mape vrhova profilom alata. tips ima okvir od 'half' celija sa svake
+    strane (inf gde nema vrha); rezultat je velicine tips bez okvira.
+    """
+    rows, cols = tips.shape[0] - 2 * half, tips.shape[1] - 2 * half
+    out = np.full((rows, cols), np.inf, dtype=np.float32)
+    if rows <= 0 or cols <= 0: return out
+    levels = max(1, int(math.floor(math.log2(2 * half + 1))) + 1)
+    for r0 in range(0, rows, STRIP_ROWS):
+        r1 = min(r0 + STRIP_ROWS, rows)
+        strip = tips[r0:r1 + 2 * half]
+        if not np.isfinite(strip).any(): continue
+        # Sparse tabela: table[k][:, x] = min(strip[:, x : x + 2**k])
+        table = [strip]
+        for k in range(1, levels):
+            prev = table[-1]; step = 1 << (k - 1)
+            table.append(np.minimum(prev[:, :-step], prev[:, step:]))
+        block = out[r0:r1]; tmp = np.empty_like(block); n = r1 - r0
+        for dy, k, a, b, height in erode_plan(tuple(bands), half):
+            level = table[k]; src = slice(half + dy, half + dy + n)
+            np.minimum(level[src, a:a + cols], level[src, b:b + cols], out=tmp)
+            if height: tmp += height
+            np.minimum(block, tmp, out=block)
+    return out
+
+
+class Stock:
+    """Sirovina kao Z mapa: heights[iy, ix] je visina u centru celije (x0 + (ix + 0.5) * cell, ...)."""
+
+    def __init__(self, lo, hi, top=STOCK_TOP, bottom=None, max_cells=DEFAULT_MAX_CELLS):
+        self.x0, self.y0 = float(lo[0]), float(lo[1])
+        size_x = max(float(hi[0]) - self.x0, 1e-6); size_y = max(float(hi[1]) - self.y0, 1e-6)
+        self.cell = max(size_x, size_y) / max_cells
+        self.nx = max(1, int(math.ceil(size_x / self.cell))); self.ny = max(1, int(math.ceil(size_y / self.cell)))
+        self.top = float(top)
+        self.bottom = float(bottom) if bottom is not None else self.top - 1.0
+        self.heights = np.full((self.ny, self.nx), self.top, dtype=np.float32)
+        self.dirty = None  # (r0, r1, c0, c1) promenjene celije od poslednjeg take_dirty
+
+    @classmethod
+    def for_path(cls, path, shapes=None, max_cells=DEFAULT_MAX_CELLS):
+        """Sirovina oko segmenata ispod STOCK_TOP (uz radijus najveceg alata), od Z0 do najnizeg vrha."""
+        lo, hi = path.bounds()
+        below = (path.start[:, 2] < STOCK_TOP) | (path.end[:, 2] < STOCK_TOP)
+        if below.any():
+            pts = np.concatenate((path.start[below], path.end[below]))
+            lo, hi = pts.min(axis=0).tolist(), pts.max(axis=0).tolist()
+        pad = STOCK_MARGIN + max([s.radius for s in (shapes or {}).values()] or [0.0])
+        bottom = min(lo[2], STOCK_TOP) - 1.0
+        return cls((lo[0] - pad, lo[1] - pad), (hi[0] + pad, hi[1] + pad), STOCK_TOP, bottom, max_cells)
+
+    def reset(self):
+        self.heights.fill(self.top); self.dirty = (0, self.ny, 0, self.nx)
+
+    def mark_dirty(self, r0, r1, c0, c1):
+        if self.dirty is not None:
+            d = self.dirty; r0, r1, c0, c1 = min(r0, d[0]), max(r1, d[1]), min(c0, d[2]), max(c1, d[3])
+        self.dirty = (r0, r1, c0, c1)
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, None
+        return dirty
+
+    def cell_centers(self):
+        return self.x0 + (np.arange(self.nx) + 0.5) * self.cell, self.y0 + (np.arange(self.ny) + 0.5) * self.cell
+
+    def region(self, start, end, half):
+        """Opseg celija (r0, r1, c0, c1) koje alat sa dosegom 'half' celija moze da dodirne (None van mreze)."""
+        pts_lo = (np.minimum(start.min(axis=0), end.min(axis=0))[:2] - (self.x0, self.y0)) / self.cell
+        pts_hi = (np.maximum(start.max(axis=0), end.max(axis=0))[:2] - (self.x0, self.y0)) / self.cell
+        c0 = max(int(math.floor(pts_lo[0])) - half, 0); c1 = min(int(math.floor(pts_hi[0])) + half + 1, self.nx)
+        r0 = max(int(math.floor(pts_lo[1])) - half, 0); r1 = min(int(math.floor(pts_hi[1])) + half + 1, self.ny)
+        return (r0, r1, c0, c1) if r0 < r1 and c0 < c1 else None
+
+    def rasterize(self, values, points, region, half):
+        """
+        Upisuje minimum vrednosti po celiji u mapu regiona sa okvirom od 'half' celija
+        (tacka van sirovine i dalje dodiruje ivicu); tacke van mape se preskacu.
+        """
+        r0, r1, c0, c1 = region
+        shape = (r1 - r0 + 2 * half, c1 - c0 + 2 * half)
+        ix = np.floor((points[:, 0] - self.x0) / self.cell).astype(np.int64) - (c0 - half)
+        iy = np.floor((points[:, 1] - self.y0) / self.cell).astype(np.int64) - (r0 - half)
+        inside = (ix >= 0) & (ix < shape[1]) & (iy >= 0) & (iy < shape[0])
+        np.minimum.at(values.reshape(-1), iy[inside] * shape[1] + ix[inside], points[inside, 2].astype(np.float32))
+
+    def sweep(self, start, end, shape):
+        """Povrsina koju alat ostavlja segmentima start -> end (N, 3): (region, visine regiona) ili None."""
+        if not len(start) or shape.radius <= 0: return None
+        # Segmenti koji ne silaze ispod sirovine ne rezu nista
+        keep = np.minimum(start[:, 2], end[:, 2]) < self.top
+        start, end = start[keep], end[keep]
+        if not len(start): return None
+        half = int(math.ceil(shape.radius / self.cell))
+        region = self.region(start, end, half)
+        if region is None: return None
+        r0, r1, c0, c1 = region
+
+        # Mapa vrhova alata (minimalni Z po celiji)
+        tips = np.full((r1 - r0 + 2 * half, c1 - c0 + 2 * half), np.inf, dtype=np.float32)
+        for _, points in sample_segments(start, end, self.cell):
+            self.rasterize(tips, points[points[:, 2] < self.top], region, half)
+
+        with span('stock.erode', cells=(r1 - r0) * (c1 - c0), radius=half):
+            return region, erode(tips, half, shape.bands(self.cell))
+
+    def segment_surface(self, start, end, shape, slack=0.0, region=None, upper=False):
+        """
+        Povrsina koju alat ostavlja jednim segmentom, iz rastojanja centara celija od segmenta
+        (bez erodiranja, pa je za pojedinacne segmente mnogo brze). Segment se deli na delove
+        sa razlikom Z do jedne celije, a svaki deo se racuna na svom najnizem Z (upper=True:
+        na najvisem, za proveru sudara bez laznih prodora).
+        slack (mm) bocno suzava profil alata; region ogranicava racun na zadati opseg celija.
+        Vraca (region, visine regiona) ili None.
+        """
+        a = np.asarray(start, dtype=np.float64); b = np.asarray(end, dtype=np.float64)
+        radius = shape.radius - slack
+        if radius <= 0 or min(a[2], b[2]) >= self.top: return None
+        # Deo segmenta iznad sirovine ne dodiruje materijal
+        if max(a[2], b[2]) > self.top:
+            cross = a + (b - a) * ((self.top - a[2]) / (b[2] - a[2]))
+            if a[2] > self.top: a = cross
+            else: b = cross
+        # Alat manji od celije i dalje skida celiju u kojoj je vrh (kao zaokruzivanje vrha pri erodiranju)
+        reach = max(radius, self.cell * math.sqrt(0.5))
+        half = int(math.ceil(reach / self.cell))
+        own = self.region(a[None], b[None], half)
+        if own is None: return None
+        r0, r1, c0, c1 = region = own if region is None else region
+        surface = np.full((r1 - r0, c1 - c0), np.inf, dtype=np.float32)
+        # Pravo gore/dole: povrsina je tacna na najnizem Z, ne treba deliti
+        vertical = math.hypot(*(b - a)[:2]) < self.cell
+        pieces = 1 if vertical else max(1, int(math.ceil(abs(b[2] - a[2]) / self.cell)))
+        points = a + (b - a) * np.linspace(0.0, 1.0, pieces + 1)[:, None]
+        for p, q in zip(points[:-1], points[1:]):
+            sub = self.region(p[None], q[None], half)
+            if sub is None: continue
+            s0, s1, d0, d1 = max(sub[0], r0), min(sub[1], r1), max(sub[2], c0), min(sub[3], c1)
+            if s0 >= s1 or d0 >= d1: continue
+            xs = (self.x0 + (np.arange(d0, d1) + 0.5) * self.cell - p[0]).astype(np.float32)[None, :]
+            ys = (self.y0 + (np.arange(s0, s1) + 0.5) * self.cell - p[1]).astype(np.float32)[:, None]
+            dx, dy = q[0] - p[0], q[1] - p[1]; length2 = dx * dx + dy * dy
+            if length2 > 0:
+                t = xs * np.float32(dx / length2) + ys * np.float32(dy / length2)
+                np.clip(t, 0.0, 1.0, out=t)
+                ex = xs - t * np.float32(dx); ey = ys - t * np.float32(dy)
+            else: ex, ey = np.broadcast_arrays(xs, ys)
+            dist2 = ex * ex + ey * ey
+            z = np.float32(max(p[2], q[2]) if upper and not vertical else min(p[2], q[2]))
+            # Ravno glodalo: ceo disk je na visini vrha
+            inside = dist2 <= np.float32(reach * reach)
+            if shape.corner_radius == 0: cut = np.where(inside, z, np.float32(np.inf))
+            else: cut = np.where(inside, z + shape.height(np.minimum(np.sqrt(dist2) + slack, shape.radius)), np.inf).astype(np.float32)
+            view = surface[s0 - r0:s1 - r0, d0 - c0:d1 - c0]
+            np.minimum(view, cut, out=view)
+        return region, surface
+
+    def apply(self, region, surface):
+        """Skida materijal do povrsine (rezultat sweep / segment_surface)."""
+        r0, r1, c0, c1 = region
+        np.minimum(self.heights[r0:r1, c0:c1], surface, out=self.heights[r0:r1, c0:c1])
+        self.mark_dirty(r0, r1, c0, c1)
+
+    def cut(self, start, end, shape):
+        """Skida materijal segmentima start -> end (N, 3) jednog alata."""
+        swept = self.sweep(start, end, shape)
+        if swept is not None: self.apply(*swept)
+
+
+class StockSimulator:
+    """Sirovina za jednu putanju: segmenti se rezu redom, do tacke animacije."""
+
+    def __init__(self, path, shapes, default_shape=None, stock=None, max_cells=DEFAULT_MAX_CELLS):
+        self.path = path
+        self.shapes = dict(shapes)
+        self.default_shape = default_shape or ToolShape(10.0)
+        self.stock = stock or Stock.for_path(path, self.shapes, max_cells)
+        self.done = 0  # segmenti [0, done) su odseceni
+
+    def shape_for(self, tool):
+        return self.shapes.get(int(tool), self.default_shape)
+
+    def reset(self):
+        self.stock.reset(); self.done = 0
+
+    def cut_range(self, first, last, start=None, end=None, cancel=None):
+        """Segmenti [first, last) (ili zadate tacke start/end za te segmente), po alatu."""
+        with span('stock.cut', segments=last - first): self._cut_range(first, last, start, end, cancel)
+
+    def _cut_range(self, first, last, start, end, cancel):
+        path = self.path
+        tools = path.tools[first:last]
+        start = path.start[first:last] if start is None else start
+        end = path.end[first:last] if end is None else end
+        for tool in np.unique(tools).tolist():
+            if cancel is not None: cancel.check()
+            mask = tools == tool
+            self.stock.cut(start[mask], end[mask], self.shape_for(tool))
+
+    def advance_to(self, dist):
+        """
+        Sirovina kada je alat na kumulativnoj duzini dist: novi ceo segmenti se rezu jednom,
+        a deo segmenta na kome je alat se rece privremeno (ponovno rezanje je bezopasno, minimum).
+        Povratak unazad krece od pune sirovine.
+        """
+        path = self.path
+        if not len(path): return
+        last = int(np.searchsorted(path.dist_end, dist, side='right'))
+        if last < self.done: self.reset()
+        first = self.done; self.done = last
+        start, end = path.start[first:last], path.end[first:last]
+        if last < len(path):
+            # Zapoceti segment ide u isti poziv (jedno erodiranje po alatu)
+            last += 1
+            start = np.concatenate((start, path.start[last - 1:last]))
+            end = np.concatenate((end, [path.position_at(dist)[0]]))
+        if last > first: self.cut_range(first, last, start, end)
+
+    @traced('stock.run')
+    def run(self, cancel=None):
+        if self.done < len(self.path): self.cut_range(self.done, len(self.path), cancel=cancel); self.done = len(self.path)
+        return self.stock
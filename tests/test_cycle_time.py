@@ -0,0 +1,31 @@
+"""Procena vremena (cycle_time): deljenje prave na vise segmenata ne menja ukupno vreme."""
+import pytest
+
+from cycle_time import MachineDynamics, estimate_cycle_time
+from parser import SimpleParser
+
+
+def seconds(text, jerk):
+    dynamics = MachineDynamics([10000.0] * 3, [500.0, 500.0, 300.0], jerk, 0.01, 10000.0)
+    return estimate_cycle_time(SimpleParser().parse(text), dynamics).total * 60.0
+
+
+def split(moves, parts):
+    """Svaki potez (x, y) iz moves kao 'parts' kolinearnih poteza."""
+    out, x0, y0 = ["G1 F6000"], 0.0, 0.0
+    for x, y in moves:
+        out += [f"X{x0 + (x - x0) * k / parts:.6f} Y{y0 + (y - y0) * k / parts:.6f}" for k in range(1, parts + 1)]
+        x0, y0 = x, y
+    return "\n".join(out)
+
+
+@pytest.mark.parametrize("jerk", [0.0, 3000.0])
+@pytest.mark.parametrize("moves", [[(1000, 0)], [(100, 0), (100, 50), (0, 50)], [(20, 0), (20, 1), (40, 1)]])
+def test_split_line_keeps_time(jerk, moves):
+    whole = seconds(split(moves, 1), jerk)
+    assert seconds(split(moves, 1000 // len(moves)), jerk) == pytest.approx(whole, rel=1e-9)
+
+
+def test_jerk_slower_than_trapezoid():
+    text = split([(1000, 0)], 1)
+    assert seconds(text, 3000.0) > seconds(text, 0.0)
@@ -0,0 +1,49 @@
+"""DXF izvoz: ravni delovi 3D programa kao ravne polilinije, 3D polilinija samo gde se Z menja."""
+import ezdxf
+import pytest
+
+from dxf_exporter import MIN_FLAT_SEGMENTS, DXFExporter, dxf_entities
+from parser import SimpleParser
+
+# Spust po Z, dug ravan deo na Z-1, pa opet spust
+RAMP = ["G1 X%d Y0 Z%.1f F500" % (i, -0.1 * i) for i in range(1, 11)]
+FLAT = ["G1 X%d Y1 Z-1" % i for i in range(10, 10 + 2 * MIN_FLAT_SEGMENTS)]
+PROGRAM = "\n".join(["G0 X0 Y0 Z0"] + RAMP + FLAT + ["G1 X60 Y2 Z-2", "G1 X61 Y3 Z-3"])
+
+
+def polylines(path):
+    return [(len(e[2]) - 1, e[3]) for e in dxf_entities(path) if e[0] == 'POLYLINE']
+
+
+def test_flat_run_split_from_3d_run():
+    path = SimpleParser().parse(PROGRAM)
+    assert polylines(path) == [(10, False), (len(FLAT), True), (2, False)]
+
+
+def test_short_flat_run_stays_in_3d_polyline():
+    text = "\n".join(["G0 X0 Y0 Z0"] + RAMP + FLAT[:3] + ["G1 X60 Y2 Z-2"])
+    assert polylines(SimpleParser().parse(text)) == [(14, False)]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_export_keeps_elevation(tmp_path, stream):
+    out = str(tmp_path / "out.dxf")
+    assert DXFExporter().export(out, SimpleParser().parse(PROGRAM), stream)[0]
+    msp = ezdxf.readfile(out).modelspace()
+    flat = [e for e in msp.query('LWPOLYLINE POLYLINE') if e.dxftype() == 'LWPOLYLINE' or e.is_2d_polyline]
+    assert len(flat) == 1
+    elevation = flat[0].dxf.elevation  # R12 2D POLYLINE: tacka (0, 0, z), LWPOLYLINE: broj
+    assert (elevation[2] if stream else elevation) == -1.0
+    assert sum(e.dxftype() == 'POLYLINE' and e.is_3d_polyline for e in msp) == 2
+
+
+def test_format_does_not_depend_on_program_size(tmp_path, monkeypatch):
+    import dxf_exporter
+    path = SimpleParser().parse("\n".join(["G0 X0 Y0 Z0"] + ["G1 X%d Y%d Z-1" % (i, i % 2) for i in range(1, 6001)]))
+    out = str(tmp_path / "out.dxf")
+    assert DXFExporter().export(out, path) == (True, "Success (DXF R2010)")
+    assert ezdxf.readfile(out).dxfversion == 'AC1024'
+    # Iznad praga: R12, i poruka to kaze
+    monkeypatch.setattr(dxf_exporter, 'STREAM_SEGMENTS', 1000)
+    ok, msg = DXFExporter().export(out, path)
+    assert ok and 'R12' in msg and ezdxf.readfile(out).dxfversion == 'AC1009'
@@ -0,0 +1,31 @@
+"""Operacije fajl u fajl (stream_file): bajtovi van UTF-8 i krajevi linija ostaju kakvi su bili."""
+import pytest
+
+from transforms import TransformPlan, renumber_file, strip_line_numbers_file
+
+OPS = {
+    'renumber': (lambda s, d: renumber_file(s, d), "N10 {c}\nN20 G1 X1 Y2\nN30 M30\n"),
+    'strip': (lambda s, d: strip_line_numbers_file(s, d), "{c}\nG1 X1 Y2\nM30\n"),
+    'shift': (lambda s, d: TransformPlan.shift(1, 0, 0).apply_file(s, d), "N5 {c}\nG1 X2 Y2\nM30\n"),
+}
+SOURCE = "N5 {c}\nG1 X1 Y2\nM30\n"
+
+
+def run(tmp_path, op, data):
+    src = tmp_path / "in.nc"; dst = tmp_path / "out.nc"
+    src.write_bytes(data)
+    OPS[op][0](str(src), str(dst))
+    return dst.read_bytes()
+
+
+@pytest.mark.parametrize("op", sorted(OPS))
+@pytest.mark.parametrize("comment, encoding", [("(GLODALO čćšž)", 'cp1250'), ("(Ø10)", 'latin-1')])
+def test_non_utf8_round_trip(tmp_path, op, comment, encoding):
+    data = SOURCE.format(c=comment).encode(encoding)
+    assert run(tmp_path, op, data) == OPS[op][1].format(c=comment).encode(encoding)
+
+
+@pytest.mark.parametrize("op", sorted(OPS))
+def test_crlf_kept(tmp_path, op):
+    data = SOURCE.format(c="(T1)").replace('\n', '\r\n').encode()
+    assert run(tmp_path, op, data) == OPS[op][1].format(c="(T1)").replace('\n', '\r\n').encode()
@@ -0,0 +1,78 @@
+"""parse_file, parse_parallel i parse_incremental moraju dati bit-identicnu putanju kao parse()."""
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import WORKLOADS, generate
+from parser import SimpleParser
+
+COLUMNS = ('start', 'end', 'types', 'tools', 'source_lines', 'dist_end', 'time_end', 'line_offsets')
+# multi_tool menja alat na ~20000 linija, pa mu treba vise linija
+LINES = {'pocketing': 4000, 'surfacing': 4000, 'drilling': 3000, 'multi_tool': 45000}
+# Linije koje se ubacuju pri izmenama: menjaju modalno stanje, alat, posmak ili poziciju
+EXTRA_LINES = ("G0 Z10", "T3 M6", "F500", "G1 X1 Y2 Z-1", "G2 X5 Y5 I2 J0", "(KOMENTAR)", "", "G81 X3 Y3 Z-2 R1")
+
+
+def assert_same_path(path, expected):
+    for name in COLUMNS:
+        a, b = getattr(path, name), getattr(expected, name)
+        assert (a is None) == (b is None), name
+        if a is not None: assert np.array_equal(a, b) and a.dtype == b.dtype, name
+
+
+def serial(text):
+    parser = SimpleParser(); path = parser.parse(text)
+    return path, parser
+
+
+@pytest.fixture(scope='module', params=WORKLOADS)
+def workload(request, tmp_path_factory):
+    text = generate(request.param, LINES[request.param])
+    filepath = tmp_path_factory.mktemp('nc') / (request.param + '.nc')
+    filepath.write_text(text)
+    return text, str(filepath)
+
+
+def test_parse_file(workload):
+    text, filepath = workload
+    expected, ref = serial(text)
+    # Mali paketi: modalno stanje mora da predje mnogo granica paketa
+    for batch_bytes in (4096, 1 << 20):
+        parser = SimpleParser(); path = parser.parse_file(filepath, batch_bytes)
+        assert_same_path(path, expected)
+        assert (parser.total_length, parser.estimated_time) == (ref.total_length, ref.estimated_time)
+
+
+def test_parse_parallel(workload):
+    text, filepath = workload
+    expected, ref = serial(text)
+    parser = SimpleParser(); path = parser.parse_parallel(filepath, workers=3)
+    assert_same_path(path, expected)
+    assert (parser.total_length, parser.estimated_time) == (ref.total_length, ref.estimated_time)
+
+
+def edit(rng, lines):
+    """Nasumicna izmena: zamena, ubacivanje ili brisanje nekoliko linija."""
+    lines = list(lines)
+    at = rng.randrange(len(lines) + 1)
+    kind = rng.choice(('replace', 'insert', 'delete'))
+    new = [rng.choice(EXTRA_LINES + tuple(lines[:50])) for _ in range(rng.randint(1, 3))]
+    if kind == 'replace': lines[at:at + len(new)] = new
+    elif kind == 'insert': lines[at:at] = new
+    else: del lines[at:at + rng.randint(1, 40)]
+    return lines
+
+
+@pytest.mark.parametrize('name', WORKLOADS)
+def test_parse_incremental(name):
+    rng = random.Random(name)
+    lines = generate(name, 4000).split('\n')
+    parser = SimpleParser()
+    for _ in range(25):
+        text = '\n'.join(lines)
+        path = parser.parse_incremental(text)
+        expected, ref = serial(text)
+        assert_same_path(path, expected)
+        assert parser.total_length == ref.total_length and parser.estimated_time == ref.estimated_time
+        lines = edit(rng, lines)
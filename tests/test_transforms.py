@@ -0,0 +1,75 @@
+"""Decimale posle transformacija: zaokruzivanje ne sme da pomeri koordinatu."""
+import pytest
+
+from transforms import CodeTransformer, TransformPlan, plan_for
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('G1 X10. Y10.5 Z1', 'G1 X10.125 Y10.75 Z1'),   # tacka na kraju, vise decimala, Z bez pomeraja
+    ('G1 X10 Y7', 'G1 X10.125 Y7.250'),             # ceo broj bez tacke: DEFAULT_DECIMALS
+])
+def test_shift_keeps_offset_decimals(text, expected):
+    assert TransformPlan.shift(0.125, 0.25, 0).apply(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('G1 X1. Y2.1', 'G1 X25.400 Y53.340'),
+    ('G1 X1 Y2.5', 'G1 X25.400 Y63.500'),
+    ('G1 X10', 'G1 X254'),                          # ceo rezultat ostaje ceo
+])
+def test_inch_to_mm(text, expected):
+    assert plan_for('inch_to_mm').apply(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('G1 X1.', 'G1 X0.03937'),
+    ('G1 X1', 'G1 X0.03937'),
+    ('G1 X25.4', 'G1 X1.00000'),
+])
+def test_mm_to_inch(text, expected):
+    assert plan_for('mm_to_inch').apply(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('G1 X1. Y1.25', 'G1 X2.000 Y2.500'),
+    ('G1 X3 Y1', 'G1 X6 Y2'),
+    ('G1 X1.2345', 'G1 X2.4690'),
+])
+def test_scale_up(text, expected):
+    assert TransformPlan.scale(2).apply(text) == expected
+
+
+def test_modify_values_shift():
+    assert CodeTransformer.modify_values('G1 X10. Y10.5', offsets={'X': 0.125, 'Y': 0.25}) == 'G1 X10.125 Y10.75'
+
+
+def test_mirror_keeps_format():
+    assert plan_for('mirror_x').apply('G2 X10.5 Y3 I-1.') == 'G3 X-10.5 Y3 I1.'
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('G1 X1 F10 R5', 'G1 X2 F10 R10'),                       # scale menja deo, ne posmak
+    ('G2 X1 Y2 R5.5', 'G2 X2 Y4 R11.000'),                   # R kao poluprecnik luka
+    ('G81 X1 Y1 Z-5 R2. F100', 'G81 X2 Y2 Z-10 R4.000 F100'),  # R ravan ciklusa
+])
+def test_scale_radius_and_feed(text, expected):
+    assert TransformPlan.scale(2).apply(text) == expected
+
+
+def test_shift_moves_drill_r_plane_with_z():
+    text = 'G2 X1 Y2 R5.5\nG81 X1 Y1 Z-5 R2. F100\nG83 X2 Z-1 R1\nG3 X3 R1 (R1 G81)'
+    expected = 'G2 X1 Y2 R5.5\nG81 X1 Y1 Z5 R12. F100\nG83 X2 Z9 R11\nG3 X3 R1 (R1 G81)'
+    assert TransformPlan.shift(0, 0, 10).apply(text) == expected
+
+
+@pytest.mark.parametrize("mode, text, expected", [
+    ('mm_to_inch', 'G1 X25.4 F1200', 'G1 X1.00000 F47.244'),
+    ('mm_to_inch', 'G81 Z-25.4 R2.54 F254', 'G81 Z-1.00000 R0.10000 F10'),
+    ('inch_to_mm', 'G1 X1 F10 R0.5', 'G1 X25.400 F254 R12.700'),
+])
+def test_unit_presets_convert_feed_and_r(mode, text, expected):
+    assert plan_for(mode).apply(text) == expected
+
+
+def test_mirror_z_flips_r_plane_only():
+    assert TransformPlan.mirror('Z').apply('G2 X1 Y2 R5\nG81 X1 Z-3 R2') == 'G3 X1 Y2 R5\nG81 X1 Z3 R-2'
@@ -0,0 +1,189 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+# Tipovi segmenata (kod u nizu -> ime koje koriste viewer i DXF export)
+SEGMENT_TYPES = ('G0', 'G1', 'G2', 'G3', 'DRILL', 'G81', 'G83')
+TYPE_CODES = {name: code for code, name in enumerate(SEGMENT_TYPES)}
+
+
+class Toolpath(Sequence):
+    """
+    Kolonski zapis putanje alata.
+    Umesto liste recnika (jedan po segmentu) drzimo kontinualne NumPy nizove:
+      start, end    -> float64 (N, 3)
+      types         -> uint8 kod iz SEGMENT_TYPES
+      tools         -> uint16 broj alata
+      source_lines  -> int32 indeks linije u editoru
+      dist_end      -> float64 kumulativna duzina na kraju segmenta
+      time_end      -> float64 kumulativno procenjeno vreme (min) na kraju segmenta
+    Indeksiranje vraca recnik istog oblika kao stari parser, pa postojeci kod
+    (viewer, DXF export, animacija) radi bez izmena.
+    """
+
+    COLUMNS = ('start', 'end', 'types', 'tools', 'source_lines', 'dist_end', 'time_end')
+
+    def __init__(self, start, end, types, tools, source_lines, dist_end, time_end=None):
+        self.start = np.ascontiguousarray(start, dtype=np.float64).reshape(-1, 3)
+        self.end = np.ascontiguousarray(end, dtype=np.float64).reshape(-1, 3)
+        self.types = np.ascontiguousarray(types, dtype=np.uint8)
+        self.tools = np.ascontiguousarray(tools, dtype=np.uint16)
+        self.source_lines = np.ascontiguousarray(source_lines, dtype=np.int32)
+        self.dist_end = np.ascontiguousarray(dist_end, dtype=np.float64)
+        self.time_end = np.zeros_like(self.dist_end) if time_end is None else np.ascontiguousarray(time_end, dtype=np.float64)
+        self.line_offsets = None
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 3)), np.empty((0, 3)), [], [], [], [])
+
+    @classmethod
+    def concatenate(cls, parts):
+        return cls(*(np.concatenate([getattr(p, c) for p in parts]) for c in cls.COLUMNS))
+
+    def slice(self, first, last):
+        """Segmenti [first, last) kao novi Toolpath (pogledi na iste nizove, bez kopiranja)."""
+        return Toolpath(*(getattr(self, c)[first:last] for c in self.COLUMNS))
+
+    @property
+    def dist_start(self):
+        # Segmenti su nadovezani, pocetak jednog je kraj prethodnog
+        out = np.empty_like(self.dist_end)
+        if len(out):
+            out[0] = 0.0
+            out[1:] = self.dist_end[:-1]
+        return out
+
+    @property
+    def total_length(self):
+        return float(self.dist_end[-1]) if len(self.dist_end) else 0.0
+
+    @property
+    def total_time(self):
+        return float(self.time_end[-1]) if len(self.time_end) else 0.0
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, c).nbytes for c in self.COLUMNS)
+
+    def index_lines(self, n_lines):
+        """
+        Indeks linija editora: segmenti linije L su [line_offsets[L], line_offsets[L+1]).
+        Segmenti su poredjani po liniji, pa je ovo jedan searchsorted za ceo program.
+        """
+        self.line_offsets = np.searchsorted(self.source_lines, np.arange(n_lines + 1, dtype=np.int32)).astype(np.int32)
+        return self
+
+    def line_range(self, line):
+        """(prvi, broj) segmenata koji pripadaju liniji editora."""
+        if self.line_offsets is not None:
+            if not 0 <= line < len(self.line_offsets) - 1: return 0, 0
+            first = int(self.line_offsets[line])
+            return first, int(self.line_offsets[line + 1]) - first
+        first, last = np.searchsorted(self.source_lines, (line, line + 1))
+        return int(first), int(last - first)
+
+    def segment_at(self, dist):
+        """Indeks segmenta na kome je kumulativna duzina 'dist' (binarna pretraga)."""
+        return min(int(np.searchsorted(self.dist_end, dist)), len(self) - 1)
+
+    def done_at(self, dist):
+        """Broj segmenata zavrsenih do kumulativne duzine 'dist' (segmenti [0, n) su iza alata)."""
+        return int(np.searchsorted(self.dist_end, dist, side='right'))
+
+    def position_at(self, dist):
+        """Pozicija alata, alat i linija na kumulativnoj duzini 'dist' (O(log N))."""
+        if not len(self): return (0, 0, 0), 1, -1
+        i = self.segment_at(dist)
+        tool, line = int(self.tools[i]), int(self.source_lines[i])
+        d0 = float(self.dist_end[i - 1]) if i else 0.0
+        seg_len = float(self.dist_end[i]) - d0
+        if dist >= self.dist_end[i]: return tuple(self.end[i].tolist()), tool, line
+        if seg_len == 0: return tuple(self.start[i].tolist()), tool, line
+        ratio = max(dist - d0, 0.0) / seg_len
+        start = self.start[i]
+        return tuple((start + (self.end[i] - start) * ratio).tolist()), tool, line
+
+    def positions_at(self, dists):
+        """Vektorska verzija position_at za niz duzina: (N, 3) pozicije i indeksi segmenata."""
+        dists = np.asarray(dists, dtype=np.float64)
+        idx = np.minimum(np.searchsorted(self.dist_end, dists), len(self) - 1)
+        d0 = self.dist_start[idx]
+        seg_len = self.dist_end[idx] - d0
+        ratio = np.clip(np.divide(dists - d0, seg_len, out=np.zeros_like(dists), where=seg_len > 0), 0.0, 1.0)
+        start = self.start[idx]
+        return start + (self.end[idx] - start) * ratio[:, None], idx
+
+    def bounds(self):
+        if not len(self):
+            return [0, 0, 0], [0, 0, 0]
+        lo = np.minimum(self.start.min(axis=0), self.end.min(axis=0))
+        hi = np.maximum(self.start.max(axis=0), self.end.max(axis=0))
+        return lo.tolist(), hi.tolist()
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        n = len(self)
+        if idx < 0: idx += n
+        if not 0 <= idx < n: raise IndexError("Toolpath index out of range")
+        return {
+            'type': SEGMENT_TYPES[self.types[idx]],
+            'tool': int(self.tools[idx]),
+            'source_line': int(self.source_lines[idx]),
+            'start': tuple(self.start[idx].tolist()),
+            'end': tuple(self.end[idx].tolist()),
+            'dist_start': float(self.dist_end[idx - 1]) if idx else 0.0,
+            'dist_end': float(self.dist_end[idx]),
+        }
+
+    def __iter__(self):
+        # Brza iteracija: konverzija u Python tipove jednom za ceo niz
+        starts, ends = self.start.tolist(), self.end.tolist()
+        types, tools = self.types.tolist(), self.tools.tolist()
+        lines, dists = self.source_lines.tolist(), self.dist_end.tolist()
+        prev = 0.0
+        for i in range(len(types)):
+            yield {'type': SEGMENT_TYPES[types[i]], 'tool': tools[i], 'source_line': lines[i],
+                   'start': tuple(starts[i]), 'end': tuple(ends[i]),
+                   'dist_start': prev, 'dist_end': dists[i]}
+            prev = dists[i]
+
+
+class ToolpathBuilder:
+    """Rastuci bafer (kapacitet se duplira) u koji se dodaju delovi putanje, npr. paket po paket iz fajla."""
+
+    COLUMNS = (('start', np.float64, 3), ('end', np.float64, 3), ('types', np.uint8, 0),
+               ('tools', np.uint16, 0), ('source_lines', np.int32, 0), ('dist_end', np.float64, 0),
+               ('time_end', np.float64, 0))
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.capacity = capacity
+        self.columns = {name: np.empty((capacity, width) if width else capacity, dtype)
+                        for name, dtype, width in self.COLUMNS}
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed: capacity *= 2
+        for name, col in self.columns.items():
+            new = np.empty((capacity,) + col.shape[1:], col.dtype)
+            new[:self.size] = col[:self.size]
+            self.columns[name] = new
+        self.capacity = capacity
+
+    def extend(self, part):
+        n = len(part)
+        if self.size + n > self.capacity: self._grow(self.size + n)
+        for name, col in self.columns.items():
+            col[self.size:self.size + n] = getattr(part, name)
+        self.size += n
+
+    def build(self):
+        return Toolpath(*(self.columns[name][:self.size] for name in Toolpath.COLUMNS))
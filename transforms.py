@@ -0,0 +1,370 @@
+"""
+Transformacije G-koda kao jedan afini plan: p' = M p + t, gde je M matrica sa jednim
+nenultim clanom po redu/koloni (zamena osa, ogledalo, skaliranje) a t pomeraj.
+
+    from transforms import TransformPlan
+    plan = TransformPlan.mirror('X').then(TransformPlan.scale(1 / 25.4)).then(TransformPlan.shift(10, 0, 0))
+    new_text = plan.apply(text)                  (ceo tekst u jednom prolazu)
+    plan.apply_file('in.nc', 'out.nc')           (fajl u fajl, paket po paket)
+
+Operacije nad linijama (N brojevi) imaju isti oblik, tekst ili fajl u fajl uz konstantnu memoriju:
+
+    renumber(text, start=10, step=10)            renumber_file('in.nc', 'out.nc', 10, 10, progress)
+    strip_line_numbers(text)                     strip_line_numbers_file('in.nc', 'out.nc', progress)
+
+Koordinate X/Y/Z dobijaju M i t, centri luka I/J/K samo M; kada je det(M) < 0 (ogledalo)
+G2 i G3 menjaju mesta. R je poluprecnik luka (mnozi se razmerom plana), osim u liniji sa
+ciklusom busenja G81-G89 (isto pravilo kao parser): tada je R ravan i prati Z (razmera i
+pomeraj Z). Posmak F menja samo pretvaranje jedinica (TransformPlan.units, mm_to_inch /
+inch_to_mm); scale() uvecava deo, pa posmak ostaje isti. Broj decimala prati ulaz (X10.5 -> jedna decimala), ali nikad manje
+nego sto treba rezultatu: pomeraj dodaje svoje decimale (X10. + 0.125 -> X10.125), a
+skaliranje bar DEFAULT_DECIMALS, vise kada smanjuje vrednosti (mm -> inch). Komentari se ne diraju.
+"""
+import math
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from ncfile import iter_text_batches
+from profiling import span, traced
+
+AXES = 'XYZ'
+CENTERS = 'IJK'
+# Broj decimala za ulaz bez decimalne tacke kada rezultat nije ceo broj, i najvise decimala
+DEFAULT_DECIMALS = 3
+MAX_DECIMALS = 6
+# Tekst se obradjuje u delovima ove velicine (lista tokena iz re.split je ~40x veca od teksta)
+SLICE_CHARS = 1024 * 1024
+ARC_FLIP = {'2': '3', '3': '2'}
+# Decimale posmaka F posle pretvaranja jedinica (F1200 mm/min -> F47.244 inch/min)
+FEED_DECIMALS = 3
+# N broj na pocetku linije (strip: samo veliko N, kao ranije u editoru; renumber: oba)
+LINE_NUMBER_RE = re.compile(r'(?m)^N\d+[ \t]*')
+RENUMBER_PREFIX_RE = re.compile(r'N\d+\s*', re.IGNORECASE)
+
+
+@lru_cache(maxsize=16)
+def token_re(letters, arcs):
+    """
+    Komentar | slovo iz 'letters' sa brojem | G2/G3 i ciklusi busenja G81-G89 (G02, G081)
+    ako arcs; isti oblik reci kao lexer.VALUE_RE.
+    """
+    never = r'[^\s\S]'  # prazna klasa: nikad se ne poklapa
+    letters = r'[' + letters + r']' if letters else never
+    arc = r'(G0*)([23]|8[1-9])(?![\d.])' if arcs else r'(' + never + r')()'
+    return re.compile(r'(\([^\n)]*\)?|;[^\n]*)|(' + letters + r')[ \t]*([-+]?(?:\d+\.?\d*|\.\d+))|' + arc)
+
+
+def extra_decimals(scale):
+    """Koliko decimala vise treba kada skaliranje smanjuje vrednosti (1/25.4 -> 2)."""
+    scale = abs(scale)
+    return 0 if scale == 0 or scale >= 1 else int(math.ceil(math.log10(1.0 / scale) - 1e-9))
+
+
+def offset_decimals(offset):
+    """Decimale potrebne da se pomeraj zapise tacno (0.125 -> 3), najvise MAX_DECIMALS."""
+    for d in range(MAX_DECIMALS):
+        if abs(round(offset, d) - offset) < 1e-9: return d
+    return MAX_DECIMALS
+
+
+def min_decimals(scale, offset=0.0):
+    """Najmanje decimala za rec posle v * scale + offset, da zaokruzivanje ne pomeri vrednost."""
+    need = offset_decimals(offset) if offset else 0
+    if abs(scale) != 1.0: need = max(need, DEFAULT_DECIMALS + extra_decimals(scale))
+    return need
+
+
+# Format po broju decimala: -1 ceo broj bez tacke ('X10'), -2 ceo broj sa tackom ('X10.')
+FORMATS = {-1: '%s%d', -2: '%s%#.0f'}
+FORMATS.update((d, f'%s%.{d}f') for d in range(MAX_DECIMALS + 1))
+
+
+def format_words(letters, values, numbers, minimum):
+    """
+    Nove reci: broj decimala prati ulazni broj, ali bar minimum (min_decimals); ceo broj bez
+    tacke ostaje ceo ako je i rezultat ceo.
+    Zaokruzivanje i izbor formata su NumPy; tekst nastaje jednim '%' nad svim recima.
+    """
+    dots = np.array([n.find('.') for n in numbers], dtype=np.int64)
+    decimals = np.where(dots < 0, -1, np.fromiter(map(len, numbers), np.int64, len(numbers)) - dots - 1)
+    integral = values == np.trunc(values)
+    decimals = np.where(decimals < 0, np.where(integral, -1, np.maximum(DEFAULT_DECIMALS, minimum)), np.maximum(decimals, minimum))
+    decimals = np.minimum(decimals, MAX_DECIMALS)
+    decimals[(decimals == 0) & (dots >= 0)] = -2
+    scale = 10.0 ** np.maximum(decimals, 0)
+    values = np.round(values * scale) / scale + 0.0  # + 0.0: bez "-0.000"
+    args = [None] * (2 * len(letters))
+    args[0::2] = letters; args[1::2] = values.tolist()
+    return ('\0'.join([FORMATS[d] for d in decimals.tolist()]) % tuple(args)).split('\0')
+
+
+def rewrite(text, table, flip_arcs=False, r_plane=None):
+    """
+    Jedan prolaz kroz tekst: table = {slovo: (novo_slovo, mnozilac, pomeraj, najmanje_decimala)}.
+    r_plane je pravilo istog oblika za R u linijama sa G81-G89 (table['R'] vazi za ostale).
+    Vrednosti i formati se racunaju NumPy-jem za ceo deo teksta (SLICE_CHARS) odjednom.
+    """
+    if not table and not flip_arcs and r_plane is None: return text
+    if len(text) <= SLICE_CHARS: return _rewrite_slice(text, table, flip_arcs, r_plane)
+    out, start = [], 0
+    while start < len(text):
+        stop = text.find('\n', start + SLICE_CHARS)
+        stop = len(text) if stop == -1 else stop + 1
+        out.append(_rewrite_slice(text[start:stop], table, flip_arcs, r_plane))
+        start = stop
+    return ''.join(out)
+
+
+def _rewrite_slice(text, table, flip_arcs, r_plane=None):
+    letters = set(table) | ({'R'} if r_plane is not None else set())
+    parts = token_re(''.join(sorted(letters)), flip_arcs or r_plane is not None).split(text)
+    if len(parts) == 1: return text
+    new, letters, numbers, g_prefix, g_digit = (parts[k::6] for k in range(1, 6))
+    words = [k for k, letter in enumerate(letters) if letter is not None]
+    if words:
+        rules = [table.get(letters[k]) for k in words]
+        if r_plane is not None:
+            # Linija tokena: broj '\n' pre njega (reci i komentari nemaju '\n')
+            line = np.cumsum([p.count('\n') for p in parts[0::6]])
+            cycles = [k for k, digit in enumerate(g_digit) if digit is not None and digit[0] == '8']
+            on_cycle = np.isin(line[words], line[cycles])
+            for i, k in enumerate(words):
+                if letters[k] == 'R' and on_cycle[i]: rules[i] = r_plane
+            for i in [i for i, r in enumerate(rules) if r is None]: new[words[i]] = letters[words[i]] + numbers[words[i]]  # R van ciklusa
+            keep = [i for i, r in enumerate(rules) if r is not None]
+            words = [words[i] for i in keep]; rules = [rules[i] for i in keep]
+    if words:
+        values = np.fromstring(' '.join([numbers[k] for k in words]), sep=' ')
+        values = values * np.array([r[1] for r in rules]) + np.array([r[2] for r in rules])
+        formatted = format_words([r[0] for r in rules], values, [numbers[k] for k in words], np.array([r[3] for r in rules]))
+        for k, word in zip(words, formatted): new[k] = word
+    if flip_arcs or r_plane is not None:
+        for k, prefix in enumerate(g_prefix):
+            if prefix is not None: new[k] = prefix + (ARC_FLIP.get(g_digit[k], g_digit[k]) if flip_arcs else g_digit[k])
+    out = [None] * (2 * len(new) + 1)
+    out[0::2] = parts[0::6]; out[1::2] = new
+    return ''.join(out)
+
+
+class TransformPlan:
+    """Afini plan nad osama: matrix (3x3, jedan nenulti clan po redu), offset (3) i mnozilac posmaka F."""
+
+    def __init__(self, matrix=None, offset=None, feed=1.0):
+        self.matrix = np.eye(3) if matrix is None else np.asarray(matrix, dtype=np.float64)
+        self.offset = np.zeros(3) if offset is None else np.asarray(offset, dtype=np.float64)
+        self.feed = float(feed)
+        nonzero = self.matrix != 0
+        if not (nonzero.sum(axis=0) == 1).all() or not (nonzero.sum(axis=1) == 1).all():
+            raise ValueError("Transform must map each axis onto exactly one axis (swap / mirror / scale)")
+
+    @classmethod
+    def mirror(cls, axis):
+        m = np.eye(3); m[AXES.index(axis), AXES.index(axis)] = -1.0
+        return cls(m)
+
+    @classmethod
+    def scale(cls, factor):
+        return cls(np.eye(3) * factor)
+
+    @classmethod
+    def units(cls, factor):
+        """Pretvaranje jedinica: koordinate i posmak F (mm/min -> inch/min) istim mnoziocem."""
+        return cls(np.eye(3) * factor, feed=factor)
+
+    @classmethod
+    def shift(cls, x=0.0, y=0.0, z=0.0):
+        return cls(offset=(x, y, z))
+
+    @classmethod
+    def permute(cls, axes, signs=(1, 1, 1)):
+        """permute('XZY') -> nova X je stara X, nova Y stara Z, nova Z stara Y (sa znakovima)."""
+        m = np.zeros((3, 3))
+        for new, (old, sign) in enumerate(zip(axes, signs)): m[new, AXES.index(old)] = sign
+        return cls(m)
+
+    def then(self, other):
+        """Plan koji primenjuje self pa other."""
+        return TransformPlan(other.matrix @ self.matrix, other.matrix @ self.offset + other.offset, self.feed * other.feed)
+
+    @property
+    def flips_arcs(self):
+        return bool(np.linalg.det(self.matrix) < 0)
+
+    @property
+    def radius_scale(self):
+        """Razmera poluprecnika R (ista po svim osama); None kada plan razlicito skalira ose."""
+        factors = np.abs(self.matrix[self.matrix != 0])
+        return float(factors[0]) if (factors == factors[0]).all() else None
+
+    def is_identity(self):
+        return bool((self.matrix == np.eye(3)).all() and not self.offset.any() and self.feed == 1.0)
+
+    def r_plane_rule(self):
+        """Pravilo za R ravan u ciklusima busenja (prati Z), ili None kada je isto kao za poluprecnik."""
+        factor, offset = float(self.matrix[2, 2]), float(self.offset[2])
+        if factor == 0.0: return None  # Z postaje druga osa (MAHO): R ravan ostaje kao poluprecnik
+        rule = ('R', factor, offset, min_decimals(factor, offset))
+        same = self.word_table().get('R', ('R', 1.0, 0.0, 0))
+        return None if rule[1:3] == same[1:3] else rule
+
+    def word_table(self):
+        """
+        {staro_slovo: (novo_slovo, mnozilac, pomeraj, najmanje_decimala)} za X/Y/Z i I/J/K,
+        R kao poluprecnik (radius_scale) i F kada plan menja jedinice.
+        """
+        table = {}
+        for old in range(3):
+            new = int(np.flatnonzero(self.matrix[:, old])[0]); factor = float(self.matrix[new, old])
+            if new == old and factor == 1.0 and self.offset[new] == 0.0: continue  # rec ostaje ista
+            table[AXES[old]] = (AXES[new], factor, float(self.offset[new]), min_decimals(factor, float(self.offset[new])))
+            if new != old or factor != 1.0:
+                table[CENTERS[old]] = (CENTERS[new], factor, 0.0, min_decimals(factor))
+        radius = self.radius_scale
+        if radius is not None and radius != 1.0: table['R'] = ('R', radius, 0.0, min_decimals(radius))
+        if self.feed != 1.0: table['F'] = ('F', self.feed, 0.0, FEED_DECIMALS)
+        return table
+
+    @traced('transform', lambda text: {'chars': len(text)})
+    def apply(self, text):
+        return rewrite(text, self.word_table(), self.flips_arcs, self.r_plane_rule())
+
+    @traced('transform.file')
+    def apply_file(self, src, dst, batch_bytes=SLICE_CHARS, encoding='utf-8', progress=None):
+        """Fajl u fajl bez ucitavanja celog programa (stream_file); vraca broj linija."""
+        table = self.word_table(); flip = self.flips_arcs; r_plane = self.r_plane_rule()
+        return stream_file(src, dst, lambda text: rewrite(text, table, flip, r_plane), batch_bytes, encoding, progress)
+
+
+def stream_file(src, dst, rewrite_batch, batch_bytes=SLICE_CHARS, encoding='utf-8', progress=None):
+    """
+    rewrite_batch(tekst) -> novi tekst, paket po paket: paketi se zavrsavaju na kraju linije, pa
+    nijedna rec ni komentar nisu preseceni. Pise u privremeni fajl (dst moze biti isti kao src).
+    progress(obradjeno, ukupno) se zove posle svakog paketa (bajtovi, priblizno); izuzetak iz
+    progress-a (npr. CancelToken.check) prekida posao i brise privremeni fajl.
+    Bajtovi koji nisu u encoding-u (npr. cp1250 komentari) prolaze nepromenjeni (surrogateescape).
+    """
+    total = os.path.getsize(src); done = 0; lines = 0
+    tmp = dst + '.tmp'
+    try:
+        with open(tmp, 'w', encoding=encoding, errors='surrogateescape', newline='') as out:
+            for _, text, n_lines in iter_text_batches(src, batch_bytes, encoding, errors='surrogateescape'):
+                with span('transform.batch', lines=n_lines):
+                    out.write(rewrite_batch(text))
+                done = min(done + len(text), total); lines += n_lines
+                if progress: progress(done, total)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return lines
+
+
+# --- N BROJEVI (LINIJE) ---
+def strip_line_numbers(text):
+    """Brise N broj sa pocetka svake linije; linija ostaje (i kada je bila samo N broj)."""
+    return LINE_NUMBER_RE.sub('', text)
+
+
+def renumber_lines(text, counter, step):
+    """
+    Jedan paket za renumber: linije se trimuju (razmaci i tabovi, kraj linije '\r' ostaje),
+    prazne ostaju prazne, ostale dobijaju 'N<counter> ' umesto starog N broja.
+    Vraca (novi tekst, sledeci broj).
+    """
+    lines = text.split('\n')
+    tail = lines.pop() if text.endswith('\n') else None  # '' posle poslednjeg '\n' nije linija
+    match = RENUMBER_PREFIX_RE.match
+    out = []
+    for line in lines:
+        eol = '\r' if line.endswith('\r') else ''
+        line = line[:len(line) - len(eol)].strip(' \t')
+        if not line: out.append(eol); continue
+        m = match(line)
+        out.append(f"N{counter} {line[m.end():] if m else line}{eol}"); counter += step
+    if tail is not None: out.append(tail)
+    return '\n'.join(out), counter
+
+
+def renumber(text, start=10, step=10):
+    return renumber_lines(text, start, step)[0]
+
+
+@traced('renumber.file')
+def renumber_file(src, dst, start=10, step=10, progress=None, batch_bytes=SLICE_CHARS, encoding='utf-8'):
+    """renumber fajl u fajl; brojac prelazi iz paketa u paket. Vraca broj linija."""
+    counter = [start]
+
+    def batch(text):
+        new, counter[0] = renumber_lines(text, counter[0], step)
+        return new
+    return stream_file(src, dst, batch, batch_bytes, encoding, progress)
+
+
+@traced('strip_numbers.file')
+def strip_line_numbers_file(src, dst, progress=None, batch_bytes=SLICE_CHARS, encoding='utf-8'):
+    return stream_file(src, dst, strip_line_numbers, batch_bytes, encoding, progress)
+
+
+# Transformacije iz menija i CLI-ja
+PRESETS = {
+    'mirror_x': lambda: TransformPlan.mirror('X'),
+    'mirror_y': lambda: TransformPlan.mirror('Y'),
+    'mm_to_inch': lambda: TransformPlan.units(1 / 25.4),
+    'inch_to_mm': lambda: TransformPlan.units(25.4),
+    # MAHO: X -> -X, Y <-> Z (centri I/J/K prate ose)
+    'swap_axes_maho': lambda: TransformPlan.permute('XZY', (-1, 1, 1)),
+}
+
+
+def plan_for(modes, offsets=None):
+    """
+    Plan za jednu ili vise transformacija redom: 'mirror_x', ('shift', (x, y, z)), ...
+    Za 'shift' bez svojih vrednosti koristi se offsets.
+    """
+    plan = TransformPlan()
+    for mode in ([modes] if isinstance(modes, (str, tuple)) else modes):
+        name, values = mode if isinstance(mode, tuple) else (mode, offsets)
+        if name == 'shift': step = TransformPlan.shift(*values)
+        elif name in PRESETS: step = PRESETS[name]()
+        else: raise ValueError(f"Unknown transform: {name}")
+        plan = plan.then(step)
+    return plan
+
+
+# --- MANIPULACIJA TEKSTOM ---
+class CodeTransformer:
+    """Stari API (pojedinacne transformacije); sve ide kroz rewrite() u jednom prolazu."""
+
+    @staticmethod
+    def modify_values(text, multipliers={'X':1, 'Y':1, 'Z':1, 'I':1, 'J':1}, offsets={'X':0, 'Y':0, 'Z':0}):
+        table = {}
+        for letter in set(multipliers) | set(offsets):
+            factor = multipliers.get(letter, 1); offset = offsets.get(letter, 0)
+            if factor != 1 or offset != 0: table[letter] = (letter, float(factor), float(offset), min_decimals(float(factor), float(offset)))
+        return rewrite(text, table)
+
+    @staticmethod
+    def mirror_g2_g3(text, axis_mirrored):
+        if not axis_mirrored: return text
+        return rewrite(text, {}, flip_arcs=True)
+
+    # --- NOVO: SWAP AXES (MAHO STYLE) ---
+    @staticmethod
+    def swap_axes_custom(text):
+        return PRESETS['swap_axes_maho']().apply(text)
+
+    @staticmethod
+    def renumber(text, start=10, step=10):
+        return renumber(text, start, step)
+
+    @staticmethod
+    def strip_line_numbers(text):
+        return strip_line_numbers(text)
+
+    @staticmethod
+    def apply(text, modes, offsets=None):
+        """Vise transformacija (npr. ['mm_to_inch', ('shift', (10, 0, 0))]) u jednom prolazu."""
+        return plan_for(modes, offsets).apply(text)
@@ -1,20 +1,47 @@
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import QRubberBand
+from PySide6.QtCore import Qt, Signal, QRect
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import math
 
+import numpy as np
+
+from path_renderer import PathRenderer
+from profiling import span, traced
+from stock_renderer import StockRenderer
+from toolpath import Toolpath
+
+# Tolerancija nivoa detalja u pikselima (vise = brze, grublje pri udaljavanju)
+LOD_PIXELS = 1.0
+# Prozirnost dela putanje ispred alata tokom animacije
+PENDING_ALPHA = 0.25
+# Klik pogadja segment na najvise ovoliko piksela; pomeraj misa do ovoga je klik, ne rotacija
+PICK_PIXELS = 5
+
 class NCPreviewWidget(QOpenGLWidget):
     toolMoved = Signal(float, float, float, int) 
+    segmentPicked = Signal(int)      # Linija editora segmenta izabranog klikom
+    linesSelected = Signal(object)   # [(prva, poslednja), ...] linije segmenata u Shift + prevuci pravougaoniku
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.show_limits = True
         self.machine_size = [300, 200, 100]
-        self.path_data = [] 
+        self.path_data = Toolpath.empty()
+        self.renderer = PathRenderer()
+        self.stock_renderer = StockRenderer()  # Simulacija sirovine (stock_sim), None dok nije ukljucena
+        self.lod = None          # lod.LodPyramid za path_data (gradi se u pozadini), None dok nije spreman: nivo 0
+        self.path_dirty = False
+        self.upload_first = 0    # Prvi segment koji jos nije na GPU (progresivno ucitavanje)
+        self.partial = False     # Putanja jos raste (parsiranje u toku): bez LOD nivoa
         self.lastPos = None
+        self.pressPos = None
+        self.pick_index = None   # picking.SegmentIndex za path_data (gradi se u pozadini), None dok nije spreman
+        self.rubber_band = None
         self.is_dark = True
         self.highlight_line = -1 
+        self.playhead = None  # Kumulativna duzina alata u animaciji; None = cela putanja punom bojom
         
         self.tool_pos = None 
         self.tool_diameter = 10.0
@@ -27,16 +54,44 @@ class NCPreviewWidget(QOpenGLWidget):
         self.tool_library = {int(k): float(v) for k, v in lib.items()}
         self.update()
 
-    def update_path(self, new_data):
+    def update_path(self, new_data, grows=False, partial=False):
+        """grows: new_data pocinje istim segmentima kao trenutna putanja, pa se salje samo nastavak."""
+        if not grows: self.upload_first = 0; self.tool_pos = None; self.playhead = None
+        elif not self.path_dirty: self.upload_first = len(self.path_data)
         self.path_data = new_data
-        self.tool_pos = None 
+        self.pick_index = None
+        self.lod = None
+        self.partial = partial
+        self.path_dirty = True  # Upload na GPU u sledecem paintGL (tada je kontekst aktivan)
         self.update()
 
+    def set_lod(self, lod):
+        """Nivoi detalja (lod.LodPyramid); prihvataju se samo ako su za trenutnu putanju."""
+        if lod.path is self.path_data: self.lod = lod; self.update()
+
+    def set_pick_index(self, index):
+        """Indeks za pick (picking.SegmentIndex); prihvata se samo ako je za trenutnu putanju."""
+        if index.path is self.path_data: self.pick_index = index
+
+    def set_stock(self, stock):
+        """Sirovina (stock_sim.Stock) koja se crta kao mreza; None iskljucuje prikaz."""
+        self.stock_renderer.set_stock(stock)
+        self.update()
+
+    def stock_changed(self):
+        self.update()  # Promenjeni redovi se salju u sledecem paintGL (Stock.take_dirty)
+
     def set_highlight(self, line_idx):
         if self.highlight_line != line_idx:
             self.highlight_line = line_idx
             self.update()
 
+    def set_playhead(self, dist):
+        """Deo putanje do dist se crta punom bojom, ostatak prigusen (None = sve punom bojom)."""
+        if self.playhead != dist:
+            self.playhead = dist
+            self.update()
+
     def set_tool_state(self, pos, tool_id):
         self.tool_pos = pos
         self.current_tool_id = tool_id
@@ -80,12 +135,17 @@ class NCPreviewWidget(QOpenGLWidget):
         glLightfv(GL_LIGHT0, GL_AMBIENT, [0.2, 0.2, 0.2, 1.0])
         glLightfv(GL_LIGHT0, GL_DIFFUSE, [0.8, 0.8, 0.8, 1.0])
 
+        self.renderer.init_gl()
+        self.stock_renderer.init_gl()
+        self.path_dirty = True
+
     def resizeGL(self, w, h):
         glViewport(0, 0, w, h)
         glMatrixMode(GL_PROJECTION); glLoadIdentity()
         gluPerspective(45, w / h, 0.1, 5000.0)
         glMatrixMode(GL_MODELVIEW)
 
+    @traced('paintGL')
     def paintGL(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
@@ -100,34 +160,61 @@ class NCPreviewWidget(QOpenGLWidget):
         if self.show_limits: self.draw_machine_box()
         self.draw_axes()
         
+        if self.path_dirty:
+            with span('gl.upload', segments=len(self.path_data) - self.upload_first):
+                self.renderer.upload(self.path_data, first=self.upload_first)
+                self.renderer.clear_levels()
+            self.path_dirty = False; self.upload_first = len(self.path_data)
+
+        if self.stock_renderer.stock is not None:
+            with span('gl.stock_upload'): self.stock_renderer.sync()
+            glEnable(GL_LIGHTING)
+            self.stock_renderer.draw()
+            glDisable(GL_LIGHTING)
+
         if self.path_data:
             glLineWidth(2.0)
-            glBegin(GL_LINES)
-            for segment in self.path_data:
-                is_dimmed = (self.highlight_line != -1 and segment.get('source_line') != self.highlight_line)
-                alpha = 0.2 if is_dimmed else 1.0
-                typ = segment['type']
-                if typ == 'G0': glColor4f(1.0, 0.3, 0.3, alpha)
-                elif typ == 'G1': glColor4f(0.0, 0.6, 1.0, alpha)
-                elif typ == 'DRILL': glColor4f(1.0, 1.0, 0.0, alpha)
-                else: glColor4f(0.0, 0.8, 0.4, alpha)
-                glVertex3f(*segment['start']); glVertex3f(*segment['end'])
-            glEnd()
-
-            if self.highlight_line != -1:
-                glLineWidth(4.0)
-                glBegin(GL_LINES)
-                glColor3f(1.0, 1.0, 1.0)
-                for segment in self.path_data:
-                    if segment.get('source_line') == self.highlight_line:
-                        glVertex3f(*segment['start']); glVertex3f(*segment['end'])
-                glEnd()
+            # Nivo detalja: koliko mm pokriva jedan piksel na udaljenosti kamere
+            level = 0 if self.partial or self.lod is None else self.lod.level_for(self.pixel_size() * LOD_PIXELS)
+            if level and not self.renderer.has_level(level):
+                with span('gl.upload_lod', level=level, segments=len(self.lod.levels[level])): self.renderer.upload(self.lod.levels[level], level)
+            if self.playhead is not None:
+                # Segmenti su poredjani po duzini: predjeni deo i ostatak su dva opsega indeksa
+                done = (self.lod.levels[level] if level else self.path_data).done_at(self.playhead)
+                self.renderer.draw(0, done, level=level)
+                self.renderer.draw(done, alpha=PENDING_ALPHA, level=level)
+                first, count = self.path_data.line_range(self.highlight_line) if self.highlight_line != -1 else (0, 0)
+                if count:
+                    glDepthFunc(GL_LEQUAL)
+                    glLineWidth(4.0)
+                    self.renderer.draw(first, count, override=(1.0, 1.0, 1.0, 1.0))
+                    glDepthFunc(GL_LESS)
+            elif self.highlight_line == -1:
+                self.renderer.draw(level=level)
+            else:
+                # Izabrana linija punom bojom (i belo preko), ostatak prigusen
+                first, count = self.path_data.line_range(self.highlight_line)
+                if level:
+                    self.renderer.draw(alpha=0.2, level=level)
+                else:
+                    self.renderer.draw(0, first, alpha=0.2)
+                    self.renderer.draw(first + count, alpha=0.2)
+                if count:
+                    glDepthFunc(GL_LEQUAL)
+                    self.renderer.draw(first, count)
+                    glLineWidth(4.0)
+                    self.renderer.draw(first, count, override=(1.0, 1.0, 1.0, 1.0))
+                    glDepthFunc(GL_LESS)
         
         if self.tool_pos:
             glEnable(GL_LIGHTING)
             self.draw_tool()
             glDisable(GL_LIGHTING)
 
+    def pixel_size(self):
+        # Perspektiva je 45 stepeni po visini (resizeGL)
+        return 2.0 * self.camera_distance * math.tan(math.radians(22.5)) / max(self.height(), 1)
+
     def draw_tool(self):
         glPushMatrix()
         glTranslatef(self.tool_pos[0], self.tool_pos[1], self.tool_pos[2])
@@ -206,8 +293,61 @@ class NCPreviewWidget(QOpenGLWidget):
             
         glEnd()
 
-    def mousePressEvent(self, e): self.lastPos = e.pos()
+    # --- NOVO: Izbor segmenta klikom (picking.SegmentIndex) ---
+    def view_matrices(self):
+        """Projekcija i model-view kao u resizeGL / paintGL (NumPy, bez GL konteksta)."""
+        aspect = self.width() / max(self.height(), 1); f = 1.0 / math.tan(math.radians(22.5)); near, far = 0.1, 5000.0
+        proj = np.array([[f / aspect, 0, 0, 0], [0, f, 0, 0],
+                         [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)], [0, 0, -1, 0]])
+        def rotation(deg, axis):
+            c, s = math.cos(math.radians(deg)), math.sin(math.radians(deg)); m = np.eye(4)
+            i, j = (1, 2) if axis == 'x' else (0, 1)
+            m[i, i] = c; m[i, j] = -s; m[j, i] = s; m[j, j] = c
+            return m
+        move = lambda x, y, z: np.array([[1, 0, 0, x], [0, 1, 0, y], [0, 0, 1, z], [0, 0, 0, 1.0]])
+        model = move(0, 0, -self.camera_distance) @ rotation(self.rotation_x, 'x') @ rotation(self.rotation_z, 'z') @ move(self.pan_x, self.pan_y, 0)
+        return proj, model
+
+    def view_ray(self, x, y):
+        """Zrak (pocetak, pravac) u koordinatama putanje kroz piksel (x, y) widget-a."""
+        proj, model = self.view_matrices()
+        ndc = (2.0 * x / max(self.width(), 1) - 1.0, 1.0 - 2.0 * y / max(self.height(), 1))
+        eye_dir = np.array([ndc[0] / proj[0, 0], ndc[1] / proj[1, 1], -1.0, 0.0])
+        inverse = np.linalg.inv(model)
+        return inverse[:3, 3], (inverse @ eye_dir)[:3]
+
+    def pick_line(self, x, y):
+        """Linija editora segmenta pod pikselom (x, y), ili -1."""
+        if self.pick_index is None or not len(self.path_data): return -1
+        with span('pick', segments=len(self.path_data)):
+            seg = self.pick_index.pick(*self.view_ray(x, y), PICK_PIXELS * self.pixel_size())
+        return int(self.path_data.source_lines[seg]) if seg >= 0 else -1
+
+    def select_lines(self, rect):
+        """Opsezi linija segmenata unutar pravougaonika ekrana (QRect)."""
+        if self.pick_index is None: return []
+        proj, model = self.view_matrices()
+        with span('pick.rect', segments=len(self.path_data)):
+            return self.pick_index.select_rect(proj @ model, (self.width(), self.height()), (rect.left(), rect.top(), rect.right(), rect.bottom()))
+
+    def mousePressEvent(self, e):
+        self.lastPos = e.pos(); self.pressPos = e.pos()
+        if e.button() == Qt.LeftButton and e.modifiers() & Qt.ShiftModifier:
+            if self.rubber_band is None: self.rubber_band = QRubberBand(QRubberBand.Rectangle, self)
+            self.rubber_band.setGeometry(QRect(e.pos(), e.pos())); self.rubber_band.show()
+    def mouseReleaseEvent(self, e):
+        if e.button() != Qt.LeftButton or self.pressPos is None: return
+        if self.rubber_band is not None and self.rubber_band.isVisible():
+            self.rubber_band.hide()
+            ranges = self.select_lines(QRect(self.pressPos, e.pos()).normalized())
+            if ranges: self.linesSelected.emit(ranges)
+        elif (e.pos() - self.pressPos).manhattanLength() <= PICK_PIXELS:
+            line = self.pick_line(e.x(), e.y())
+            if line != -1: self.segmentPicked.emit(line)
+        self.pressPos = None
     def mouseMoveEvent(self, e):
+        if self.rubber_band is not None and self.rubber_band.isVisible():
+            self.rubber_band.setGeometry(QRect(self.pressPos, e.pos()).normalized()); return
         dx = e.x()-self.lastPos.x(); dy = e.y()-self.lastPos.y()
         if e.buttons() & Qt.LeftButton: self.rotation_x += dy; self.rotation_z += dx
         elif e.buttons() & Qt.RightButton: self.pan_x += dx*0.5; self.pan_y -= dy*0.5